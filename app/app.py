@@ -1,16 +1,35 @@
+import os
+import sys
 import json
+import time
+import hashlib
 import boto3
 import pandas as pd
 import streamlit as st
-from io import StringIO
+from io import StringIO, BytesIO
 from datetime import datetime
 
+# Shared helpers live in scripts/ (and notebook/ for what the endpoint also uses)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "notebook"))
+from endpoint_client import EndpointClient, make_runtime_client
+from prediction_cache import PredictionCache, cached_map
+from log_shipper import LogShipper, CloudWatchSink, FileSink
+from streaming_pipeline import stream_score, S3MultipartWriter
+from near_dedup import NearDuplicateCollapser, THRESHOLD
+from analytics_store import AnalyticsStore, GROUP_COLUMNS, run_key
+from backend_router import BackendRouter, CircuitBreaker, load_local_backend, served_by_endpoint
+import stage_metrics
+import request_capture
+from stage_metrics import span, timed
+
 # 🔧 Config – adjust once here and it's reflected everywhere
 REGION = "us-east-1"
 ENDPOINT = "sagemaker-scikit-learn-2025-08-15-13-46-04-474"   # must match your deployed SageMaker endpoint
 BUCKET = "grey-customer-feedback-bucket"  # matches S3 bucket in your training/deployment
 LOG_GROUP = "/ai-feedback-analyzer/predictions"
 LOG_STREAM = "streamlit-app"
+MODEL_DIR = os.environ.get("FEEDBACK_MODEL_DIR", "model_bundle")   # local fallback / hedge model
 
 # 🏷️ Sentiment Mapping (for numeric predictions)
 label_map = {
@@ -27,12 +46,42 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# 🔌 AWS Clients
-rt = boto3.client("sagemaker-runtime", region_name=REGION)
-s3 = boto3.client("s3", region_name=REGION)
-logs = boto3.client("logs", region_name=REGION)
+# ⏱️ Stage timings – process-wide; FEEDBACK_METRICS=1 turns them on at start-up
+show_metrics = st.sidebar.toggle("⏱️ Stage timings", value=stage_metrics.enabled())
+stage_metrics.enable(show_metrics)
+metrics_panel = st.sidebar.container()
+
+@st.cache_resource
+def get_metrics_exporter():
+    # EMF lines → FEEDBACK_METRICS_FILE, or stdout for the CloudWatch agent
+    return stage_metrics.start_exporter("streamlit-app")
+
+if show_metrics:
+    get_metrics_exporter()
+
+# 🔌 AWS Clients – built once per process, not on every Streamlit rerun
+@st.cache_resource
+def get_clients():
+    rt = make_runtime_client(REGION)   # FEEDBACK_ENDPOINT_URL → local server
+    s3 = boto3.client("s3", region_name=REGION)
+    logs = boto3.client("logs", region_name=REGION)
+    return rt, s3, logs
+
+rt, s3, logs = get_clients()
+
+@st.cache_resource
+def get_endpoint_client():
+    return EndpointClient(ENDPOINT, rt=rt)
+
+endpoint_client = get_endpoint_client()
 
-# 📜 Ensure Log Group & Stream Exist
+# 🛡️ Local model – loaded once; serves hedged requests and requests while the endpoint circuit is open
+@st.cache_resource
+def get_local_model():
+    return load_local_backend(MODEL_DIR)
+
+# 📜 Ensure Log Group & Stream Exist (once per process)
+@st.cache_resource
 def ensure_log_resources():
     try:
         logs.create_log_group(logGroupName=LOG_GROUP)
@@ -42,105 +91,286 @@ def ensure_log_resources():
         logs.create_log_stream(logGroupName=LOG_GROUP, logStreamName=LOG_STREAM)
     except logs.exceptions.ResourceAlreadyExistsException:
         pass
+    return True
+
+if not os.environ.get("FEEDBACK_LOG_FILE"):
+    ensure_log_resources()
 
-ensure_log_resources()
+# 📝 Log to CloudWatch – events are buffered and shipped in batches by a background thread
+@st.cache_resource
+def get_log_shipper():
+    log_file = os.environ.get("FEEDBACK_LOG_FILE")   # local JSONL stand-in for CloudWatch
+    sink = FileSink(log_file) if log_file else CloudWatchSink(logs, LOG_GROUP, LOG_STREAM)
+    return LogShipper(sink)
 
-# 📝 Log to CloudWatch
 def log_to_cloudwatch(message):
-    ts = int(datetime.now().timestamp() * 1000)
-    try:
-        logs.put_log_events(
-            logGroupName=LOG_GROUP,
-            logStreamName=LOG_STREAM,
-            logEvents=[{
-                'timestamp': ts,
-                'message': json.dumps(message)
-            }]
-        )
-    except logs.exceptions.InvalidSequenceTokenException as e:
-        token = e.response['expectedSequenceToken']
-        logs.put_log_events(
-            logGroupName=LOG_GROUP,
-            logStreamName=LOG_STREAM,
-            sequenceToken=token,
-            logEvents=[{
-                'timestamp': ts,
-                'message': json.dumps(message)
-            }]
-        )
+    with span("app.cloudwatch_emit"):
+        get_log_shipper().emit(message)
 
-# 🔍 Inference Function
-def predict(text: str):
-    payload = json.dumps({"text": text})
-    resp = rt.invoke_endpoint(
-        EndpointName=ENDPOINT,
-        ContentType="application/json",
-        Body=payload
-    )
-    raw = json.loads(resp["Body"].read().decode("utf-8"))
+# 🏷️ Endpoint output → sentiment label
+def to_sentiment(first_val):
+    # batch responses carry {"label": ..., "proba": {...}} per row
+    if isinstance(first_val, dict):
+        first_val = first_val.get("label")
 
     # ✅ Handle both numeric IDs and string labels from endpoint
-    first_val = raw[0]
     if isinstance(first_val, str):
         try:
             # if it's a numeric string like "2"
             pred_class = int(first_val)
-            sentiment = label_map.get(pred_class, "mixed")
+            return label_map.get(pred_class, "mixed")
         except ValueError:
             # it's already a label string like "positive"
-            sentiment = first_val
-    else:
-        sentiment = label_map.get(int(first_val), "mixed")
+            return first_val
+    return label_map.get(int(first_val), "mixed")
+
+# 🗃️ Prediction cache – repeated texts never hit the endpoint twice
+@st.cache_resource
+def get_prediction_cache():
+    return PredictionCache(version=f"endpoint:{ENDPOINT}")
+
+cache = get_prediction_cache()
+
+def invoke_single(texts):
+    with span("app.serialize"):
+        payload = json.dumps({"text": texts[0]})
+    with span("app.invoke_endpoint"):
+        resp = rt.invoke_endpoint(
+            EndpointName=ENDPOINT,
+            ContentType="application/json",
+            Body=payload
+        )
+        body = resp["Body"].read()
+    with span("app.parse_response"):
+        raw = json.loads(body.decode("utf-8"))
+    return [{"label": raw[0], "proba": None}]
+
+# 🛡️ Routers – single-text and batch calls share one circuit breaker, each with its own latency budget
+@st.cache_resource
+def get_routers():
+    local, breaker = get_local_model(), CircuitBreaker()
+    return (BackendRouter(invoke_single, local, breaker),
+            BackendRouter(endpoint_client.invoke, local, breaker))
+
+single_router, batch_router = get_routers()
+
+# 🔍 Inference Function
+@timed("app.predict")
+def predict(text: str):
+    # FEEDBACK_CAPTURE_FILE set → text + end-to-end latency go to the replay capture
+    started, ts = time.perf_counter(), time.time()
+    try:
+        row = cached_map(cache, [text], single_router.route, keep=served_by_endpoint)[0]
+    except Exception:
+        request_capture.record(text, (time.perf_counter() - started) * 1000, "app", ok=False, ts=ts)
+        raise
+    request_capture.record(text, (time.perf_counter() - started) * 1000, "app", ts=ts)
+    sentiment, backend = to_sentiment(row), row.get("backend", "endpoint")
 
     # 📡 Log prediction event
     log_to_cloudwatch({
         "event": "prediction",
         "text": text,
         "predicted_sentiment": sentiment,
+        "backend": backend,
         "timestamp": datetime.utcnow().isoformat()
     })
 
-    return sentiment
+    return sentiment, backend
+
+# 📦 Batch Inference – cache first, one representative per near-duplicate cluster,
+# then concurrent payload-bounded requests
+@timed("batch.predict")
+def predict_many(texts, progress=None, collapser=None, meta=None):
+    """(sentiments, backend that served each row); meta: per-row extra fields for the prediction events."""
+    def score(misses):
+        return batch_router.predict(misses, progress=progress)
+
+    raw = cached_map(cache, texts, score, keep=served_by_endpoint, collapser=collapser)
+    failed = [r for r in raw if isinstance(r, dict) and "error" in r]
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(texts)} rows failed: {failed[0]['error']}")
+    sentiments = [to_sentiment(r) for r in raw]
+    backends = [r.get("backend", "endpoint") if isinstance(r, dict) else "endpoint" for r in raw]
+    with span("batch.cloudwatch_emit"):
+        shipper = get_log_shipper()
+        for i, (text, sentiment, backend) in enumerate(zip(texts, sentiments, backends)):
+            shipper.emit({
+                "event": "prediction",
+                "text": text,
+                "predicted_sentiment": sentiment,
+                "backend": backend,
+                **(meta[i] if meta is not None else {}),
+                "timestamp": datetime.utcnow().isoformat()
+            })
+    return sentiments, backends
+
+def event_meta(df):
+    """Source / Location of each uploaded row, for scripts/stream_monitor.py's top-k windows."""
+    cols = {c.lower(): c for c in df.columns if c.lower() in ("source", "location")}
+    if not cols:
+        return None
+    meta = df[list(cols.values())].rename(columns={c: k for k, c in cols.items()})
+    return meta.astype(object).where(meta.notna(), None).to_dict("records")
+
+def backend_caption(backends):
+    counts = pd.Series(backends).value_counts()
+    return "🛡️ Served by: " + ", ".join(f"{name} {n}" for name, n in counts.items())
+
+def dedup_caption(stats):
+    return ("🧬 Near-duplicates: {collapsed} of {rows} uncached rows reused a representative's result "
+            "({dedup_ratio:.0%} fewer endpoint rows)").format(**stats)
+
+# 📈 Analytics store – scored rows land here on save; the dashboard reads only label columns
+@st.cache_resource
+def get_analytics_store():
+    return AnalyticsStore()
+
+analytics = get_analytics_store()
+
+@st.cache_data(ttl=60, show_spinner=False)
+def dashboard_partitions():
+    return analytics.partitions()
+
+@st.cache_data(ttl=60, show_spinner=False)
+def dashboard_share(by, start, end, sources):
+    with span("dashboard.query"):
+        return analytics.sentiment_share(by, start=start, end=end, sources=sources)
+
+def append_analytics(frame, upload_id, stored=None):
+    # 🔑 keyed by upload content + row position, so saving the same file twice is a no-op
+    with span("batch.analytics_append"):
+        analytics.append_rows(frame, run_key("app", upload_id, f"endpoint:{ENDPOINT}"), "sentiment",
+                              origin="app", stored=stored)
+    dashboard_partitions.clear()
+    dashboard_share.clear()
 
 # 🧭 Tabs
-tab1, tab2 = st.tabs(["📤 Batch Upload", "🗣️ Single Feedback"])
+tab1, tab2, tab3 = st.tabs(["📤 Batch Upload", "🗣️ Single Feedback", "📈 Dashboard"])
+
+# 📄 Uploads are parsed once per file content, not on every rerun
+@st.cache_data(show_spinner=False)
+def read_upload(data: bytes):
+    with span("batch.read_csv"):
+        return pd.read_csv(BytesIO(data))
 
 # 📤 Tab 1: Batch Upload
 with tab1:
     st.subheader("Upload CSV")
     up = st.file_uploader("CSV must contain a 'text' column", type=["csv"])
-    if up:
-        df = pd.read_csv(up)
+    streaming = st.toggle(
+        "⚡ Streaming mode (large files)",
+        help="Score in chunks and write results straight to S3 without holding the whole file in memory"
+    )
+    dedup_threshold = st.slider(
+        "🧬 Near-duplicate threshold", 0.0, 1.0, THRESHOLD, 0.01,
+        help="Texts at least this similar share one endpoint call (1.0 = exact duplicates only, 0 = off)"
+    )
+    if up and streaming:
+        preview = pd.read_csv(up, nrows=5)
+        up.seek(0)
+        if "text" not in preview.columns:
+            st.error("Missing 'text' column.")
+        else:
+            st.write("📄 Preview", preview)
+            if st.button("🔍 Run Streaming Predictions"):
+                key = "predictions/streamlit_predictions.csv"
+                bar = st.progress(0.0, text="Analyzing...")
+                chart = st.empty()
+
+                collapser = NearDuplicateCollapser(dedup_threshold)
+                upload_id = hashlib.file_digest(up, "sha256").hexdigest()
+                up.seek(0)
+                stored = analytics.stored_positions(run_key("app", upload_id, f"endpoint:{ENDPOINT}"))
+
+                def on_frame(frame):
+                    append_analytics(frame, upload_id, stored)
+
+                def on_chunk(rows, histogram, fraction):
+                    bar.progress(fraction or 0.0, text=f"Analyzing... {rows} rows")
+                    chart.bar_chart(pd.Series(dict(histogram), name="count"))
+
+                try:
+                    with span("batch.stream_score"):
+                        rows, histogram, _ = stream_score(
+                            up, lambda texts: predict_many(texts, collapser=collapser)[0],
+                            S3MultipartWriter(s3, BUCKET, key), on_chunk=on_chunk, on_frame=on_frame
+                        )
+                except RuntimeError as e:
+                    st.error(f"❌ Endpoint error: {e}")
+                    st.stop()
+                bar.empty()
+                st.success(f"✅ Scored {rows} rows → `s3://{BUCKET}/{key}`")
+                st.caption(dedup_caption(collapser.stats()))
+                log_to_cloudwatch({
+                    "event": "save_to_s3",
+                    "bucket": BUCKET,
+                    "key": key,
+                    "rows_saved": rows,
+                    "timestamp": datetime.utcnow().isoformat()
+                })
+    elif up:
+        data = up.getvalue()
+        upload_id = hashlib.sha256(data).hexdigest()
+        df = read_upload(data)
         if "text" not in df.columns:
             st.error("Missing 'text' column.")
         else:
             st.write("📄 Preview", df.head())
             if st.button("🔍 Run Predictions"):
-                with st.spinner("Analyzing..."):
-                    df["sentiment"] = df["text"].fillna("").apply(predict)
+                bar = st.progress(0.0, text="Analyzing...")
+                collapser = NearDuplicateCollapser(dedup_threshold)
+                try:
+                    sentiments, backends = predict_many(
+                        df["text"].fillna("").astype(str).tolist(),
+                        progress=lambda done, total: bar.progress(done / total, text=f"Analyzing... {done}/{total}"),
+                        collapser=collapser,
+                        meta=event_meta(df)
+                    )
+                except RuntimeError as e:
+                    st.error(f"❌ Endpoint error: {e}")
+                    st.stop()
+                bar.empty()
+                # 🧠 Keep scored results across reruns (save / filter / chart never rescore)
+                st.session_state["batch_results"] = {upload_id: df.assign(sentiment=sentiments, backend=backends)}
+                st.session_state["batch_dedup"] = collapser.stats()
+
+            scored = st.session_state.get("batch_results", {}).get(upload_id)
+            if scored is not None:
                 st.success("✅ Analysis Complete")
-                st.dataframe(df[["text", "sentiment"]].head())
+                st.caption("🗃️ Cache hit rate: {hit_rate:.0%} ({hits} hits / {misses} misses)".format(**cache.stats()))
+                if "batch_dedup" in st.session_state:
+                    st.caption(dedup_caption(st.session_state["batch_dedup"]))
+                st.caption(backend_caption(scored["backend"]))
+
+                labels = sorted(scored["sentiment"].unique().tolist())
+                shown = st.multiselect("Filter by sentiment", labels, default=labels)
+                view = scored[scored["sentiment"].isin(shown)]
+                st.dataframe(view[["text", "sentiment", "backend"]].head(100))
 
                 # 📊 Label Distribution
-                st.bar_chart(df["sentiment"].value_counts())
+                st.bar_chart(scored["sentiment"].value_counts())
 
                 # 💾 Save to S3
-                csv_buf = StringIO()
-                df.to_csv(csv_buf, index=False)
                 if st.button("📦 Save to S3"):
                     key = "predictions/streamlit_predictions.csv"
-                    s3.put_object(
-                        Bucket=BUCKET,
-                        Key=key,
-                        Body=csv_buf.getvalue().encode("utf-8")
-                    )
-                    st.success(f"Saved to `s3://{BUCKET}/{key}`")
+                    csv_buf = StringIO()
+                    with span("batch.to_csv"):
+                        scored.to_csv(csv_buf, index=False)
+                    with span("batch.s3_put"):
+                        s3.put_object(
+                            Bucket=BUCKET,
+                            Key=key,
+                            Body=csv_buf.getvalue().encode("utf-8")
+                        )
+                    append_analytics(scored, upload_id)
+                    st.success(f"Saved to `s3://{BUCKET}/{key}` and the analytics store")
 
                     log_to_cloudwatch({
                         "event": "save_to_s3",
                         "bucket": BUCKET,
                         "key": key,
-                        "rows_saved": len(df),
+                        "rows_saved": len(scored),
                         "timestamp": datetime.utcnow().isoformat()
                     })
 
@@ -152,5 +382,54 @@ with tab2:
         if not txt.strip():
             st.warning("Please enter some text.")
         else:
-            sentiment = predict(txt)
+            sentiment, backend = predict(txt)
             st.success(f"Sentiment: {sentiment}")
+            st.caption(backend_caption([backend]))
+
+# 📈 Tab 3: Sentiment trends from the analytics store (no raw text is loaded)
+with tab3:
+    st.subheader("Sentiment Trends")
+    parts = dashboard_partitions()
+    if parts.empty:
+        st.info("No scored rows yet – run batch predictions and save them to fill the dashboard.")
+    else:
+        first = pd.Period(parts["month"].min(), "M").start_time.date()
+        last = pd.Period(parts["month"].max(), "M").end_time.date()
+        c1, c2, c3 = st.columns(3)
+        picked = c1.date_input("📅 Date range", (first, last), min_value=first, max_value=last)
+        sources = c2.multiselect("Source", sorted(parts["Source"].unique()), placeholder="All sources")
+        by = c3.selectbox("Group by", [c for c in GROUP_COLUMNS if c != "month"], index=1)
+        start, end = (picked[0], picked[-1]) if picked else (first, last)
+
+        share = dashboard_share(by, start, end, tuple(sources))
+        if share.empty:
+            st.info("No rows match these filters.")
+        else:
+            counts = share.pivot_table(index=by, columns="sentiment", values="count", fill_value=0).astype(int)
+            if by == "Location":                    # keep the chart readable
+                counts = counts.loc[counts.sum(axis=1).nlargest(25).index]
+            st.caption(f"{int(counts.values.sum()):,} rows in {len(parts)} partitions")
+            st.bar_chart(counts.div(counts.sum(axis=1), axis=0))
+            table = counts.assign(total=counts.sum(axis=1))
+            st.dataframe(table if by == "date" else table.sort_values("total", ascending=False))
+
+# ⏱️ Sidebar: live per-stage latency + cache hit rate
+if show_metrics:
+    with metrics_panel:
+        stats = stage_metrics.snapshot()
+        if stats:
+            st.dataframe(
+                pd.DataFrame([
+                    {"stage": stage, "n": s["count"], "p50 ms": s["p50_ms"], "p95 ms": s["p95_ms"]}
+                    for stage, s in stats.items()
+                ]),
+                hide_index=True
+            )
+        else:
+            st.caption("No timed stages yet – run a prediction.")
+        st.caption("🗃️ Cache hit rate: {hit_rate:.0%} ({hits} hits / {misses} misses)".format(**cache.stats()))
+
+# 🛡️ Sidebar: endpoint circuit state (requests go to the local model while it is open)
+if batch_router.breaker.state != "closed":
+    st.sidebar.warning(f"🛡️ Endpoint circuit {batch_router.breaker.state.replace('_', '-')} – "
+                       f"serving {'the local model' if get_local_model() else 'errors'} until a probe succeeds")
@@ -0,0 +1,314 @@
+# benchmarks/bench.py
+# Times the hot paths on a synthetic corpus (see corpus.py) and writes JSON
+# results: throughput, p50/p95/p99 latency per operation and peak memory per
+# case. AWS calls go to the in-process fakes in scripts/local_fakes.py, so
+# the numbers measure our code, not the network.
+#
+#   python benchmarks/bench.py run --size 10k --model-dir model_bundle
+#   python benchmarks/bench.py run --size 1m --out benchmarks/baseline.json
+#   python benchmarks/bench.py compare benchmarks/baseline.json .cache/bench/results.json
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import psutil
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, "..", "scripts"))
+sys.path.append(os.path.join(HERE, "..", "notebook"))
+sys.path.append(HERE)
+
+import inference
+from corpus import ensure_corpus, parse_rows
+from local_fakes import FakeS3, FakeCloudWatchLogs
+from log_shipper import LogShipper, CloudWatchSink
+from streaming_pipeline import S3MultipartWriter
+
+MODEL_DIR = os.environ.get("FEEDBACK_MODEL_DIR", "model_bundle")
+RESULTS = os.path.join(".cache", "bench", "results.json")
+BATCH_ROWS = 500                    # rows per vectorize / predict / handler call
+SINGLE_SAMPLES = 2_000              # single-text handler calls timed
+LOG_EVENTS = 100_000                # events pushed through the log shipper
+TOLERANCE = 0.10                    # compare: allowed relative slowdown
+MIN_MS_DELTA = 0.05                 # compare: ignore latency changes below this (timer noise)
+MIN_MB_DELTA = 32.0                 # compare: ignore memory changes below this
+
+class RssSampler:
+    """Background thread recording the peak resident set size of this process."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._proc = psutil.Process()
+        self._stop = threading.Event()
+        self.start_rss = self.peak_rss = self._proc.memory_info().rss
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_rss = max(self.peak_rss, self._proc.memory_info().rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_rss = max(self.peak_rss, self._proc.memory_info().rss)
+
+def batches(items, size=BATCH_ROWS):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def timed(fn, items):
+    """Call fn(item) for each item; per-call latencies in seconds."""
+    latencies = []
+    for item in items:
+        t0 = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - t0)
+    return latencies
+
+# --- Cases: each returns (latencies, rows, extra); throughput is rows / sum(latencies) ---
+
+def bench_csv_load(ctx):
+    t0 = time.perf_counter()
+    ctx["df"] = pd.read_csv(ctx["corpus"])
+    ctx["texts"] = ctx["df"]["Text"].fillna("").astype(str).tolist()
+    return [time.perf_counter() - t0], len(ctx["df"]), {"bytes": os.path.getsize(ctx["corpus"])}
+
+def bench_csv_save(ctx):
+    path = os.path.join(ctx["tmp"], "save.csv")
+    t0 = time.perf_counter()
+    ctx["df"].to_csv(path, index=False)
+    latency = time.perf_counter() - t0
+    return [latency], len(ctx["df"]), {"bytes": os.path.getsize(path)}
+
+def bench_vectorize(ctx):
+    vectorizer = ctx["bundle"][1]
+    return timed(vectorizer.transform, batches(ctx["texts"])), len(ctx["texts"]), {}
+
+def bench_predict(ctx):
+    model, vectorizer = ctx["bundle"][:2]
+    latencies = []
+    for batch in batches(ctx["texts"]):
+        X = vectorizer.transform(batch)
+        t0 = time.perf_counter()
+        model.predict_proba(X)
+        latencies.append(time.perf_counter() - t0)
+    return latencies, len(ctx["texts"]), {}
+
+def bench_fast_scorer(ctx):
+    from linear_scorer import LinearScorer
+    scorer = LinearScorer.for_bundle(*ctx["bundle"][:2])
+    if scorer is None:
+        return None
+    return timed(scorer.score, batches(ctx["texts"])), len(ctx["texts"]), {}
+
+def _handle(bundle, body, content_type="application/json"):
+    data = inference.input_fn(body, content_type)
+    prediction = inference.predict_fn(data, bundle)
+    return inference.output_fn(prediction, "application/json")
+
+def bench_handler_single(ctx):
+    bodies = [json.dumps({"text": t}) for t in ctx["texts"][:SINGLE_SAMPLES]]
+    return timed(lambda b: _handle(ctx["bundle"], b), bodies), len(bodies), {}
+
+def bench_handler_batch(ctx):
+    bodies = [json.dumps(batch) for batch in batches(ctx["texts"])]
+    return timed(lambda b: _handle(ctx["bundle"], b), bodies), len(ctx["texts"]), {}
+
+def bench_cloudwatch_log(ctx):
+    logs = FakeCloudWatchLogs(keep_events=False)
+    shipper = LogShipper(CloudWatchSink(logs, "bench", "bench"), block=True)
+    texts = ctx["texts"][:LOG_EVENTS]
+    latencies = timed(lambda t: shipper.emit({
+        "event": "prediction", "text": t, "predicted_sentiment": "POSITIVE",
+        "timestamp": datetime.utcnow().isoformat()
+    }), texts)
+    t0 = time.perf_counter()
+    shipper.close(timeout=120)
+    latencies.append(time.perf_counter() - t0)      # draining counts towards throughput
+    extra = dict(shipper.stats(), drain_seconds=round(latencies[-1], 4),
+                 put_log_events=logs.calls["put_log_events"])
+    return latencies, len(texts), extra
+
+def bench_s3_put_object(ctx):
+    s3 = FakeS3(os.path.join(ctx["tmp"], "s3"))
+    t0 = time.perf_counter()
+    body = ctx["df"].to_csv(index=False).encode("utf-8")
+    s3.put_object(Bucket="bench", Key="results/app_save.csv", Body=body, ContentType="text/csv")
+    return [time.perf_counter() - t0], len(ctx["df"]), {"bytes": len(body)}
+
+def bench_s3_multipart(ctx):
+    s3 = FakeS3(os.path.join(ctx["tmp"], "s3"))
+    writer = S3MultipartWriter(s3, "bench", "results/streamed.csv")
+    chunks = [ctx["df"].iloc[i:i + 5_000] for i in range(0, len(ctx["df"]), 5_000)]
+    latencies = timed(lambda c: writer.write(c.to_csv(index=False, header=False)), chunks)
+    t0 = time.perf_counter()
+    writer.close()
+    latencies.append(time.perf_counter() - t0)
+    return latencies, len(ctx["df"]), {"bytes": writer.bytes_written, "parts": s3.calls["upload_part"]}
+
+CASES = {
+    "csv_load": bench_csv_load,
+    "vectorize": bench_vectorize,
+    "predict": bench_predict,
+    "fast_scorer": bench_fast_scorer,
+    "handler_single": bench_handler_single,
+    "handler_batch": bench_handler_batch,
+    "cloudwatch_log": bench_cloudwatch_log,
+    "csv_save": bench_csv_save,
+    "s3_put_object": bench_s3_put_object,
+    "s3_multipart": bench_s3_multipart,
+}
+
+def summarize(latencies, rows, seconds, sampler):
+    ms = np.asarray(latencies) * 1000
+    busy = float(np.sum(latencies))
+    return {
+        "rows": rows,
+        "ops": len(latencies),
+        "seconds": round(seconds, 4),
+        "timed_seconds": round(busy, 4),
+        "throughput_rows_s": round(rows / busy, 1) if busy else None,
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "peak_rss_mb": round(sampler.peak_rss / 2 ** 20, 1),
+        "rss_delta_mb": round((sampler.peak_rss - sampler.start_rss) / 2 ** 20, 1),
+    }
+
+def run(corpus, model_dir, cases=None):
+    """Run the selected cases in order (csv_load always runs first: the rest need its rows)."""
+    names = list(CASES) if not cases else ["csv_load"] + [c for c in cases if c != "csv_load"]
+    ctx = {"corpus": corpus, "tmp": tempfile.mkdtemp(prefix="feedback-bench-")}
+    t0 = time.perf_counter()
+    ctx["bundle"] = inference.model_fn(model_dir)
+    load_seconds = time.perf_counter() - t0
+
+    results = {}
+    stdout = sys.stdout
+    try:
+        for name in names:
+            # the handlers print per request – keep that out of the timings
+            sys.stdout = open(os.devnull, "w")
+            try:
+                with RssSampler() as sampler:
+                    t0 = time.perf_counter()
+                    out = CASES[name](ctx)
+                    seconds = time.perf_counter() - t0
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+            if out is None:
+                print(f"⏭️ {name}: not supported by this model")
+                continue
+            latencies, rows, extra = out
+            results[name] = dict(summarize(latencies, rows, seconds, sampler), **extra)
+            r = results[name]
+            print(f"⏱️ {name:15s} {r['throughput_rows_s']:>12,.0f} rows/s  "
+                  f"p50 {r['p50_ms']:.3f} ms  p95 {r['p95_ms']:.3f} ms  p99 {r['p99_ms']:.3f} ms  "
+                  f"peak RSS {r['peak_rss_mb']} MB")
+    finally:
+        shutil.rmtree(ctx["tmp"], ignore_errors=True)
+
+    meta = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "corpus": os.path.basename(corpus),
+        "rows": len(ctx.get("texts", [])),
+        "model_dir": model_dir,
+        "model_load_seconds": round(load_seconds, 4),
+        "fast_scorer_in_handler": len(ctx["bundle"]) > 3,
+        "batch_rows": BATCH_ROWS,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+    return {"meta": meta, "results": results}
+
+def compare(baseline, current, tolerance=TOLERANCE):
+    """
+    (case, metric, old, new, regressed) rows. A case regresses when
+    throughput drops, or p95 latency / memory growth rises, by more than
+    `tolerance` (and by more than the noise floors for latency/memory).
+    Cases missing from `current` are reported but not counted.
+    """
+    rows = []
+    for name, old in baseline["results"].items():
+        new = current["results"].get(name)
+        if new is None:
+            rows.append((name, "missing", None, None, False))
+            continue
+        checks = [
+            ("throughput_rows_s", new["throughput_rows_s"] < old["throughput_rows_s"] * (1 - tolerance)),
+            ("p95_ms", new["p95_ms"] > old["p95_ms"] * (1 + tolerance)
+             and new["p95_ms"] - old["p95_ms"] > MIN_MS_DELTA),
+            ("rss_delta_mb", new["rss_delta_mb"] > old["rss_delta_mb"] * (1 + tolerance)
+             and new["rss_delta_mb"] - old["rss_delta_mb"] > MIN_MB_DELTA),
+        ]
+        for metric, regressed in checks:
+            rows.append((name, metric, old[metric], new[metric], regressed))
+    return rows
+
+def print_comparison(rows):
+    for name, metric, old, new, regressed in rows:
+        if metric == "missing":
+            print(f"⚠️ {name:15s} not in current results")
+            continue
+        change = f"{(new - old) / old:+.1%}" if old else "n/a"
+        mark = "❌" if regressed else "✅"
+        print(f"{mark} {name:15s} {metric:18s} {old:>14,.3f} → {new:>14,.3f}  ({change})")
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="time the hot paths and write JSON results")
+    p_run.add_argument("--size", default="10k", help="10k, 1m, 10m or a row count")
+    p_run.add_argument("--corpus", default=None, help="existing CSV with a 'Text' column (skips generation)")
+    p_run.add_argument("--model-dir", default=MODEL_DIR)
+    p_run.add_argument("--cases", nargs="*", choices=list(CASES), default=None)
+    p_run.add_argument("--out", default=RESULTS)
+
+    p_cmp = sub.add_parser("compare", help="flag regressions of current vs baseline results")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--tolerance", type=float, default=TOLERANCE)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.command == "run":
+        corpus = args.corpus or ensure_corpus(parse_rows(args.size))
+        report = run(corpus, args.model_dir, args.cases)
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results → {args.out}")
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.tolerance)
+    print_comparison(rows)
+    regressions = sum(1 for r in rows if r[-1])
+    if regressions:
+        sys.exit(f"❌ {regressions} regression(s) beyond {args.tolerance:.0%}")
+    print("✅ No regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# benchmarks/corpus.py
+# Synthetic feedback corpora shaped like data/reviews.csv: same columns, same
+# vocabulary (word frequencies), same text-length distribution, any row count.
+#
+#   python benchmarks/corpus.py --rows 1000000 --out .cache/bench/corpus_1m.csv
+#   python benchmarks/corpus.py --size 10m      # → .cache/bench/corpus_10000000_s42.csv
+
+import os
+import re
+import argparse
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "reviews.csv")
+CORPUS_DIR = os.path.join(".cache", "bench")
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+CHUNK_ROWS = 200_000
+SEED = 42
+
+WORD = re.compile(r"[A-Za-z0-9']+")
+ENDINGS = re.compile(r"[.!?]+$")
+
+class CorpusProfile:
+    """Empirical distributions taken from a reviews.csv-style file."""
+
+    def __init__(self, path=SOURCE):
+        df = pd.read_csv(path)
+        texts = df["Text"].fillna("").astype(str)
+        counts = Counter()
+        lengths = []
+        endings = Counter()
+        for t in texts:
+            words = WORD.findall(t)
+            counts.update(words)
+            lengths.append(len(words))
+            m = ENDINGS.search(t.strip())
+            endings[m.group(0) if m else ""] += 1
+
+        self.words = np.array(list(counts), dtype=object)
+        freq = np.array(list(counts.values()), dtype=np.float64)
+        self.word_p = freq / freq.sum()
+        self.lengths = np.array([n for n in lengths if n > 0] or [8])
+        self.endings = np.array(list(endings), dtype=object)
+        self.ending_p = np.array(list(endings.values()), dtype=np.float64) / sum(endings.values())
+        self.columns = {c: df[c].dropna().astype(str).to_numpy(dtype=object)
+                        for c in ("Location", "Source", "User ID") if c in df.columns}
+
+    def texts(self, n, rng):
+        """n synthetic texts: length from the empirical distribution, words by frequency."""
+        lengths = rng.choice(self.lengths, size=n)
+        ids = rng.choice(len(self.words), size=int(lengths.sum()), p=self.word_p)
+        words = self.words[ids]
+        ends = self.endings[rng.choice(len(self.endings), size=n, p=self.ending_p)]
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        out = []
+        for i in range(n):
+            sentence = " ".join(words[offsets[i]:offsets[i + 1]])
+            out.append(sentence[:1].upper() + sentence[1:] + ends[i])
+        return out
+
+    def frame(self, start, n, rng):
+        """n rows with the reviews.csv columns, IDs starting at `start`."""
+        minutes = rng.integers(0, 365 * 24 * 60, size=n)
+        stamps = pd.Timestamp("2023-01-01") + pd.to_timedelta(minutes, unit="m")
+        # reviews.csv style "6/15/2023 9:23" (no zero padding, portable unlike strftime's %-m)
+        when = (stamps.month.astype(str) + "/" + stamps.day.astype(str) + "/" + stamps.year.astype(str)
+                + " " + stamps.hour.astype(str) + ":" + stamps.strftime("%M"))
+        data = {
+            "ID": np.arange(start, start + n),
+            "Date/Time": when,
+        }
+        for col, values in self.columns.items():
+            data[col] = values[rng.integers(0, len(values), size=n)]
+        data["Text"] = self.texts(n, rng)
+        return pd.DataFrame(data)
+
+def generate(rows, profile=None, seed=SEED, chunksize=CHUNK_ROWS):
+    """Yield DataFrame chunks totalling `rows` rows (deterministic for a seed)."""
+    profile = profile or CorpusProfile()
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, chunksize):
+        yield profile.frame(start, min(chunksize, rows - start), rng)
+
+def write_corpus(path, rows, seed=SEED, chunksize=CHUNK_ROWS):
+    """Write `rows` synthetic rows to `path` (CSV), chunk by chunk."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".part"
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        for i, chunk in enumerate(generate(rows, seed=seed, chunksize=chunksize)):
+            chunk.to_csv(f, index=False, header=(i == 0))
+    os.replace(tmp, path)
+    return path
+
+def corpus_path(rows, directory=CORPUS_DIR, seed=SEED):
+    return os.path.join(directory, f"corpus_{rows}_s{seed}.csv")
+
+def ensure_corpus(rows, directory=CORPUS_DIR, seed=SEED):
+    """Path of a cached corpus with `rows` rows, generating it on first use."""
+    path = corpus_path(rows, directory, seed)
+    if not os.path.exists(path):
+        print(f"🧪 Generating {rows:,} synthetic rows → {path}")
+        write_corpus(path, rows, seed=seed)
+    return path
+
+def parse_rows(value):
+    """'10k' / '1m' / '10m' or a plain integer."""
+    return SIZES.get(value.lower()) or int(value)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", default="10k", help="10k, 1m, 10m or a row count")
+    parser.add_argument("--rows", type=int, default=None, help="overrides --size")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    rows = args.rows or parse_rows(args.size)
+    path = args.out or corpus_path(rows, seed=args.seed)
+    write_corpus(path, rows, seed=args.seed)
+    print(f"✅ Wrote {rows:,} rows → {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+compact_model.py
+
+Compact, memory-mapped version of the model bundle.
+
+export_compact() writes <model_dir>/compact/ next to the joblib files:
+- manifest.json      → analyzer settings, classes, label mapping, array index
+- term_hashes.npy    → sorted 64-bit hashes of the vocabulary terms (uint64)
+- term_columns.npy   → feature column for each sorted hash (int32)
+- idf.npy            → IDF weight per column (float32)
+- coef.npy / intercept.npy → linear model weights (float32)
+- terms.txt          → vocabulary in column order (for inspection, not needed to score)
+
+load_compact() maps the arrays read-only (np.load(mmap_mode="r")), so a
+cold start does no unpickling, and every worker process on a host shares
+the same page-cache pages. It returns (model, vectorizer, label_mapping)
+objects with the same transform / predict / predict_proba methods that
+inference.predict_fn calls on the sklearn objects.
+
+    python compact_model.py export ../model_bundle   # add compact/ to an existing bundle
+    python compact_model.py check ../model_bundle    # compare against the joblib model
+"""
+import os
+import sys
+import json
+import hashlib
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.special import expit
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+from sklearn.preprocessing import normalize
+
+COMPACT_DIR = "compact"
+FORMAT = "feedback-compact"
+VERSION = 1
+
+# analyzer settings copied from the sklearn vectorizer into the manifest
+ANALYZER_PARAMS = ("analyzer", "lowercase", "token_pattern", "ngram_range", "strip_accents", "stop_words")
+
+def term_hash(term):
+    """Process-independent 64-bit hash used to look terms up without a dict."""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+def proba_kind(clf, n_classes):
+    """How predict_proba turns decision scores into probabilities for this classifier."""
+    if n_classes == 2:
+        return "binary"
+    if type(clf).__name__ == "LogisticRegression":
+        if getattr(clf, "solver", "lbfgs") != "liblinear" and getattr(clf, "multi_class", "auto") != "ovr":
+            return "softmax"
+    return "ovr"
+
+def _analyzer_params(vectorizer):
+    if vectorizer.tokenizer is not None or vectorizer.preprocessor is not None or callable(vectorizer.analyzer):
+        raise ValueError("Custom tokenizer/preprocessor/analyzer callables cannot be exported")
+    params = {k: getattr(vectorizer, k) for k in ANALYZER_PARAMS}
+    params["ngram_range"] = list(params["ngram_range"])
+    if params["stop_words"] is not None and not isinstance(params["stop_words"], str):
+        params["stop_words"] = sorted(params["stop_words"])
+    return params
+
+def idf_of(vectorizer):
+    try:
+        return vectorizer.idf_
+    except AttributeError:
+        # bundles pickled by sklearn < 1.3 keep the weights as a sparse diagonal
+        return vectorizer._tfidf._idf_diag.diagonal()
+
+def export_compact(model_dir, vectorizer, clf, label_mapping=None):
+    """Write <model_dir>/compact/ for a TF-IDF or hashing vectorizer + linear classifier."""
+    out = os.path.join(model_dir, COMPACT_DIR)
+    os.makedirs(out, exist_ok=True)
+    arrays = {
+        "coef": np.ascontiguousarray(clf.coef_, dtype=np.float32),
+        "intercept": np.asarray(clf.intercept_, dtype=np.float32),
+    }
+    manifest = {
+        "format": FORMAT,
+        "version": VERSION,
+        "analyzer": _analyzer_params(vectorizer),
+        "classes": [c.item() if hasattr(c, "item") else c for c in clf.classes_],
+        "proba": proba_kind(clf, len(clf.classes_)),
+        "label_mapping": {str(k): v for k, v in label_mapping.items()} if label_mapping else None,
+    }
+
+    if isinstance(vectorizer, HashingVectorizer):
+        manifest["kind"] = "hashing"
+        manifest["hashing"] = {
+            "n_features": vectorizer.n_features,
+            "alternate_sign": vectorizer.alternate_sign,
+            "norm": vectorizer.norm,
+            "binary": vectorizer.binary,
+        }
+        manifest["n_features"] = vectorizer.n_features
+    else:
+        terms = vectorizer.get_feature_names_out()
+        hashes = np.fromiter((term_hash(t) for t in terms), dtype=np.uint64, count=len(terms))
+        order = np.argsort(hashes, kind="stable")
+        if len(np.unique(hashes)) != len(hashes):
+            raise ValueError("64-bit term hash collision – cannot export this vocabulary")
+        arrays["term_hashes"] = hashes[order]
+        arrays["term_columns"] = order.astype(np.int32)
+        manifest["kind"] = "tfidf"
+        manifest["tfidf"] = {
+            "norm": vectorizer.norm,
+            "use_idf": vectorizer.use_idf,
+            "sublinear_tf": vectorizer.sublinear_tf,
+            "binary": vectorizer.binary,
+        }
+        manifest["n_features"] = len(terms)
+        if vectorizer.use_idf:
+            arrays["idf"] = np.asarray(idf_of(vectorizer), dtype=np.float32)
+        with open(os.path.join(out, "terms.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(terms))
+
+    manifest["arrays"] = {}
+    for name, arr in arrays.items():
+        np.save(os.path.join(out, f"{name}.npy"), arr)
+        manifest["arrays"][name] = {"file": f"{name}.npy", "shape": list(arr.shape), "dtype": str(arr.dtype)}
+    with open(os.path.join(out, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return out
+
+class CompactVectorizer:
+    """transform(texts) → CSR matrix identical to the exported sklearn vectorizer's."""
+
+    def __init__(self, manifest, arrays):
+        self.kind = manifest["kind"]
+        self.analyzer_params = manifest["analyzer"]
+        params = dict(manifest["analyzer"], ngram_range=tuple(manifest["analyzer"]["ngram_range"]))
+        self.n_features = manifest["n_features"]
+        if self.kind == "hashing":
+            self._hashing = HashingVectorizer(**params, **manifest["hashing"])
+            return
+        self._analyze = TfidfVectorizer(**params).build_analyzer()
+        self.settings = manifest["tfidf"]
+        self.term_hashes = arrays["term_hashes"]
+        self.term_columns = arrays["term_columns"]
+        self.idf = arrays.get("idf")
+
+    def lookup(self, tokens):
+        """Column index per token, -1 where the token is not in the vocabulary."""
+        h = np.fromiter((term_hash(t) for t in tokens), dtype=np.uint64, count=len(tokens))
+        pos = np.searchsorted(self.term_hashes, h)
+        pos[pos == len(self.term_hashes)] = 0
+        return np.where(self.term_hashes[pos] == h, self.term_columns[pos], -1)
+
+    def transform(self, texts):
+        if self.kind == "hashing":
+            return self._hashing.transform(texts)
+        tokens, lengths = [], []
+        for text in texts:
+            toks = self._analyze(text)
+            tokens.extend(toks)
+            lengths.append(len(toks))
+        cols = self.lookup(tokens)
+        rows = np.repeat(np.arange(len(lengths)), lengths)
+        keep = cols >= 0
+        X = sp.csr_matrix(
+            (np.ones(int(keep.sum()), dtype=np.float64), (rows[keep], cols[keep])),
+            shape=(len(lengths), self.n_features)
+        )
+        X.sum_duplicates()
+        if self.settings["binary"]:
+            X.data[:] = 1.0
+        if self.settings["sublinear_tf"]:
+            np.log(X.data, X.data)
+            X.data += 1.0
+        if self.idf is not None:
+            X.data *= self.idf[X.indices]
+        if self.settings["norm"]:
+            X = normalize(X, norm=self.settings["norm"], copy=False)
+        return X
+
+class CompactLinearModel:
+    """predict / predict_proba / decision_function from float32 weights."""
+
+    def __init__(self, manifest, arrays):
+        self.coef_ = arrays["coef"]
+        self.intercept_ = arrays["intercept"]
+        self.classes_ = np.asarray(manifest["classes"])
+        self.proba_kind = manifest["proba"]
+
+    def decision_function(self, X):
+        scores = np.asarray(X @ self.coef_.T) + self.intercept_
+        return scores.ravel() if scores.shape[1] == 1 else scores
+
+    def predict(self, X):
+        scores = self.decision_function(X)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+    def predict_proba(self, X):
+        scores = self.decision_function(X)
+        if self.proba_kind == "binary":
+            p = expit(scores)
+            return np.column_stack([1 - p, p])
+        if self.proba_kind == "softmax":
+            scores = scores - scores.max(axis=1, keepdims=True)
+            e = np.exp(scores)
+            return e / e.sum(axis=1, keepdims=True)
+        p = expit(scores)
+        total = p.sum(axis=1, keepdims=True)
+        total[total == 0] = 1.0
+        return p / total
+
+def has_compact(model_dir):
+    return os.path.exists(os.path.join(model_dir, COMPACT_DIR, "manifest.json"))
+
+def load_compact(model_dir, mmap=True):
+    """(model, vectorizer, label_mapping) backed by memory-mapped arrays."""
+    base = os.path.join(model_dir, COMPACT_DIR)
+    with open(os.path.join(base, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT or manifest.get("version") != VERSION:
+        raise ValueError(f"Unsupported compact bundle: {manifest.get('format')} v{manifest.get('version')}")
+    arrays = {
+        name: np.load(os.path.join(base, meta["file"]), mmap_mode="r" if mmap else None)
+        for name, meta in manifest["arrays"].items()
+    }
+    label_mapping = None
+    if manifest.get("label_mapping"):
+        label_mapping = {int(k): v for k, v in manifest["label_mapping"].items()}
+    return CompactLinearModel(manifest, arrays), CompactVectorizer(manifest, arrays), label_mapping
+
+def _load_joblib(model_dir):
+    import joblib
+    model = joblib.load(os.path.join(model_dir, "model.joblib"))
+    vectorizer = joblib.load(os.path.join(model_dir, "vectorizer.joblib"))
+    mapping_path = os.path.join(model_dir, "label_mapping.json")
+    label_mapping = None
+    if os.path.exists(mapping_path):
+        with open(mapping_path, encoding="utf-8") as f:
+            label_mapping = {int(k): v for k, v in json.load(f).items()}
+    return model, vectorizer, label_mapping
+
+def check_parity(model_dir, texts=None, atol=1e-5):
+    """Max |Δproba| and label agreement between the joblib and compact bundles."""
+    model, vectorizer, _ = _load_joblib(model_dir)
+    c_model, c_vec, _ = load_compact(model_dir)
+    if texts is None:
+        texts = ["", "Great product!", "The service was terrible.", "ok I guess, mixed feelings"]
+        if hasattr(vectorizer, "get_feature_names_out"):
+            terms = list(vectorizer.get_feature_names_out())
+            texts += [" ".join(terms[i:i + 7]) for i in range(0, len(terms), 7)]
+    ref = model.predict_proba(vectorizer.transform(texts))
+    got = c_model.predict_proba(c_vec.transform(texts))
+    same = bool((model.predict(vectorizer.transform(texts)) == c_model.predict(c_vec.transform(texts))).all())
+    max_diff = float(np.abs(ref - got).max())
+    return {"texts": len(texts), "max_abs_diff": max_diff, "labels_match": same, "ok": same and max_diff <= atol}
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] not in ("export", "check"):
+        sys.exit("usage: python compact_model.py export|check <model_dir>")
+    cmd, model_dir = sys.argv[1:]
+    if cmd == "export":
+        model, vectorizer, label_mapping = _load_joblib(model_dir)
+        print("📦 Wrote", export_compact(model_dir, vectorizer, model, label_mapping))
+    print(check_parity(model_dir))
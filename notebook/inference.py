@@ -6,17 +6,88 @@ This script defines how SageMaker should:
 - Handle incoming data from the endpoint
 - Transform input and return predictions
 It is used during endpoint deployment, not during training.
+
+If the bundle contains a compact/ directory (see compact_model.py), model_fn
+memory-maps it instead of unpickling the joblib files. Set
+FEEDBACK_COMPACT_MODEL=0 to force the joblib path.
+
+For TF-IDF + linear bundles, model_fn also builds a linear_scorer.LinearScorer
+and predict_fn scores through it instead of sklearn's transform/predict
+stack. Set FEEDBACK_FAST_SCORER=0 to disable.
+
+Handler stages are timed with stage_metrics when FEEDBACK_METRICS=1; the
+histograms go to the container log (stdout) as CloudWatch EMF lines.
+stage_metrics.py and request_capture.py are optional: without them the
+handlers run untimed and uncaptured.
+With FEEDBACK_CAPTURE_FILE set, every request's texts and handler latency
+(input_fn → output_fn) are appended there for scripts/replay.py (see
+request_capture.py); a request that fails in predict_fn is captured with
+"ok": false.
+
+Request formats accepted by input_fn:
+- application/json  → {"text": "..."} (single) or a JSON array of strings /
+                      {"text": ...} objects, or {"instances": [...]} (batch)
+- application/jsonlines → one string or {"text": ...} object per line (batch)
+- text/csv          → one text per row, optional 'text' header (batch)
+
+A single {"text": ...} request keeps the original response shape ([label]).
+Batch requests get one {"label": ..., "proba": {...}} dict per input row,
+in the same order.
 """
 import joblib
 import os
+import io
+import csv
 import json
+import time
+
+# Instrumentation is optional: the handlers must load even when only this file
+# (and the model) is deployed, like linear_scorer.py below
+try:
+    from stage_metrics import span, timed, enabled, start_exporter
+except ImportError:
+    import contextlib
+
+    def span(stage):
+        return contextlib.nullcontext()
+
+    def timed(stage):
+        return lambda fn: fn
+
+    def enabled():
+        return False
+
+    def start_exporter(*args, **kwargs):
+        return None
+
+try:
+    import request_capture
+except ImportError:
+    request_capture = None
+
+class UnsupportedContentType(ValueError):
+    """input_fn got a content type it does not decode (other ValueErrors mean a malformed body)."""
+
+JSON_TYPES = ("application/json",)
+JSONLINES_TYPES = ("application/jsonlines", "application/x-jsonlines", "application/jsonl")
+CSV_TYPES = ("text/csv",)
 
 def model_fn(model_dir):
     print(f"[model_fn] Loading artifacts from: {model_dir}")
+    if enabled():
+        start_exporter("endpoint")
+
+    if os.environ.get("FEEDBACK_COMPACT_MODEL", "1") != "0" and \
+            os.path.exists(os.path.join(model_dir, "compact", "manifest.json")):
+        from compact_model import load_compact
+        model, vectorizer, label_mapping = load_compact(model_dir)
+        if label_mapping is None:
+            label_mapping = _load_label_mapping(model_dir)
+        print("[model_fn] Compact memory-mapped bundle loaded")
+        return _with_scorer(model, vectorizer, label_mapping)
 
     model_path = os.path.join(model_dir, "model.joblib")
     vec_path = os.path.join(model_dir, "vectorizer.joblib")
-    mapping_path = os.path.join(model_dir, "label_mapping.json")
 
     # Check for existence and log results
     for path in [model_path, vec_path]:
@@ -31,28 +102,153 @@ def model_fn(model_dir):
     vectorizer = joblib.load(vec_path)
     print("[model_fn] Vectorizer loaded successfully")
 
-    label_mapping = None
-    if os.path.exists(mapping_path):
-        with open(mapping_path, "r") as f:
-            label_mapping = {int(k): v for k, v in json.load(f).items()}
-        print("[model_fn] Label mapping loaded")
-    else:
+    return _with_scorer(model, vectorizer, _load_label_mapping(model_dir))
+
+def _with_scorer(model, vectorizer, label_mapping):
+    """Append a LinearScorer fast path to the bundle when the model supports it."""
+    if os.environ.get("FEEDBACK_FAST_SCORER", "1") == "0":
+        return model, vectorizer, label_mapping
+    try:
+        from linear_scorer import LinearScorer
+    except ImportError:
+        print("[model_fn] linear_scorer.py not packaged — using sklearn scoring")
+        return model, vectorizer, label_mapping
+    scorer = LinearScorer.for_bundle(model, vectorizer)
+    if scorer is None:
+        return model, vectorizer, label_mapping
+    print("[model_fn] Linear fast-path scorer ready")
+    return model, vectorizer, label_mapping, scorer
+
+def _load_label_mapping(model_dir):
+    mapping_path = os.path.join(model_dir, "label_mapping.json")
+    if not os.path.exists(mapping_path):
         print("[model_fn] No label mapping found — returning numeric predictions")
+        return None
+    with open(mapping_path, "r") as f:
+        label_mapping = {int(k): v for k, v in json.load(f).items()}
+    print("[model_fn] Label mapping loaded")
+    return label_mapping
 
-    return model, vectorizer, label_mapping
+def _text_of(item):
+    """Pull the text out of one record (plain string or {"text": ...})."""
+    if isinstance(item, dict):
+        item = item.get("text", "")
+    return "" if item is None else str(item)
 
+def _parse_csv(body):
+    rows = [r for r in csv.reader(io.StringIO(body)) if r]
+    if not rows:
+        return []
+    header = [c.strip().lower() for c in rows[0]]
+    col = 0
+    if "text" in header:
+        col = header.index("text")
+        rows = rows[1:]
+    return [r[col] if col < len(r) else "" for r in rows]
+
+@timed("inference.input_fn")
 def input_fn(request_body, request_content_type):
+    """
+    Decode the request into either a single text (str) or a list of texts.
+    """
     print(f"[input_fn] Received request with content_type: {request_content_type}")
-    return request_body
+    started = time.perf_counter()
+    data = _decode(request_body, request_content_type)
+    if request_capture is not None:
+        request_capture.begin(data, started)
+    return data
+
+def _decode(request_body, request_content_type):
+    if isinstance(request_body, (bytes, bytearray)):
+        request_body = request_body.decode("utf-8")
+    content_type = (request_content_type or "application/json").split(";")[0].strip().lower()
+
+    if content_type in JSON_TYPES:
+        try:
+            data = json.loads(request_body)
+        except ValueError:
+            # Not JSON after all → treat the body as one raw text
+            return request_body
+        if isinstance(data, dict):
+            if "instances" in data:
+                data = data["instances"]
+            elif isinstance(data.get("text"), list):
+                data = data["text"]
+            else:
+                return _text_of(data)
+        if isinstance(data, list):
+            return [_text_of(x) for x in data]
+        return _text_of(data)
+
+    if content_type in JSONLINES_TYPES:
+        return [_text_of(json.loads(line)) for line in request_body.splitlines() if line.strip()]
+
+    if content_type in CSV_TYPES:
+        return _parse_csv(request_body)
+
+    raise UnsupportedContentType(f"Unsupported content type: {request_content_type}")
 
+@timed("inference.predict_fn")
 def predict_fn(input_data, model_bundle):
-    print(f"[predict_fn] Received input: {input_data}")
-    model, vectorizer, label_mapping = model_bundle
-    transformed = vectorizer.transform([input_data])
-    prediction = model.predict(transformed)
+    try:
+        return _predict(input_data, model_bundle)
+    except Exception:
+        # output_fn never runs for this request: capture it as failed here
+        if request_capture is not None:
+            request_capture.finish("endpoint", ok=False)
+        raise
+
+def _predict(input_data, model_bundle):
+    model, vectorizer, label_mapping = model_bundle[:3]
+    scorer = model_bundle[3] if len(model_bundle) > 3 else None
+    single = isinstance(input_data, str)
+    texts = [input_data] if single else list(input_data)
+    print(f"[predict_fn] Received {len(texts)} record(s)")
+    if not texts:
+        return []
+
+    probas = None
+    if scorer is not None:
+        # idf×coef fast path, whole batch at once
+        with span("inference.score"):
+            prediction, probas = scorer.score(texts)
+    else:
+        # One sparse matrix for the whole batch
+        with span("inference.vectorize"):
+            transformed = vectorizer.transform(texts)
+        with span("inference.score"):
+            prediction = model.predict(transformed)
+
     if label_mapping:
-        result = [label_mapping[p] for p in prediction]
+        labels = [label_mapping[int(p)] for p in prediction]
     else:
-        result = prediction.tolist()
-    print(f"[predict_fn] Returning prediction: {result}")
+        labels = prediction.tolist()
+
+    if single:
+        # Original single-text contract: a one-element list of labels
+        print(f"[predict_fn] Returning prediction: {labels}")
+        return labels
+
+    classes = [label_mapping[int(c)] if label_mapping else str(c) for c in model.classes_]
+    if scorer is None and hasattr(model, "predict_proba"):   # the fast path already returned probas
+        with span("inference.score"):
+            probas = model.predict_proba(transformed)
+    result = []
+    for i, label in enumerate(labels):
+        row = {"label": label, "proba": None}
+        if probas is not None:
+            row["proba"] = {c: round(float(p), 6) for c, p in zip(classes, probas[i])}
+        result.append(row)
+    print(f"[predict_fn] Returning {len(result)} predictions")
     return result
+
+@timed("inference.output_fn")
+def output_fn(prediction, accept):
+    accept = (accept or "application/json").split(";")[0].strip().lower()
+    if accept in JSONLINES_TYPES:
+        body = "\n".join(json.dumps(row) for row in prediction)
+    else:
+        body, accept = json.dumps(prediction), "application/json"
+    if request_capture is not None:
+        request_capture.finish("endpoint")
+    return body, accept
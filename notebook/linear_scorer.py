@@ -0,0 +1,234 @@
+"""
+linear_scorer.py
+
+Fast path for TF-IDF + linear classifier bundles.
+
+TF-IDF followed by a linear model is
+
+    score_k(doc) = sum_t tf(t) * idf(t) * coef[k, t] / ||tf * idf|| + intercept[k]
+
+so idf(t) * coef[k, t] can be folded into one weight row per term ahead of
+time. LinearScorer tokenizes with the vectorizer's own analyzer rules, looks
+the terms up, and needs only a few NumPy reductions per batch instead of the
+full sklearn transform → predict_proba stack. Results match sklearn to
+float rounding (tests/test_linear_scorer.py; check_parity for a saved bundle).
+
+    python linear_scorer.py ../model_bundle    # parity + single-text latency vs sklearn
+"""
+import re
+import sys
+import time
+
+import numpy as np
+from scipy.special import expit
+
+from compact_model import idf_of, proba_kind
+
+def build_analyzer(vectorizer):
+    """
+    Same tokens as vectorizer.build_analyzer() for the plain word analyzer
+    (lowercase → token_pattern → word n-grams), without sklearn's per-call
+    indirection. Anything more exotic uses sklearn's own analyzer.
+    """
+    if (vectorizer.analyzer != "word" or vectorizer.strip_accents or vectorizer.stop_words
+            or vectorizer.preprocessor is not None or vectorizer.tokenizer is not None):
+        return vectorizer.build_analyzer()
+
+    pattern = re.compile(vectorizer.token_pattern)
+    if pattern.groups > 1:
+        return vectorizer.build_analyzer()
+    lowercase = vectorizer.lowercase
+    min_n, max_n = vectorizer.ngram_range
+
+    def analyze(doc):
+        if isinstance(doc, bytes):
+            doc = doc.decode(vectorizer.encoding, vectorizer.decode_error)
+        if lowercase:
+            doc = doc.lower()
+        tokens = pattern.findall(doc)
+        if max_n == 1:
+            return tokens
+        original, lo = tokens, min_n
+        if lo == 1:
+            tokens = list(original)
+            lo = 2
+        else:
+            tokens = []
+        n_tokens = len(original)
+        for n in range(lo, min(max_n + 1, n_tokens + 1)):
+            for i in range(n_tokens - n + 1):
+                tokens.append(" ".join(original[i:i + n]))
+        return tokens
+
+    return analyze
+
+class LinearScorer:
+    """
+    Scores raw texts with folded idf×coef weights. Build it with
+    from_estimators() (sklearn TfidfVectorizer + linear model) or
+    from_compact() (compact_model bundle, hash lookup instead of a dict).
+    """
+
+    def __init__(self, analyzer, lookup, weights, idf, intercept, classes, proba_kind,
+                 norm="l2", sublinear_tf=False, binary=False):
+        self.analyzer = analyzer
+        self.lookup = lookup                  # list of tokens → array of columns (-1 = unknown)
+        self.weights = weights                # (n_terms, n_scores) = idf[:, None] * coef.T
+        self.idf = idf
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+        self.proba_kind = proba_kind
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self.binary = binary
+
+    @staticmethod
+    def supports(vectorizer, model):
+        """True for a fitted TF-IDF vectorizer (sklearn or compact) + linear classifier."""
+        if not hasattr(model, "coef_"):
+            return False
+        if getattr(vectorizer, "kind", None) == "tfidf":
+            return vectorizer.settings["norm"] in ("l2", "l1", None)
+        return hasattr(vectorizer, "vocabulary_") and vectorizer.norm in ("l2", "l1", None)
+
+    @classmethod
+    def for_bundle(cls, model, vectorizer):
+        """Scorer for a loaded (model, vectorizer) pair, or None if unsupported."""
+        if not cls.supports(vectorizer, model):
+            return None
+        if getattr(vectorizer, "kind", None) == "tfidf":
+            return cls.from_compact(model, vectorizer)
+        return cls.from_estimators(vectorizer, model)
+
+    @classmethod
+    def from_estimators(cls, vectorizer, model):
+        vocab = vectorizer.vocabulary_
+        get = vocab.get
+        n_terms = len(vocab)
+        idf = np.asarray(idf_of(vectorizer), dtype=np.float64) if vectorizer.use_idf else np.ones(n_terms)
+        coef = np.asarray(model.coef_, dtype=np.float64)
+
+        def lookup(tokens):
+            return np.fromiter((get(t, -1) for t in tokens), dtype=np.int64, count=len(tokens))
+
+        return cls(
+            build_analyzer(vectorizer), lookup, np.ascontiguousarray(idf[:, None] * coef.T), idf,
+            model.intercept_, model.classes_, proba_kind(model, len(model.classes_)),
+            vectorizer.norm, vectorizer.sublinear_tf, vectorizer.binary
+        )
+
+    @classmethod
+    def from_compact(cls, model, vectorizer):
+        """From compact_model.load_compact() objects (memory-mapped arrays)."""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        settings = vectorizer.settings
+        n_terms = vectorizer.n_features
+        idf = np.asarray(vectorizer.idf, dtype=np.float64) if vectorizer.idf is not None else np.ones(n_terms)
+        coef = np.asarray(model.coef_, dtype=np.float64)
+        params = dict(vectorizer.analyzer_params, ngram_range=tuple(vectorizer.analyzer_params["ngram_range"]))
+        return cls(
+            build_analyzer(TfidfVectorizer(**params)), vectorizer.lookup,
+            np.ascontiguousarray(idf[:, None] * coef.T), idf,
+            model.intercept_, model.classes_, model.proba_kind,
+            settings["norm"], settings["sublinear_tf"], settings["binary"]
+        )
+
+    def decision_function(self, texts):
+        n_docs = len(texts)
+        tokens, lengths = [], []
+        for text in texts:
+            toks = self.analyzer(text)
+            tokens.extend(toks)
+            lengths.append(len(toks))
+        cols = self.lookup(tokens)
+        rows = np.repeat(np.arange(n_docs), lengths)
+        known = cols >= 0
+        rows, cols = rows[known], cols[known]
+
+        # term frequency per (doc, term)
+        n_terms = self.weights.shape[0]
+        pairs, tf = np.unique(rows * n_terms + cols, return_counts=True)
+        rows, cols = pairs // n_terms, pairs % n_terms
+        tf = tf.astype(np.float64)
+        if self.binary:
+            tf[:] = 1.0
+        if self.sublinear_tf:
+            tf = 1.0 + np.log(tf)
+
+        n_scores = self.weights.shape[1]
+        contrib = tf[:, None] * self.weights[cols]
+        scores = np.empty((n_docs, n_scores))
+        for k in range(n_scores):
+            scores[:, k] = np.bincount(rows, weights=contrib[:, k], minlength=n_docs)
+
+        if self.norm:
+            w = tf * self.idf[cols]
+            if self.norm == "l2":
+                norms = np.sqrt(np.bincount(rows, weights=w * w, minlength=n_docs))
+            else:
+                norms = np.bincount(rows, weights=np.abs(w), minlength=n_docs)
+            norms[norms == 0] = 1.0
+            scores /= norms[:, None]
+        scores += self.intercept
+        return scores.ravel() if n_scores == 1 else scores
+
+    def predict_proba(self, texts):
+        scores = self.decision_function(texts)
+        if self.proba_kind == "binary":
+            p = expit(scores)
+            return np.column_stack([1 - p, p])
+        if self.proba_kind == "softmax":
+            e = np.exp(scores - scores.max(axis=1, keepdims=True))
+            return e / e.sum(axis=1, keepdims=True)
+        p = expit(scores)
+        total = p.sum(axis=1, keepdims=True)
+        total[total == 0] = 1.0
+        return p / total
+
+    def predict(self, texts):
+        scores = self.decision_function(texts)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+    def score(self, texts):
+        """(labels, probabilities) from a single pass."""
+        proba = self.predict_proba(texts)
+        return self.classes_[proba.argmax(axis=1)], proba
+
+def check_parity(vectorizer, model, texts, atol=1e-6):
+    """Compare LinearScorer with the sklearn pipeline on `texts`."""
+    scorer = LinearScorer.from_estimators(vectorizer, model)
+    X = vectorizer.transform(texts)
+    ref = model.predict_proba(X)
+    got = scorer.predict_proba(texts)
+    labels_match = bool((model.predict(X) == scorer.predict(texts)).all())
+    max_diff = float(np.abs(ref - got).max()) if len(texts) else 0.0
+    return {"texts": len(texts), "max_abs_diff": max_diff, "labels_match": labels_match,
+            "ok": labels_match and max_diff <= atol}
+
+def _time_per_call(fn, repeat=300):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+if __name__ == "__main__":
+    import os
+    import joblib
+
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else "."
+    model = joblib.load(os.path.join(model_dir, "model.joblib"))
+    vectorizer = joblib.load(os.path.join(model_dir, "vectorizer.joblib"))
+    terms = list(vectorizer.get_feature_names_out())
+    texts = ["", "Great product!", "The service was TERRIBLE, never again.", "ok I guess... mixed feelings"]
+    texts += [" ".join(terms[i:i + 9]) for i in range(0, len(terms), 9)]
+    print(check_parity(vectorizer, model, texts))
+
+    scorer = LinearScorer.from_estimators(vectorizer, model)
+    one = ["The delivery was late but the product itself is great"]
+    sk_us = _time_per_call(lambda: model.predict_proba(vectorizer.transform(one)))
+    fast_us = _time_per_call(lambda: scorer.predict_proba(one))
+    print(f"⏱️ single text: sklearn {sk_us:.0f} µs, fast path {fast_us:.0f} µs ({sk_us / fast_us:.1f}x)")
@@ -0,0 +1,95 @@
+"""
+request_capture.py
+
+Opt-in capture of scoring requests (text, timestamp, latency) to a JSONL
+file, so real traffic can be replayed later with scripts/replay.py.
+
+    from request_capture import record
+    record(text, latency_ms=12.5, source="app")
+
+One line per request:
+
+    {"ts": 1718000000.123, "source": "endpoint", "text": "...", "latency_ms": 3.1, "ok": true}
+
+Batch requests carry "texts": [...] instead of "text". Each line is written
+with a single write() on an O_APPEND descriptor, so several processes (the
+SageMaker model-server workers, the app) can share one file without
+interleaving lines.
+
+Handler-style code (input_fn → predict_fn → output_fn) uses begin() when the
+request is decoded and finish() when the response is encoded; the pending
+request is kept per thread.
+
+Disabled unless FEEDBACK_CAPTURE_FILE is set or enable() is called.
+
+Environment:
+- FEEDBACK_CAPTURE_FILE=path   → append captured requests there
+- FEEDBACK_CAPTURE_SAMPLE=0.1  → keep only this fraction of requests (default 1)
+"""
+import os
+import json
+import time
+import random
+import threading
+
+SAMPLE = float(os.environ.get("FEEDBACK_CAPTURE_SAMPLE", "1"))
+
+_path = os.environ.get("FEEDBACK_CAPTURE_FILE") or None
+_fd = None
+_lock = threading.Lock()
+_pending = threading.local()
+
+def enabled():
+    return _path is not None
+
+def enable(path):
+    """Start capturing to path (None stops capturing)."""
+    global _path, _fd
+    with _lock:
+        if _fd is not None:
+            os.close(_fd)
+            _fd = None
+        _path = path or None
+
+def _write(line):
+    global _fd
+    with _lock:
+        if _path is None:
+            return
+        if _fd is None:
+            parent = os.path.dirname(_path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            _fd = os.open(_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        os.write(_fd, line)
+
+def record(texts, latency_ms, source, ok=True, ts=None):
+    """Append one request: a single text (str) or a batch (list of texts)."""
+    if _path is None or (SAMPLE < 1 and random.random() >= SAMPLE):
+        return
+    event = {"ts": round(time.time() if ts is None else ts, 6), "source": source}
+    if isinstance(texts, str):
+        event["text"] = texts
+    else:
+        event["texts"] = list(texts)
+    event["latency_ms"] = round(latency_ms, 3)
+    event["ok"] = ok
+    _write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+
+def begin(texts, started):
+    """Remember this thread's decoded request; started is its time.perf_counter()."""
+    if _path is not None:
+        _pending.request = (texts, started, time.time())
+
+def take():
+    """Forget (and return) this thread's pending request, if any."""
+    request = getattr(_pending, "request", None)
+    _pending.request = None
+    return request
+
+def finish(source, ok=True):
+    """Record this thread's pending request with the latency since begin()."""
+    request = take()
+    if request is not None:
+        texts, started, ts = request
+        record(texts, (time.perf_counter() - started) * 1000, source, ok, ts)
@@ -2,17 +2,33 @@ import argparse
 import os
 import sys
 import json
+import time
 import joblib
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.utils import check_random_state
+from compact_model import export_compact
+
+try:
+    import resource                 # Unix only; used for the peak-RSS printout
+except ImportError:
+    resource = None
 
 def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("--train", type=str, default="/opt/ml/input/data/train/train_data.csv")
     parser.add_argument("--val", type=str, default="/opt/ml/input/data/val/val.csv")
     parser.add_argument("--model-dir", type=str, default=os.environ.get("SM_MODEL_DIR", "/opt/ml/model"))
+    # batch = TF-IDF + LogisticRegression in memory; streaming = hashing + SGD partial_fit over chunks
+    parser.add_argument("--mode", choices=["batch", "streaming"], default="batch")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--n-features", type=int, default=2 ** 20)
+    parser.add_argument("--warm-start", type=str, default=None,
+                        help="existing streaming model dir to continue training from")
+    parser.add_argument("--no-compact", action="store_true",
+                        help="skip the memory-mapped compact/ export next to the joblib files")
     return parser.parse_args()
 
 def normalize_headers(df: pd.DataFrame) -> pd.DataFrame:
@@ -24,8 +40,118 @@ def normalize_headers(df: pd.DataFrame) -> pd.DataFrame:
     )
     return df
 
+def peak_rss_mb():
+    """Peak RSS of this process in MB, or None where the resource module is missing (Windows)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def with_rss(metrics):
+    rss = peak_rss_mb()
+    return metrics if rss is None else {**metrics, "peak_rss_mb": rss}
+
+def save_bundle(model_dir, vectorizer, clf, label2id, compact=True):
+    os.makedirs(model_dir, exist_ok=True)
+    joblib.dump(vectorizer, os.path.join(model_dir, "vectorizer.joblib"))
+    joblib.dump(clf, os.path.join(model_dir, "model.joblib"))
+    id2label = {i: k for k, i in label2id.items()} if label2id is not None else None
+    if id2label is not None:
+        # inference.model_fn expects {id: label}
+        with open(os.path.join(model_dir, "label_mapping.json"), "w", encoding="utf-8") as f:
+            json.dump({str(i): k for i, k in id2label.items()}, f)
+    if compact:
+        print("📦 Compact bundle:", export_compact(model_dir, vectorizer, clf, id2label))
+    print("✅ Saved model artifacts to:", model_dir)
+
+def scan_labels(path, label_col, chunksize):
+    """One cheap pass over the label column: distinct values and row count."""
+    labels, rows = set(), 0
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        chunk = normalize_headers(chunk)
+        if label_col not in chunk.columns:
+            sys.exit(f"❌ Column mismatch: {path} missing '{label_col}'")
+        values = chunk[label_col].dropna().astype(str).str.strip()
+        labels.update(values.unique().tolist())
+        rows += len(values)
+    return labels, rows
+
+def iter_chunks(path, chunksize, text_col, label_col, label2id, rng=None):
+    """Yield (texts, int labels) per chunk, shuffled within the chunk when rng is given."""
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        chunk = normalize_headers(chunk)
+        missing = [c for c in (text_col, label_col) if c not in chunk.columns]
+        if missing:
+            sys.exit(f"❌ Column mismatch: {path} missing {missing}")
+        chunk = chunk.dropna(subset=[text_col, label_col])
+        if rng is not None:
+            chunk = chunk.iloc[rng.permutation(len(chunk))]
+        y = chunk[label_col].astype(str).str.strip()
+        if label2id is not None:
+            unseen = set(y) - set(label2id)
+            if unseen:
+                sys.exit(f"❌ {path} contains labels unknown to the model: {sorted(unseen)}")
+            y = y.map(label2id)
+        yield chunk[text_col].astype(str), y.astype(float).astype(int)
+
+def train_streaming(args):
+    text_col, label_col = "text", "label"
+    labels, n_rows = scan_labels(args.train, label_col, args.chunksize)
+    print("📊 Train size:", n_rows, "| labels seen:", sorted(labels))
+
+    if args.warm_start:
+        print("♻️ Warm-starting from:", args.warm_start)
+        clf = joblib.load(os.path.join(args.warm_start, "model.joblib"))
+        vectorizer = joblib.load(os.path.join(args.warm_start, "vectorizer.joblib"))
+        if not hasattr(clf, "partial_fit") or not isinstance(vectorizer, HashingVectorizer):
+            sys.exit("❌ --warm-start needs a bundle produced by --mode streaming")
+        mapping_path = os.path.join(args.warm_start, "label_mapping.json")
+        label2id = None
+        if os.path.exists(mapping_path):
+            with open(mapping_path, encoding="utf-8") as f:
+                label2id = {v: int(k) for k, v in json.load(f).items()}
+        classes = clf.classes_
+    else:
+        vectorizer = HashingVectorizer(
+            ngram_range=(1, 2), n_features=args.n_features, alternate_sign=False, norm="l2"
+        )
+        clf = SGDClassifier(loss="log_loss", alpha=1e-5, random_state=42)
+        try:
+            label2id = None
+            classes = sorted({int(float(v)) for v in labels})
+        except ValueError:
+            label2id = {k: i for i, k in enumerate(sorted(labels))}
+            print("🔢 Label mapping:", label2id)
+            classes = sorted(label2id.values())
+    if len(classes) < 2:
+        sys.exit("❌ Training labels contain fewer than 2 classes.")
+
+    rng = check_random_state(42)
+    epoch_seconds = []
+    acc = None
+    for epoch in range(1, args.epochs + 1):
+        start = time.perf_counter()
+        for X, y in iter_chunks(args.train, args.chunksize, text_col, label_col, label2id, rng):
+            clf.partial_fit(vectorizer.transform(X), y, classes=classes)
+        epoch_seconds.append(round(time.perf_counter() - start, 2))
+
+        correct = total = 0
+        for X, y in iter_chunks(args.val, args.chunksize, text_col, label_col, label2id):
+            correct += int((clf.predict(vectorizer.transform(X)) == y.to_numpy()).sum())
+            total += len(y)
+        acc = correct / total if total else float("nan")
+        rss = peak_rss_mb()
+        print(f"⏱️ epoch {epoch}: {epoch_seconds[-1]}s, val acc {acc:.4f}"
+              + (f", peak RSS {rss} MB" if rss is not None else ""))
+
+    print(with_rss({"validation_accuracy": float(acc), "epoch_seconds": epoch_seconds}))
+    save_bundle(args.model_dir, vectorizer, clf, label2id, compact=not args.no_compact)
+
 def main():
     args = parse_args()
+    if args.mode == "streaming":
+        return train_streaming(args)
 
     # Load
     train_df = pd.read_csv(args.train)
@@ -88,19 +214,15 @@ def main():
     X_train_tfidf = vectorizer.fit_transform(X_train)
     X_val_tfidf   = vectorizer.transform(X_val)
 
+    start = time.perf_counter()
     clf = LogisticRegression(max_iter=200, random_state=42)
     clf.fit(X_train_tfidf, y_train)
+    fit_seconds = round(time.perf_counter() - start, 2)
 
     acc = clf.score(X_val_tfidf, y_val)
-    print({"validation_accuracy": float(acc)})
-
-    os.makedirs(args.model_dir, exist_ok=True)
-    joblib.dump(vectorizer, os.path.join(args.model_dir, "vectorizer.joblib"))
-    joblib.dump(clf, os.path.join(args.model_dir, "model.joblib"))
-    if label2id is not None:
-        with open(os.path.join(args.model_dir, "label_mapping.json"), "w", encoding="utf-8") as f:
-            json.dump(label2id, f)
-    print("✅ Saved model artifacts to:", args.model_dir)
+    print(with_rss({"validation_accuracy": float(acc), "fit_seconds": fit_seconds}))
+
+    save_bundle(args.model_dir, vectorizer, clf, label2id, compact=not args.no_compact)
 
 if __name__ == "__main__":
     main()
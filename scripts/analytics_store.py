@@ -0,0 +1,363 @@
+# scripts/analytics_store.py
+# Append-only Parquet store for scored feedback, hive-partitioned by month and
+# Source (month=2023-06/Source=Twitter/part-*.parquet). Rows are sorted by day
+# inside each file, so day filters skip row groups via Parquet statistics and
+# trend queries only read the columns they group on, never the raw text.
+# (Day × Source partitions meant ~16 rows per file on a year of synthetic
+# traffic; a month keeps files large enough to scan quickly.)
+#
+#   python scripts/analytics_store.py ingest data/reviews_analysis.csv --sentiment-col comprehend_sentiment --origin comprehend
+#   python scripts/analytics_store.py share --by Location --start 2023-06-01
+#   python scripts/analytics_store.py compact
+
+import os
+import json
+import uuid
+import hashlib
+import argparse
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+STORE_PATH = os.environ.get("FEEDBACK_ANALYTICS_PATH", "data/analytics")   # local dir or s3://bucket/prefix
+DATE_FORMAT = "%m/%d/%Y %H:%M"       # reviews.csv "Date/Time"
+UNKNOWN = "unknown"
+MAX_PARTITIONS = 10_000              # months × Sources touched by one append
+ROW_GROUP_ROWS = 64 * 1024
+
+LABEL = pa.dictionary(pa.int32(), pa.string())
+SCHEMA = pa.schema([
+    ("ID", pa.int64()),
+    ("timestamp", pa.timestamp("s")),
+    ("Location", LABEL),
+    ("User ID", pa.string()),
+    ("Text", pa.string()),
+    ("sentiment", LABEL),
+    ("origin", LABEL),                # comprehend / endpoint / app
+    ("key_phrases", pa.string()),
+    ("batch_id", pa.string()),
+    ("date", pa.date32()),
+    ("month", pa.string()),           # partition, "YYYY-MM"
+    ("Source", pa.string()),          # partition
+])
+PARTITIONING = ds.partitioning(pa.schema([("month", pa.string()), ("Source", pa.string())]), flavor="hive")
+GROUP_COLUMNS = ("date", "month", "Source", "Location", "origin")
+BATCHES_DIR = "_batches"            # one marker per keyed batch; "_" keeps it out of the dataset
+
+def _column(df, *names):
+    for name in names:
+        if name in df.columns:
+            return df[name]
+    return None
+
+def _parse_dates(values):
+    """reviews.csv timestamps first (fast path), anything else pandas can parse after."""
+    parsed = pd.to_datetime(values, format=DATE_FORMAT, errors="coerce")
+    rest = parsed.isna() & values.notna()
+    if rest.any():
+        parsed[rest] = pd.to_datetime(values[rest], errors="coerce", format="mixed")
+    return parsed
+
+def run_key(origin, content_sha256, version=""):
+    """Deterministic key for one job's output: origin + input content + model/service version."""
+    return f"{origin}-{content_sha256[:16]}-{hashlib.sha256(version.encode('utf-8')).hexdigest()[:8]}"
+
+def file_sha256(path, block=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _runs(positions):
+    """Sorted row positions → [[start, stop), ...]; a contiguous frame is a single pair."""
+    runs = []
+    for p in sorted(positions):
+        if runs and runs[-1][1] == p:
+            runs[-1][1] = p + 1
+        else:
+            runs.append([p, p + 1])
+    return runs
+
+def to_table(df, sentiment_col="sentiment", origin="app", key_phrases_col=None, batch_id=None):
+    """Scored rows (reviews.csv columns, 'text' or 'Text') → a table in SCHEMA."""
+    n = len(df)
+    stamps = _column(df, "Date/Time", "timestamp")
+    stamps = _parse_dates(stamps.astype("string")) if stamps is not None else pd.Series(pd.NaT, index=df.index)
+    # rows without a usable timestamp land in today's partition
+    stamps = stamps.fillna(pd.Timestamp.now("UTC").tz_localize(None).floor("s"))
+
+    def text_col(*names, default=None):
+        col = _column(df, *names)
+        if col is None:
+            return pa.array([default] * n, pa.string())
+        col = col.astype("string")
+        return pa.array(col.fillna(default) if default is not None else col, pa.string())
+
+    ids = _column(df, "ID")
+    ids = pd.to_numeric(ids, errors="coerce").astype("Int64") if ids is not None else pd.Series([None] * n, dtype="Int64")
+    sentiment = df[sentiment_col].astype("string").str.strip().str.lower().fillna(UNKNOWN)
+
+    columns = {
+        "ID": pa.array(ids, pa.int64()),
+        "timestamp": pa.array(stamps.dt.floor("s"), pa.timestamp("s")),
+        "Location": text_col("Location", default=UNKNOWN).dictionary_encode(),
+        "User ID": text_col("User ID"),
+        "Text": text_col("Text", "text", default=""),
+        "sentiment": pa.array(sentiment, pa.string()).dictionary_encode(),
+        "origin": pa.array([origin] * n, pa.string()).dictionary_encode(),
+        "key_phrases": text_col(key_phrases_col) if key_phrases_col else pa.array([None] * n, pa.string()),
+        "batch_id": pa.array([batch_id] * n, pa.string()),
+        "date": pa.array(stamps.dt.date, pa.date32()),
+        "month": pa.array(stamps.dt.strftime("%Y-%m"), pa.string()),
+        "Source": text_col("Source", default=UNKNOWN),
+    }
+    # one pass per partition on write, and tight per-row-group date ranges
+    return pa.table(columns, schema=SCHEMA).sort_by([("month", "ascending"), ("Source", "ascending"),
+                                                     ("date", "ascending")])
+
+class AnalyticsStore:
+    """
+    append() writes new files only (unique basename per call), so readers
+    never see partial overwrites and the store grows incrementally. A keyed
+    append (caller-supplied batch_id) is written at most once: after its
+    files land, a marker _batches/<batch_id>.json records it, and compact()
+    never touches markers. append_rows() builds on that for jobs that are
+    re-run after partial failures: only rows not stored yet are added.
+    Queries run through Arrow compute; date/Source filters prune
+    partitions and other filters use Parquet row-group statistics.
+    """
+
+    def __init__(self, root=STORE_PATH, filesystem=None):
+        if filesystem is None:
+            if root.startswith("s3://"):
+                filesystem, root = pafs.FileSystem.from_uri(root)
+            else:
+                filesystem = pafs.LocalFileSystem()
+                root = os.path.abspath(root)
+        self.fs = filesystem
+        self.root = root
+
+    def exists(self):
+        info = self.fs.get_file_info(self.root)
+        return info.type != pafs.FileType.NotFound
+
+    def dataset(self):
+        return ds.dataset(self.root, format="parquet", partitioning=PARTITIONING,
+                          schema=SCHEMA, filesystem=self.fs)
+
+    def _marker(self, batch_id):
+        return f"{self.root}/{BATCHES_DIR}/{batch_id}.json"
+
+    def has_batch(self, batch_id):
+        """True once a keyed append of batch_id has committed (one metadata lookup, no scan)."""
+        return self.fs.get_file_info(self._marker(batch_id)).type != pafs.FileType.NotFound
+
+    def _commit(self, batch_id, rows, positions=None):
+        marker = {"rows": rows}
+        if positions is not None:
+            marker["positions"] = _runs(positions)
+        path = self._marker(batch_id)
+        self.fs.create_dir(os.path.dirname(path), recursive=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with self.fs.open_output_stream(tmp) as out:
+            out.write(json.dumps(marker).encode("utf-8"))
+        self.fs.move(tmp, path)
+
+    def stored_positions(self, key):
+        """Row positions committed by append_rows(..., key) so far."""
+        selector = pafs.FileSelector(f"{self.root}/{BATCHES_DIR}", allow_not_found=True)
+        done = set()
+        for info in self.fs.get_file_info(selector):
+            if not (info.base_name.startswith(f"{key}.") and info.base_name.endswith(".json")):
+                continue
+            with self.fs.open_input_stream(info.path) as f:
+                for start, stop in json.loads(f.read()).get("positions", []):
+                    done.update(range(start, stop))
+        return done
+
+    def append(self, df, sentiment_col="sentiment", origin="app", key_phrases_col=None, batch_id=None,
+               positions=None):
+        """Append scored rows; returns (rows, batch_id).
+
+        Pass a deterministic batch_id (e.g. a hash of the upload) to make the
+        append idempotent: a batch that is already stored is skipped.
+        """
+        if not len(df):
+            return 0, None
+        keyed = batch_id is not None
+        if not keyed:
+            batch_id = uuid.uuid4().hex
+        elif self.has_batch(batch_id):
+            return 0, batch_id
+        table = to_table(df, sentiment_col, origin, key_phrases_col, batch_id)
+        ds.write_dataset(
+            table, self.root, format="parquet", partitioning=PARTITIONING, filesystem=self.fs,
+            basename_template=f"part-{batch_id}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore", max_partitions=MAX_PARTITIONS,
+            max_rows_per_group=ROW_GROUP_ROWS, min_rows_per_group=0,
+        )
+        if keyed:
+            self._commit(batch_id, table.num_rows, positions)
+        return table.num_rows, batch_id
+
+    def append_rows(self, df, key, sentiment_col="sentiment", origin="app", key_phrases_col=None, stored=None):
+        """
+        Append the rows of df (integer index = row position in the job's input)
+        not yet stored under key (see run_key). A re-run only adds rows that
+        failed before, so the dashboard never counts a row twice. stored: the
+        set from stored_positions(key), for callers appending chunk by chunk;
+        it is updated in place.
+        """
+        if stored is None:
+            stored = self.stored_positions(key)
+        new = df[~df.index.isin(list(stored))] if stored else df
+        if not len(new):
+            return 0, None
+        positions = [int(i) for i in new.index]
+        batch_id = f"{key}.{hashlib.sha256(json.dumps(_runs(positions)).encode('utf-8')).hexdigest()[:16]}"
+        rows, batch_id = self.append(new, sentiment_col, origin, key_phrases_col, batch_id=batch_id,
+                                     positions=positions)
+        stored.update(positions)
+        return rows, batch_id
+
+    def partitions(self):
+        """(month, Source, files, rows) per partition, from file metadata only."""
+        if not self.exists():
+            return pd.DataFrame(columns=["month", "Source", "files", "rows"])
+        stats = {}
+        for frag in self.dataset().get_fragments():
+            keys = ds.get_partition_keys(frag.partition_expression)
+            k = (keys.get("month"), keys.get("Source"))
+            files, rows = stats.get(k, (0, 0))
+            stats[k] = (files + 1, rows + frag.metadata.num_rows)
+        return pd.DataFrame(
+            [(m, s, f, r) for (m, s), (f, r) in sorted(stats.items())],
+            columns=["month", "Source", "files", "rows"]
+        )
+
+    @staticmethod
+    def filter_expr(start=None, end=None, sources=None, locations=None, origins=None):
+        expr = None
+
+        def both(e):
+            return e if expr is None else expr & e
+        # month bounds prune partitions, date bounds prune row groups
+        if start is not None:
+            start = pd.Timestamp(start)
+            expr = both(pc.field("month") >= start.strftime("%Y-%m"))
+            expr = both(pc.field("date") >= pa.scalar(start.date(), pa.date32()))
+        if end is not None:
+            end = pd.Timestamp(end)
+            expr = both(pc.field("month") <= end.strftime("%Y-%m"))
+            expr = both(pc.field("date") <= pa.scalar(end.date(), pa.date32()))
+        if sources:
+            expr = both(pc.field("Source").isin(list(sources)))
+        if locations:
+            expr = both(pc.field("Location").isin(list(locations)))
+        if origins:
+            expr = both(pc.field("origin").isin(list(origins)))
+        return expr
+
+    def sentiment_counts(self, by=("Source",), **filters):
+        """Arrow table: by..., sentiment, count – only the grouping columns are read."""
+        by = [by] if isinstance(by, str) else list(by)
+        unknown = [c for c in by if c not in GROUP_COLUMNS]
+        if unknown:
+            raise ValueError(f"Cannot group by {unknown}; choose from {GROUP_COLUMNS}")
+        if not self.exists():
+            return None
+        table = self.dataset().to_table(columns=by + ["sentiment"], filter=self.filter_expr(**filters))
+        counts = table.group_by(by + ["sentiment"]).aggregate([([], "count_all")])
+        return counts.rename_columns(by + ["sentiment", "count"])
+
+    def sentiment_share(self, by=("Source",), **filters):
+        """DataFrame: by..., sentiment, count, share (of the group's rows)."""
+        by = [by] if isinstance(by, str) else list(by)
+        counts = self.sentiment_counts(by, **filters)
+        if counts is None or counts.num_rows == 0:
+            return pd.DataFrame(columns=by + ["sentiment", "count", "share"])
+        # the aggregated table is tiny (groups × labels): finish in pandas
+        df = counts.to_pandas()
+        for col in by + ["sentiment"]:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype(str)
+        df["share"] = df["count"] / df.groupby(by)["count"].transform("sum")
+        return df.sort_values(by + ["sentiment"]).reset_index(drop=True)
+
+    def distinct(self, column, **filters):
+        """Sorted distinct values of a low-cardinality column (for filter widgets)."""
+        if not self.exists():
+            return []
+        table = self.dataset().to_table(columns=[column], filter=self.filter_expr(**filters))
+        values = pc.unique(table[column].combine_chunks())
+        if pa.types.is_dictionary(values.type):
+            values = values.cast(values.type.value_type)
+        return sorted(v for v in values.to_pylist() if v is not None)
+
+    def compact(self):
+        """Rewrite every partition that has several files as one file. Run it while nothing appends."""
+        if not self.exists():
+            return 0
+        by_dir = {}
+        for frag in self.dataset().get_fragments():
+            by_dir.setdefault(os.path.dirname(frag.path), []).append(frag)
+        rewritten = 0
+        for directory, frags in by_dir.items():
+            if len(frags) < 2:
+                continue
+            table = pa.concat_tables(f.to_table(schema=SCHEMA) for f in frags).sort_by("date")
+            table = table.drop_columns(["month", "Source"])       # stay in the path
+            path = f"{directory}/part-compact-{uuid.uuid4().hex}.parquet"
+            with self.fs.open_output_stream(path) as out:
+                pq.write_table(table, out, row_group_size=ROW_GROUP_ROWS)
+            for f in frags:
+                self.fs.delete_file(f.path)
+            rewritten += 1
+        return rewritten
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--root", default=STORE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_in = sub.add_parser("ingest", help="append a scored CSV")
+    p_in.add_argument("csv")
+    p_in.add_argument("--sentiment-col", default="sentiment")
+    p_in.add_argument("--key-phrases-col", default=None)
+    p_in.add_argument("--origin", default="app")
+
+    p_share = sub.add_parser("share", help="sentiment share per group")
+    p_share.add_argument("--by", nargs="+", default=["Source"], choices=GROUP_COLUMNS)
+    p_share.add_argument("--start", default=None)
+    p_share.add_argument("--end", default=None)
+    p_share.add_argument("--source", nargs="*", default=None)
+    p_share.add_argument("--location", nargs="*", default=None)
+
+    sub.add_parser("partitions", help="list partitions")
+    sub.add_parser("compact", help="merge small files per partition")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    store = AnalyticsStore(args.root)
+    if args.command == "ingest":
+        # keyed by file content: ingesting the same CSV again adds nothing
+        key = run_key(args.origin, file_sha256(args.csv), args.sentiment_col)
+        rows, batch = store.append_rows(pd.read_csv(args.csv), key, args.sentiment_col, args.origin,
+                                        args.key_phrases_col)
+        print(f"✅ Appended {rows} rows (batch {batch}) → {args.root}")
+    elif args.command == "share":
+        with pd.option_context("display.max_rows", 200, "display.width", 160):
+            print(store.sentiment_share(args.by, start=args.start, end=args.end,
+                                        sources=args.source, locations=args.location))
+    elif args.command == "partitions":
+        print(store.partitions().to_string(index=False))
+    else:
+        print(f"🧹 Compacted {store.compact()} partitions")
+
+if __name__ == "__main__":
+    main()
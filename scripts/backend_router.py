@@ -0,0 +1,333 @@
+# scripts/backend_router.py
+# Routes scoring calls between the SageMaker endpoint and the local model
+# bundle so tail latency stays bounded while the endpoint browns out:
+#
+# - a circuit breaker opens after too many failed or very slow endpoint
+#   calls and sends traffic to the local model until a probe call succeeds;
+# - a call still running after the hedge budget (the rolling p95 of endpoint
+#   latency, or FEEDBACK_HEDGE_MS) is answered by the local model instead;
+#   the endpoint call finishes in the background and still feeds the stats;
+# - every row comes back with a "backend" key saying who served it.
+#
+#   with BackendRouter(client.invoke, load_local_backend("model_bundle")) as router:
+#       rows = router.predict(texts)      # [{"label": ..., "proba": ..., "backend": "endpoint"}, ...]
+
+import io
+import os
+import sys
+import time
+import threading
+import contextlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+
+import numpy as np
+
+from endpoint_client import pack_batches, MAX_BATCH_RECORDS, MAX_PAYLOAD_BYTES, MAX_CONCURRENCY
+
+# inference.py ships with the endpoint code in notebook/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "notebook"))
+
+LOCAL_MODEL_DIR = os.environ.get("FEEDBACK_MODEL_DIR", "model_bundle")
+HEDGE_MS = os.environ.get("FEEDBACK_HEDGE_MS")   # fixed hedge budget; unset → rolling p95, 0 → no hedging
+HEDGE_MIN_MS = 50                     # floor for the p95 budget (fast endpoints would hedge on jitter)
+HEDGE_MAX_MS = 2_000                  # p95 budget cap, and slower calls count as failures
+LATENCY_WINDOW = 200                  # endpoint latencies kept for the p95
+MIN_LATENCY_SAMPLES = 20              # below this the budget is HEDGE_MAX_MS
+BREAKER_WINDOW = 20                   # recent calls the failure rate is taken over
+BREAKER_MIN_CALLS = 5
+BREAKER_FAILURE_RATE = 0.5
+BREAKER_COOLDOWN_S = 30               # open → half-open (one probe call)
+
+ENDPOINT = "endpoint"
+LOCAL_HEDGE = "local:hedge"           # endpoint slower than the hedge budget
+LOCAL_CIRCUIT = "local:circuit_open"  # endpoint not tried
+LOCAL_FALLBACK = "local:endpoint_error"
+LOCAL_BUSY = "local:endpoint_busy"    # every remote thread still waits on (hedged-away) endpoint calls
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+class CircuitBreaker:
+    """
+    closed → open once at least min_calls of the last `window` calls ran and
+    failure_rate of them failed. open → half-open after cooldown_s, when
+    allow() lets exactly one probe call through; the probe's outcome closes
+    the circuit or opens it again. Outcomes of calls started before the
+    circuit opened are ignored while it is open.
+    """
+
+    def __init__(self, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS, failure_rate=BREAKER_FAILURE_RATE,
+                 cooldown_s=BREAKER_COOLDOWN_S, clock=time.monotonic):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown_s = cooldown_s
+        self.clock = clock
+        self.state = "closed"
+        self.opens = 0
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """(allowed, is_probe) for a call about to start."""
+        with self._lock:
+            if self.state == "closed":
+                return True, False
+            if self.state == "open":
+                if self.clock() - self._opened_at < self.cooldown_s:
+                    return False, False
+                self.state = "half_open"
+                self._probing = False
+            if self._probing:
+                return False, False
+            self._probing = True
+            return True, True
+
+    def record(self, ok, probe=False):
+        with self._lock:
+            if probe:
+                self._probing = False
+                if ok:
+                    self.state = "closed"
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            if self.state != "closed":
+                return
+            self._outcomes.append(ok)
+            failures = len(self._outcomes) - sum(self._outcomes)
+            if len(self._outcomes) >= self.min_calls and failures >= self.failure_rate * len(self._outcomes):
+                self._open()
+
+    def _open(self):
+        self.state = "open"
+        self.opens += 1
+        self._opened_at = self.clock()
+        self._outcomes.clear()
+
+class LatencyWindow:
+    """Last `size` latencies (ms); percentile() is None until min_samples are in."""
+
+    def __init__(self, size=LATENCY_WINDOW, min_samples=MIN_LATENCY_SAMPLES):
+        self.min_samples = min_samples
+        self._values = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, ms):
+        with self._lock:
+            self._values.append(ms)
+
+    def percentile(self, q):
+        with self._lock:
+            if len(self._values) < self.min_samples:
+                return None
+            values = list(self._values)
+        return float(np.percentile(values, q))
+
+def _tag(rows, backend):
+    return [dict(r, backend=backend) if isinstance(r, dict) else {"label": r, "proba": None, "backend": backend}
+            for r in rows]
+
+class BackendRouter:
+    """
+    remote(batch) and local(batch) both return one row per text; remote
+    raises on failure. route(batch) serves one batch; predict(texts) packs
+    texts into endpoint-sized batches and routes them concurrently, like
+    EndpointClient.predict. Without a local backend nothing is hedged and
+    endpoint failures surface as before ({"error": ...} rows from predict,
+    exceptions from route).
+
+    Several routers may share one breaker (e.g. single-text and batch calls
+    to the same endpoint); each keeps its own latency window, since their
+    latencies are not comparable.
+
+    A router owns a thread pool: close() it (or use it as a context manager)
+    when done.
+    """
+
+    def __init__(self, remote, local=None, breaker=None, hedge_ms=HEDGE_MS, max_concurrency=MAX_CONCURRENCY,
+                 max_records=MAX_BATCH_RECORDS, max_bytes=MAX_PAYLOAD_BYTES):
+        self.remote = remote
+        self.local = local
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge_ms = None if hedge_ms is None else float(hedge_ms)
+        self.latency = LatencyWindow()
+        self.max_concurrency = max_concurrency
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.rows = {}
+        self.failed_rows = 0
+        self._lock = threading.Lock()
+        self._inflight = {}                 # call id → (started, probe) for endpoint calls still running
+        self._stuck = set()                 # ids already reported to the breaker as too slow
+        self._next_id = 0
+        # hedged-away calls keep running here, so they do not hold up new batches
+        self._remote_workers = 2 * max_concurrency
+        self._remote_pool = ThreadPoolExecutor(max_workers=self._remote_workers, thread_name_prefix="router-remote")
+
+    def budget_ms(self):
+        """Current hedge budget in ms (None → wait for the endpoint)."""
+        if self.local is None:
+            return None
+        if self.hedge_ms is not None:
+            return self.hedge_ms or None
+        p95 = self.latency.percentile(95)
+        return HEDGE_MAX_MS if p95 is None else min(max(p95, HEDGE_MIN_MS), HEDGE_MAX_MS)
+
+    def _submit_remote(self, batch, probe):
+        # timed from submission: waiting for a free remote thread is part of the endpoint's latency
+        started = time.perf_counter()
+        with self._lock:
+            call_id = self._next_id
+            self._next_id += 1
+            self._inflight[call_id] = (started, probe)
+        if not probe:
+            return self._remote_pool.submit(self._call_remote, batch, probe, call_id, started)
+        # a probe gets its own thread: the pool may still be full of calls hedged away during the outage
+        fut = Future()
+
+        def run():
+            try:
+                fut.set_result(self._call_remote(batch, probe, call_id, started))
+            except Exception as e:
+                fut.set_exception(e)
+        threading.Thread(target=run, daemon=True).start()
+        return fut
+
+    def _call_remote(self, batch, probe, call_id, started):
+        ok = False
+        try:
+            rows = self.remote(batch)
+            ms = (time.perf_counter() - started) * 1000
+            self.latency.add(ms)
+            ok = ms <= HEDGE_MAX_MS
+            return rows
+        finally:
+            with self._lock:
+                del self._inflight[call_id]
+                reported = call_id in self._stuck
+                self._stuck.discard(call_id)
+            if not reported:
+                self.breaker.record(ok, probe)
+
+    def _report_stuck(self):
+        """Count endpoint calls running past HEDGE_MAX_MS as failures now, not when (if) they return."""
+        now = time.perf_counter()
+        stuck = []
+        with self._lock:
+            for call_id, (started, probe) in self._inflight.items():
+                if call_id not in self._stuck and (now - started) * 1000 > HEDGE_MAX_MS:
+                    self._stuck.add(call_id)
+                    stuck.append(probe)
+        for probe in stuck:
+            self.breaker.record(False, probe)
+
+    def _count(self, backend, n):
+        with self._lock:
+            self.rows[backend] = self.rows.get(backend, 0) + n
+
+    def _serve_local(self, batch, backend):
+        rows = _tag(self.local(batch), backend)
+        self._count(backend, len(batch))
+        return rows
+
+    def route(self, batch):
+        batch = list(batch)
+        if not batch:
+            return []
+        self._report_stuck()
+        allowed, probe = self.breaker.allow()
+        if not allowed:
+            if self.local is None:
+                raise CircuitOpenError("Endpoint circuit is open and no local model is loaded")
+            return self._serve_local(batch, LOCAL_CIRCUIT)
+        with self._lock:
+            busy = len(self._inflight) >= self._remote_workers
+        if not probe and self.local is not None and busy:
+            # queueing here would only add to the latency of calls that get hedged anyway
+            return self._serve_local(batch, LOCAL_BUSY)
+        budget = self.budget_ms()
+        fut = self._submit_remote(batch, probe)
+        try:
+            rows = fut.result(timeout=None if budget is None else budget / 1000)
+        except FutureTimeout:
+            return self._serve_local(batch, LOCAL_HEDGE)
+        except Exception:
+            if self.local is None:
+                raise
+            return self._serve_local(batch, LOCAL_FALLBACK)
+        self._count(ENDPOINT, len(batch))
+        return _tag(rows, ENDPOINT)
+
+    def predict(self, texts, progress=None):
+        """Score texts in order; batches that fail on every backend become {"error": ...} rows."""
+        texts = list(texts)
+        results = [None] * len(texts)
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            futures = {
+                pool.submit(self.route, batch): (start, batch)
+                for start, batch in pack_batches(texts, self.max_records, self.max_bytes)
+            }
+            for fut in as_completed(futures):
+                start, batch = futures[fut]
+                try:
+                    rows = fut.result()
+                except Exception as e:
+                    rows = [{"error": str(e)} for _ in batch]
+                    self.failed_rows += len(batch)
+                results[start:start + len(batch)] = rows
+                done += len(batch)
+                if progress:
+                    progress(done, len(texts))
+        return results
+
+    def close(self):
+        """Release the remote pool; hedged-away calls still running finish in the background."""
+        self._remote_pool.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self):
+        budget = self.budget_ms()
+        return {
+            "rows": dict(self.rows),
+            "circuit": self.breaker.state,
+            "circuit_opens": self.breaker.opens,
+            "endpoint_p95_ms": self.latency.percentile(95),
+            "hedge_budget_ms": budget,
+        }
+
+def served_by_endpoint(row):
+    """cached_map keep= predicate: only endpoint answers go into the endpoint's cache namespace."""
+    return isinstance(row, dict) and "error" not in row and row.get("backend", ENDPOINT) == ENDPOINT
+
+def load_local_backend(model_dir=LOCAL_MODEL_DIR):
+    """
+    texts → endpoint-shaped {"label", "proba"} rows from a local bundle,
+    loaded with the endpoint's own model_fn. None (with a warning) when the
+    bundle cannot be loaded, so callers simply run without a fallback.
+    """
+    from inference import model_fn
+    from bulk_score import score_texts
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):     # model_fn's load log
+            bundle = model_fn(model_dir)
+    except Exception as e:
+        print(f"⚠️ Local model unavailable ({model_dir}): {e}")
+        return None
+
+    def predict_local(texts):
+        labels, proba, classes = score_texts(bundle, list(texts))
+        if proba is None:
+            return [{"label": label, "proba": None} for label in labels]
+        return [{"label": label, "proba": {c: round(float(p), 6) for c, p in zip(classes, row)}}
+                for label, row in zip(labels, proba)]
+    return predict_local
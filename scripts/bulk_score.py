@@ -0,0 +1,264 @@
+# scripts/bulk_score.py
+# Offline bulk scoring against the local model bundle, sharded across cores.
+#
+#   python scripts/bulk_score.py score data/big.csv --out data/scored/big --model-dir model_bundle
+#   python scripts/bulk_score.py score events.jsonl --out data/scored/events --workers 8 --shard-mb 128
+#
+# The input (CSV or JSONL) is cut into byte-range shards on record
+# boundaries (quote-aware for CSV, so multi-line quoted texts stay whole).
+# Worker processes memory-map the file, parse only their own range, score it
+# with the same loader as the endpoint (inference.model_fn: compact bundle +
+# linear fast path when available) and write one part file per shard with
+# the input columns plus flat label / proba_<class> columns.
+#
+# <out>/manifest.json records every shard and is rewritten atomically as
+# shards finish, so re-running the same command after an interruption only
+# scores the shards that have no finished part file yet.
+
+import io
+import os
+import sys
+import glob
+import json
+import mmap
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+# inference.py / compact_model.py / linear_scorer.py ship with the endpoint code in notebook/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "notebook"))
+
+MODEL_DIR = os.environ.get("FEEDBACK_MODEL_DIR", "model_bundle")
+SHARD_MB = 64                         # input bytes per shard
+SCORE_BATCH = 10_000                  # texts per model call inside a shard (bounds scorer temporaries)
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+
+def input_format(path):
+    return "jsonl" if path.endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+def plan_shards(path, fmt, shard_bytes):
+    """
+    (header, [(start, end), ...]) byte ranges that each hold whole records.
+    For CSV a cut only lands on a newline with an even number of quotes
+    before it, i.e. outside any quoted field.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b"", []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            header = b""
+            if fmt == "csv":
+                nl = mm.find(b"\n")
+                header = mm[:nl + 1] if nl >= 0 else mm[:] + b"\n"
+            bounds = [len(header) if fmt == "csv" else 0]
+            pos, quotes = bounds[0], 0
+            while bounds[-1] + shard_bytes < size:
+                cut = bounds[-1] + shard_bytes
+                if fmt == "csv":
+                    quotes += mm[pos:cut].count(b'"')
+                pos = cut
+                while True:
+                    nl = mm.find(b"\n", pos)
+                    if nl < 0:
+                        cut = size
+                        break
+                    if fmt == "csv":
+                        quotes += mm[pos:nl].count(b'"')
+                    pos = nl + 1
+                    if quotes % 2 == 0:
+                        cut = pos
+                        break
+                if cut >= size:
+                    break
+                bounds.append(cut)
+            if bounds[-1] < size:
+                bounds.append(size)
+    return header, [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+def model_fingerprint(model_dir):
+    """Cheap identity of a bundle: names, sizes and mtimes of its files."""
+    h = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(model_dir, "**", "*"), recursive=True)):
+        if os.path.isfile(path):
+            st = os.stat(path)
+            h.update(f"{os.path.relpath(path, model_dir)}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()[:16]
+
+# --- worker side --------------------------------------------------------------
+
+_bundle = None
+
+def _init_worker(model_dir):
+    global _bundle
+    import contextlib
+    from inference import model_fn
+    with contextlib.redirect_stdout(io.StringIO()):     # model_fn's load log, once per worker
+        _bundle = model_fn(model_dir)
+
+def score_texts(bundle, texts):
+    """(labels, proba or None, class names) for a list of texts."""
+    model, vectorizer, label_mapping = bundle[:3]
+    scorer = bundle[3] if len(bundle) > 3 else None
+    classes = [label_mapping[int(c)] if label_mapping else str(c) for c in model.classes_]
+    names = np.asarray(classes, dtype=object)
+    if scorer is not None:
+        _, proba = scorer.score(texts)
+    elif hasattr(model, "predict_proba"):
+        proba = model.predict_proba(vectorizer.transform(texts))
+    else:
+        pred = model.predict(vectorizer.transform(texts))
+        labels = [label_mapping[int(p)] if label_mapping else str(p) for p in pred]
+        return np.asarray(labels, dtype=object), None, classes
+    return names[np.asarray(proba).argmax(axis=1)], np.asarray(proba), classes
+
+def read_shard(path, fmt, header, start, end):
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:end]
+    if fmt == "csv":
+        # strings throughout: passthrough columns come out exactly as they went in
+        return pd.read_csv(io.BytesIO(header + data), dtype=str, keep_default_na=False)
+    return pd.read_json(io.BytesIO(data), lines=True, dtype=False)
+
+def write_part(frame, path, out_format):
+    tmp = path + ".tmp"
+    if out_format == "parquet":
+        frame.to_parquet(tmp, index=False)
+    else:
+        frame.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+def score_shard(task):
+    """Worker: read one byte range, score it, write its part file."""
+    started = time.perf_counter()
+    frame = read_shard(task["input"], task["format"], task["header"].encode("latin-1"),
+                       task["start"], task["end"])
+    if task["text_col"] not in frame.columns:
+        raise ValueError(f"Missing '{task['text_col']}' column in shard {task['id']}")
+    texts = frame[task["text_col"]].fillna("").astype(str).tolist()
+    labels, probas, classes = [], [], None
+    for i in range(0, len(texts), SCORE_BATCH):
+        lab, proba, classes = score_texts(_bundle, texts[i:i + SCORE_BATCH])
+        labels.append(lab)
+        probas.append(proba)
+    if texts:
+        frame["label"] = np.concatenate(labels)
+        if probas[0] is not None:
+            proba = np.vstack(probas)
+            for k, name in enumerate(classes):
+                frame[f"proba_{name}"] = proba[:, k].astype(np.float32)
+    else:
+        frame["label"] = pd.Series(dtype=object)
+    write_part(frame, task["path"], task["out_format"])
+    return task["id"], len(frame), time.perf_counter() - started
+
+# --- driver -------------------------------------------------------------------
+
+def save_manifest(manifest, out_dir):
+    path = os.path.join(out_dir, MANIFEST)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+def load_or_plan(args):
+    """Resume a matching manifest in args.out, or plan a fresh job."""
+    st = os.stat(args.input)
+    fmt = input_format(args.input)
+    identity = {
+        "input": os.path.abspath(args.input),
+        "input_size": st.st_size,
+        "input_mtime_ns": st.st_mtime_ns,
+        "format": fmt,
+        "text_col": args.text_col,
+        "shard_bytes": int(args.shard_mb * 1024 * 1024),
+        "out_format": args.out_format,
+        "model_dir": os.path.abspath(args.model_dir),
+        "model_fingerprint": model_fingerprint(args.model_dir),
+    }
+    path = os.path.join(args.out, MANIFEST)
+    if os.path.exists(path) and not args.restart:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        changed = [k for k, v in identity.items() if manifest.get(k) != v]
+        if changed:
+            raise SystemExit(f"❌ {path} belongs to a different job ({', '.join(changed)} changed); "
+                             f"use --restart to start over")
+        return manifest
+
+    for stale in glob.glob(os.path.join(args.out, "part-*")):
+        os.remove(stale)
+    header, ranges = plan_shards(args.input, fmt, identity["shard_bytes"])
+    ext = "parquet" if args.out_format == "parquet" else "csv"
+    manifest = dict(identity, version=MANIFEST_VERSION, header=header.decode("latin-1"), shards=[
+        {"id": i, "start": s, "end": e, "file": f"part-{i:05d}.{ext}", "rows": None, "seconds": None}
+        for i, (s, e) in enumerate(ranges)
+    ])
+    save_manifest(manifest, args.out)
+    return manifest
+
+def run(args):
+    os.makedirs(args.out, exist_ok=True)
+    for tmp in glob.glob(os.path.join(args.out, "*.tmp")):
+        os.remove(tmp)                      # half-written parts from an interrupted run
+    manifest = load_or_plan(args)
+    shards = manifest["shards"]
+    pending = [s for s in shards
+               if s["rows"] is None or not os.path.exists(os.path.join(args.out, s["file"]))]
+    done_rows = sum(s["rows"] or 0 for s in shards if s not in pending)
+    if len(pending) < len(shards):
+        print(f"↩️ Resuming: {len(shards) - len(pending)}/{len(shards)} shards already done ({done_rows:,} rows)")
+    if not pending:
+        print(f"✅ Nothing to do – {done_rows:,} rows in {args.out}")
+        return manifest
+
+    workers = min(args.workers or os.cpu_count() or 1, len(pending))
+    print(f"⚙️ Scoring {len(pending)} shards with {workers} worker(s) → {args.out}")
+    started = time.perf_counter()
+    rows = 0
+    by_id = {s["id"]: s for s in shards}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(args.model_dir,)) as pool:
+        futures = [pool.submit(score_shard, {
+            "id": s["id"], "input": manifest["input"], "format": manifest["format"],
+            "header": manifest["header"], "start": s["start"], "end": s["end"],
+            "text_col": manifest["text_col"], "out_format": manifest["out_format"],
+            "path": os.path.join(args.out, s["file"]),
+        }) for s in pending]
+        for n, fut in enumerate(as_completed(futures), 1):
+            shard_id, shard_rows, seconds = fut.result()
+            by_id[shard_id].update(rows=shard_rows, seconds=round(seconds, 3))
+            save_manifest(manifest, args.out)
+            rows += shard_rows
+            elapsed = time.perf_counter() - started
+            print(f"\r⏳ {n}/{len(pending)} shards, {rows:,} rows ({rows / elapsed:,.0f} rows/s)",
+                  end="", flush=True)
+    elapsed = time.perf_counter() - started
+    print(f"\n✅ Scored {rows:,} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s) → {args.out}")
+    return manifest
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("score", help="score a local CSV/JSONL file into part files + manifest")
+    p.add_argument("input")
+    p.add_argument("--out", required=True, help="output directory (part files + manifest.json)")
+    p.add_argument("--model-dir", default=MODEL_DIR)
+    p.add_argument("--text-col", default="text")
+    p.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    p.add_argument("--shard-mb", type=float, default=SHARD_MB)
+    p.add_argument("--out-format", choices=["parquet", "csv"], default="parquet")
+    p.add_argument("--restart", action="store_true", help="discard a previous job's parts and manifest")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.shard_mb <= 0:
+        raise SystemExit("❌ --shard-mb must be positive")
+    run(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,18 @@
+import os
+import json
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import boto3
 import pandas as pd
-import math
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from prediction_cache import PredictionCache, cached_map, cache_key
+from near_dedup import NearDuplicateCollapser, THRESHOLD
+from analytics_store import AnalyticsStore, file_sha256, run_key
+from s3_sync import upload_if_changed
 
 REGION = "us-east-1"
 INPUT = "data/reviews.csv"
@@ -8,36 +20,235 @@ OUTPUT = "data/reviews_analysis.csv"
 BUCKET = "grey-customer-feedback-bucket"
 S3_KEY = "processed/reviews_analysis.csv"
 LANG = "en"
+USE_CACHE = True
+DEDUP_THRESHOLD = THRESHOLD           # FEEDBACK_DEDUP_THRESHOLD; 1 = exact duplicates share one Comprehend call, 0 disables
+KEY_PHRASES = os.environ.get("FEEDBACK_KEY_PHRASES", "comprehend")   # "local": TF-IDF extractor instead of batch_detect_key_phrases
+WRITE_ANALYTICS = True                # append results to the Parquet analytics store (FEEDBACK_ANALYTICS_PATH)
+
+# Comprehend batch limits: 25 documents per call, 5,000 UTF-8 bytes per document
+MAX_DOCS = 25
+MAX_DOC_BYTES = 5000
+MAX_BATCH_BYTES = 64 * 1024
+MAX_WORKERS = 8
+MAX_ITEM_ATTEMPTS = 3
+START_RATE = 10.0                     # calls/second, adapts to throttling
+MAX_RATE = 50.0
+CHECKPOINT = "data/reviews_analysis.checkpoint.jsonl"
+FAILED_ROWS = "data/reviews_analysis.failed.csv"     # rows Comprehend kept rejecting (sentiment left empty)
+
+THROTTLE_CODES = {"ThrottlingException", "TooManyRequestsException", "LimitExceededException"}
+
+def truncate_bytes(text, limit=MAX_DOC_BYTES):
+    """Cut text to at most `limit` UTF-8 bytes without splitting a character."""
+    encoded = text.encode("utf-8")
+    if len(encoded) <= limit:
+        return text
+    return encoded[:limit].decode("utf-8", "ignore")
+
+def pack_documents(items, max_docs=MAX_DOCS, max_bytes=MAX_BATCH_BYTES):
+    """Group (index, text) pairs into batches bounded by document count and total bytes."""
+    batch, size = [], 0
+    for idx, text in items:
+        n = len(text.encode("utf-8"))
+        if batch and (len(batch) >= max_docs or size + n > max_bytes):
+            yield batch
+            batch, size = [], 0
+        batch.append((idx, text))
+        size += n
+    if batch:
+        yield batch
+
+class AdaptiveRateLimiter:
+    """
+    Spaces calls at `rate` per second across all threads. The rate is halved
+    on every throttle and creeps back up by `step` on every success (AIMD).
+    """
+
+    def __init__(self, rate=START_RATE, min_rate=1.0, max_rate=MAX_RATE, step=0.5):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.step = step
+        self.throttles = 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + 1.0 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+    def on_throttle(self):
+        with self._lock:
+            self.throttles += 1
+            self.rate = max(self.min_rate, self.rate / 2)
 
-def chunks(lst, size):
-    for i in range(0, len(lst), size):
-        yield lst[i:i+size]
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.step)
+
+def call_comprehend(limiter, fn, texts, max_throttles=8):
+    """One batch call, waiting out throttling with the shared limiter plus jittered backoff."""
+    for attempt in range(max_throttles):
+        limiter.acquire()
+        try:
+            resp = fn(TextList=texts, LanguageCode=LANG)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in THROTTLE_CODES:
+                raise
+            limiter.on_throttle()
+            time.sleep(random.uniform(0, min(10.0, 0.2 * 2 ** attempt)))
+            continue
+        limiter.on_success()
+        return resp
+    raise RuntimeError(f"Still throttled after {max_throttles} attempts")
+
+def load_checkpoint(path):
+    """{text_key: result} for every item finished by a previous run."""
+    done = {}
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue        # half-written last line from a crash
+                done[rec["k"]] = {"sentiment": rec["sentiment"], "key_phrases": rec["key_phrases"]}
+    return done
+
+def comprehend_version(key_phrases=True):
+    """Cache/checkpoint namespace: sentiment-only results must not satisfy a full run."""
+    return f"comprehend:{LANG}" if key_phrases else f"comprehend:{LANG}:sentiment"
+
+def analyze(comp, texts, checkpoint=None, max_workers=MAX_WORKERS, limiter=None, key_phrases=True):
+    """
+    Sentiment + key phrases for each text (None where Comprehend kept failing).
+    Both APIs run concurrently over many batches. Items reported in ErrorList
+    (and whole batches whose call failed) go round again: they are re-packed
+    with the other retries into the next round's batches, up to
+    MAX_ITEM_ATTEMPTS rounds; items that succeeded are not sent again.
+    Finished items are appended to `checkpoint` so an interrupted run picks
+    up where it stopped.
+    key_phrases=False calls only batch_detect_sentiment ("key_phrases" is "").
+    """
+    limiter = limiter or AdaptiveRateLimiter()
+    version = comprehend_version(key_phrases)
+    results = [None] * len(texts)
+    keys = [cache_key(t, version) for t in texts]
+
+    done = load_checkpoint(checkpoint)
+    pending = []
+    for i, (t, k) in enumerate(zip(texts, keys)):
+        if k in done:
+            results[i] = done[k]
+        elif not t.strip():
+            results[i] = {"sentiment": "NEUTRAL", "key_phrases": ""}   # Comprehend rejects empty docs
+        else:
+            pending.append((i, truncate_bytes(t)))
+    if done:
+        print(f"↩️ Resumed {len(texts) - len(pending)} rows from {checkpoint}")
+
+    ckpt = open(checkpoint, "a", encoding="utf-8") if checkpoint else None
+    ops = {"sentiment": comp.batch_detect_sentiment}
+    if key_phrases:
+        ops["key_phrases"] = comp.batch_detect_key_phrases
+    total = len(pending)
+    finished = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            attempt = 0
+            while pending and attempt < MAX_ITEM_ATTEMPTS:
+                attempt += 1
+                batches = list(pack_documents(pending))
+                futures = {}
+                for b, batch in enumerate(batches):
+                    for op, fn in ops.items():
+                        futures[pool.submit(call_comprehend, limiter, fn, [t for _, t in batch])] = (b, op)
+
+                partial = [{} for _ in batches]
+                retry = []
+                for fut in as_completed(futures):
+                    b, op = futures[fut]
+                    try:
+                        partial[b][op] = fut.result()
+                    except Exception as e:
+                        partial[b][op] = e
+                    if len(partial[b]) < len(ops):
+                        continue
+
+                    batch = batches[b]
+                    s_resp = partial[b]["sentiment"]
+                    kp_resp = partial[b].get("key_phrases", {"ResultList": [{"Index": j} for j in range(len(batch))]})
+                    partial[b] = None
+                    if isinstance(s_resp, Exception) or isinstance(kp_resp, Exception):
+                        retry.extend(batch)
+                        continue
+                    sentiments = {r["Index"]: r.get("Sentiment") for r in s_resp["ResultList"]}
+                    phrases = {
+                        r["Index"]: ", ".join(sorted(set(kp["Text"] for kp in r.get("KeyPhrases", []))))
+                        for r in kp_resp["ResultList"]
+                    }
+                    lines = []
+                    for j, (i, t) in enumerate(batch):
+                        if j in sentiments and j in phrases:
+                            results[i] = {"sentiment": sentiments[j], "key_phrases": phrases[j]}
+                            lines.append(json.dumps({"k": keys[i], **results[i]}))
+                        else:
+                            retry.append((i, t))     # listed in ErrorList → next round, batched with other retries
+                    finished += len(lines)
+                    if ckpt and lines:
+                        ckpt.write("\n".join(lines) + "\n")
+                        ckpt.flush()
+                    print(f"\r⏳ {finished}/{total} documents ({limiter.rate:.1f} calls/s)", end="", flush=True)
+                pending = sorted(retry)
+        print()
+    finally:
+        if ckpt:
+            ckpt.close()
+    if pending:
+        print(f"⚠️ {len(pending)} documents failed after {MAX_ITEM_ATTEMPTS} attempts")
+    return results
 
 def main():
     # Load input CSV
     df = pd.read_csv(INPUT)
-    texts = df["Text"].fillna("").tolist()
+    texts = df["Text"].fillna("").astype(str).tolist()
 
-    # Initialize Comprehend
-    comp = boto3.client("comprehend", region_name=REGION)
+    # Initialize Comprehend (connection pool sized for the worker threads; we do our own retries)
+    comp = boto3.client(
+        "comprehend", region_name=REGION,
+        config=Config(max_pool_connections=MAX_WORKERS * 2, retries={"max_attempts": 1, "mode": "standard"})
+    )
 
-    sentiments = []
-    key_phrases_all = []
+    # Only texts not seen before are sent to Comprehend, one per near-duplicate cluster
+    collapser = NearDuplicateCollapser(DEDUP_THRESHOLD)
+    remote_phrases = KEY_PHRASES != "local"
 
-    for batch in chunks(texts, 25):
-        # Sentiment
-        s_resp = comp.batch_detect_sentiment(TextList=batch, LanguageCode=LANG)
-        sentiments.extend([r.get("Sentiment") for r in s_resp["ResultList"]])
+    def enrich(reps):
+        return analyze(comp, reps, checkpoint=CHECKPOINT, key_phrases=remote_phrases)
 
-        # Key Phrases
-        kp_resp = comp.batch_detect_key_phrases(TextList=batch, LanguageCode=LANG)
-        for item in kp_resp["ResultList"]:
-            phrases = [kp["Text"] for kp in item.get("KeyPhrases", [])]
-            key_phrases_all.append(", ".join(sorted(set(phrases))))
+    if USE_CACHE:
+        cache = PredictionCache(version=comprehend_version(remote_phrases))
+        results = cached_map(cache, texts, enrich, collapser=collapser)
+        print("🗃️ Cache:", cache.stats())
+        cache.close()
+    else:
+        results = collapser.map(texts, enrich)
+    print("🧬 Dedup:", collapser.stats())
 
-    # Handle edge cases
-    while len(sentiments) < len(df): sentiments.append("NEUTRAL")
-    while len(key_phrases_all) < len(df): key_phrases_all.append("")
+    # Documents Comprehend kept rejecting get an empty sentiment (dropped by prepare_training_data.py)
+    failed = [r is None for r in results]
+    sentiments = [None if r is None else r["sentiment"] for r in results]
+    if remote_phrases:
+        key_phrases_all = [r["key_phrases"] if r else "" for r in results]
+    else:
+        from key_phrases import KeyPhraseExtractor
+        started = time.perf_counter()
+        key_phrases_all = KeyPhraseExtractor.from_model_dir().extract(texts)
+        print(f"🔑 Local key phrases for {len(texts)} rows in {time.perf_counter() - started:.2f}s")
 
     # Add results to DataFrame
     df["comprehend_sentiment"] = sentiments
@@ -46,11 +257,31 @@ def main():
     # Save locally
     df.to_csv(OUTPUT, index=False)
     print(f"✅ Saved locally: {OUTPUT}")
+    failed_rows = df[failed]
+    if len(failed_rows):
+        # keep the checkpoint: a re-run only sends these rows again
+        failed_rows.to_csv(FAILED_ROWS, index=False)
+        print(f"⚠️ {len(failed_rows)} rows have no sentiment; listed in {FAILED_ROWS}")
+    else:
+        for path in (CHECKPOINT, FAILED_ROWS):
+            if os.path.exists(path):
+                os.remove(path)
+
+    if WRITE_ANALYTICS:
+        store = AnalyticsStore()
+        # keyed by input content + Comprehend settings: the re-run after a partial
+        # failure only adds the rows that failed before
+        key = run_key("comprehend", file_sha256(INPUT), comprehend_version(remote_phrases))
+        rows, _ = store.append_rows(df[[not f for f in failed]], key, "comprehend_sentiment",
+                                    origin="comprehend", key_phrases_col="comprehend_key_phrases")
+        print(f"📈 Appended {rows} rows to analytics store: {store.root}")
 
     # Upload to S3
     s3 = boto3.client("s3")
-    s3.upload_file(OUTPUT, BUCKET, S3_KEY)
-    print(f"🚀 Uploaded to S3: s3://{BUCKET}/{S3_KEY}")
+    if upload_if_changed(s3, OUTPUT, BUCKET, S3_KEY):
+        print(f"🚀 Uploaded to S3: s3://{BUCKET}/{S3_KEY}")
+    else:
+        print(f"⏭️ s3://{BUCKET}/{S3_KEY} already up to date")
 
 if __name__ == "__main__":
     main()
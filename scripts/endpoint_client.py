@@ -0,0 +1,192 @@
+# scripts/endpoint_client.py
+# Batched calls to the SageMaker endpoint (see notebook/inference.py for the contract)
+
+import io
+import os
+import sys
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from botocore.exceptions import ConnectionError as BotoConnectionError, HTTPClientError
+from tenacity import Retrying, stop_after_attempt, wait_random_exponential, retry_if_exception
+
+# stage_metrics.py ships with the endpoint code in notebook/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "notebook"))
+from stage_metrics import span
+
+# SageMaker real-time endpoints reject payloads over 6 MB – keep some headroom
+MAX_PAYLOAD_BYTES = 5 * 1024 * 1024
+MAX_BATCH_RECORDS = 500
+MAX_CONCURRENCY = 8
+MAX_ATTEMPTS = 6
+
+# Error codes worth retrying with backoff (throttling / transient capacity)
+RETRYABLE_CODES = {
+    "ThrottlingException", "Throttling", "ThrottledException", "TooManyRequestsException",
+    "RequestLimitExceeded", "ServiceUnavailable", "ServiceUnavailableException",
+    "InternalFailure", "InternalServerError", "ModelNotReadyException",
+}
+
+def pack_batches(texts, max_records=MAX_BATCH_RECORDS, max_bytes=MAX_PAYLOAD_BYTES):
+    """
+    Split texts into consecutive batches whose JSON array payload stays
+    under max_bytes and max_records. Yields (start_index, batch) pairs.
+    A single text larger than max_bytes is sent on its own.
+    """
+    batch, size, start = [], 2, 0          # 2 bytes for the surrounding "[]"
+    for i, txt in enumerate(texts):
+        item = len(json.dumps(txt).encode("utf-8")) + 2   # ", " separator
+        if batch and (len(batch) >= max_records or size + item > max_bytes):
+            yield start, batch
+            batch, size, start = [], 2, i
+        batch.append(txt)
+        size += item
+    if batch:
+        yield start, batch
+
+def invoke_batch(rt, endpoint, texts):
+    """Send one batch to the endpoint and return the per-row results in order."""
+    with span("endpoint.serialize"):
+        body = json.dumps(list(texts))
+    with span("endpoint.invoke_endpoint"):
+        resp = rt.invoke_endpoint(
+            EndpointName=endpoint,
+            ContentType="application/json",
+            Accept="application/json",
+            Body=body
+        )
+        payload = resp["Body"].read()
+    with span("endpoint.parse_response"):
+        results = json.loads(payload.decode("utf-8"))
+    if not isinstance(results, list) or len(results) != len(texts):
+        raise ValueError(
+            f"Endpoint returned {len(results) if isinstance(results, list) else 'non-list'} "
+            f"results for {len(texts)} texts"
+        )
+    return results
+
+def predict_batched(rt, endpoint, texts, max_records=MAX_BATCH_RECORDS, max_bytes=MAX_PAYLOAD_BYTES):
+    """Score all texts with as few round trips as the payload limit allows."""
+    results = []
+    for _, batch in pack_batches(texts, max_records, max_bytes):
+        results.extend(invoke_batch(rt, endpoint, batch))
+    return results
+
+class LocalRuntimeClient:
+    """
+    Minimal sagemaker-runtime look-alike that posts to a local server
+    (scripts/local_server.py) instead of a SageMaker endpoint.
+    """
+
+    def __init__(self, url, timeout=60):
+        self.url = url.rstrip("/") + "/invocations"
+        self.timeout = timeout
+
+    def invoke_endpoint(self, EndpointName, Body, ContentType="application/json", Accept="application/json"):
+        if isinstance(Body, str):
+            Body = Body.encode("utf-8")
+        req = urllib.request.Request(
+            self.url, data=Body, method="POST",
+            headers={"Content-Type": ContentType, "Accept": Accept}
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            return {
+                "Body": io.BytesIO(resp.read()),
+                "ContentType": resp.headers.get("Content-Type", Accept)
+            }
+
+def make_runtime_client(region, max_pool_connections=MAX_CONCURRENCY):
+    """
+    sagemaker-runtime client, or the local server when FEEDBACK_ENDPOINT_URL
+    is set (e.g. http://127.0.0.1:8080). The boto3 client gets a connection
+    pool sized for max_pool_connections threads and leaves retries to
+    EndpointClient.
+    """
+    url = os.environ.get("FEEDBACK_ENDPOINT_URL")
+    if url:
+        return LocalRuntimeClient(url)
+    import boto3
+    from botocore.config import Config
+    config = Config(
+        max_pool_connections=max_pool_connections,
+        retries={"max_attempts": 1, "mode": "standard"}
+    )
+    return boto3.client("sagemaker-runtime", region_name=region, config=config)
+
+def is_retryable(exc):
+    """Throttling, 5xx and connection-level failures are retried; bad input is not."""
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):
+        err = response.get("Error", {})
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+        return err.get("Code") in RETRYABLE_CODES or status == 429 or status >= 500
+    if isinstance(exc, urllib.error.HTTPError):
+        return exc.code == 429 or exc.code >= 500
+    # botocore's EndpointConnectionError / ConnectTimeoutError / ReadTimeoutError do not subclass the builtins
+    return isinstance(exc, (ConnectionError, TimeoutError, urllib.error.URLError, BotoConnectionError, HTTPClientError))
+
+class EndpointClient:
+    """
+    Scores texts against the endpoint with up to max_concurrency batches in
+    flight on one pooled runtime client. Each batch is retried with jittered
+    exponential backoff when throttled. Results come back in input order;
+    batches that still fail after max_attempts become {"error": ...} rows
+    and are counted in self.failed_rows.
+    """
+
+    def __init__(self, endpoint, region="us-east-1", rt=None, max_concurrency=MAX_CONCURRENCY,
+                 max_attempts=MAX_ATTEMPTS, max_records=MAX_BATCH_RECORDS, max_bytes=MAX_PAYLOAD_BYTES):
+        self.endpoint = endpoint
+        self.rt = rt or make_runtime_client(region, max_pool_connections=max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.retries = 0
+        self.failed_rows = 0
+        self._lock = threading.Lock()
+
+    def _count_retry(self, retry_state):
+        with self._lock:
+            self.retries += 1
+
+    def invoke(self, batch):
+        """One batch, with backoff on retryable errors."""
+        for attempt in Retrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=wait_random_exponential(multiplier=0.1, max=10),
+            retry=retry_if_exception(is_retryable),
+            before_sleep=self._count_retry,
+            reraise=True
+        ):
+            with attempt:
+                return invoke_batch(self.rt, self.endpoint, batch)
+
+    def predict(self, texts, progress=None):
+        """
+        Score texts in order. progress(done_rows, total_rows) is called from
+        the calling thread as batches complete.
+        """
+        texts = list(texts)
+        results = [None] * len(texts)
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            futures = {
+                pool.submit(self.invoke, batch): (start, batch)
+                for start, batch in pack_batches(texts, self.max_records, self.max_bytes)
+            }
+            for fut in as_completed(futures):
+                start, batch = futures[fut]
+                try:
+                    rows = fut.result()
+                except Exception as e:
+                    rows = [{"error": str(e)} for _ in batch]
+                    self.failed_rows += len(batch)
+                results[start:start + len(batch)] = rows
+                done += len(batch)
+                if progress:
+                    progress(done, len(texts))
+        return results
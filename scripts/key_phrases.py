@@ -0,0 +1,198 @@
+# scripts/key_phrases.py
+# Local key-phrase extraction with the trained TF-IDF vocabulary: the
+# top-weighted uni/bigrams of each document, in the same ", "-joined sorted
+# format as the comprehend_key_phrases column. Replaces
+# batch_detect_key_phrases when comprehend_analysis runs with
+# FEEDBACK_KEY_PHRASES=local.
+#
+# There is no part-of-speech tagger here: candidates are filtered with word
+# lists so they look like Comprehend's noun phrases ("this product", "the
+# service"), but the output is still ranked n-grams and can contain things
+# a parser would not call a phrase ("terrible experience" yes, "was
+# terrible" no, "absolutely fantastic" possibly).
+#
+#   python scripts/key_phrases.py data/reviews.csv --model-dir model_bundle --out /tmp/phrases.csv
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, TfidfVectorizer
+
+# compact_model.py ships with the endpoint code in notebook/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "notebook"))
+
+MODEL_DIR = os.environ.get("FEEDBACK_MODEL_DIR", "model_bundle")
+TOP_K = 5                             # phrases per document (Comprehend returns a handful for short reviews)
+PARALLEL_MIN = 50_000                 # below this, worker start-up costs more than it saves
+CHUNK_TEXTS = 20_000                  # texts per worker task
+
+# words that make a term a verb phrase / clause fragment rather than a noun phrase
+# ("was terrible", "it says", "can stop", "not recommend", "to friend"); the stems
+# are what the default token pattern leaves of contractions ("don't" → "don")
+VERB_WORDS = frozenset("""
+    am is are was were be been being become became becomes becoming has have had having do does did
+    doing done can cannot could would should will shall may might must get gets got go goes went
+    seem seems seemed seeming make makes made keep give take put see show call find move say says said
+    don doesn didn isn wasn aren weren won wouldn couldn shouldn haven hasn hadn ll ve re
+    not to
+""".split())
+# a lone adverb is never a key phrase ("just", "absolutely", "really")
+ADVERBS = frozenset("""
+    again almost already also always anyway else even ever never often once only quite rather really
+    so still then there too very well yet just absolutely definitely highly truly totally simply
+    actually honestly literally seriously pretty
+""".split())
+# the only stop words a noun phrase starts with ("this product", "their website"); other leading
+# stop words make a fragment ("of money", "and great", "it says")
+DETERMINERS = frozenset("the a an this that these those my your our their his her its no every each "
+                        "some any all another".split())
+LY_NOUNS = frozenset("family supply assembly reply july italy anomaly monopoly jelly belly rally ally "
+                     "fly butterfly bully".split())
+
+def load_vectorizer(model_dir=MODEL_DIR):
+    """
+    Fitted TfidfVectorizer for a bundle. A compact bundle is rebuilt from
+    terms.txt + idf.npy (no unpickling, works across sklearn versions);
+    otherwise vectorizer.joblib is loaded.
+    """
+    compact = os.path.join(model_dir, "compact")
+    if os.path.exists(os.path.join(compact, "terms.txt")):
+        with open(os.path.join(compact, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        params = dict(manifest["analyzer"], ngram_range=tuple(manifest["analyzer"]["ngram_range"]))
+        settings = manifest["tfidf"]
+        vectorizer = TfidfVectorizer(**params, norm=settings["norm"], use_idf=settings["use_idf"],
+                                     sublinear_tf=settings["sublinear_tf"], binary=settings["binary"])
+        with open(os.path.join(compact, "terms.txt"), encoding="utf-8") as f:
+            terms = f.read().split("\n")
+        vectorizer.vocabulary_ = {t: i for i, t in enumerate(terms)}
+        if settings["use_idf"]:
+            vectorizer.idf_ = np.load(os.path.join(compact, "idf.npy")).astype(np.float64)
+        return vectorizer
+    import joblib
+    return joblib.load(os.path.join(model_dir, "vectorizer.joblib"))
+
+def is_candidate(term):
+    """Could this vocabulary term pass for a noun phrase?"""
+    words = term.split()
+    if not words or words[-1] in ENGLISH_STOP_WORDS or any(w in VERB_WORDS for w in words):
+        return False
+    if words[0] in ENGLISH_STOP_WORDS and words[0] not in DETERMINERS:
+        return False
+    if len(words) == 1:
+        w = words[0]
+        return w not in ADVERBS and not (w.endswith("ly") and len(w) > 4 and w not in LY_NOUNS)
+    return True
+
+class KeyPhraseExtractor:
+    """
+    extract(texts) → one "phrase, phrase, ..." string per text.
+
+    Ranking is the document's own TF-IDF weight per term, so rare,
+    repeated terms win over common ones. Never picked: terms that end in a
+    stop word ("service was", "meal of") or start with one that is not a
+    determiner ("of money"), contain a verb / auxiliary ("was terrible",
+    "is amazing") or are a lone adverb ("just"). A unigram
+    already covered by a picked bigram is dropped ("great food" rather than
+    "food, great, great food").
+    """
+
+    def __init__(self, vectorizer, top_k=TOP_K):
+        if not hasattr(vectorizer, "vocabulary_"):
+            raise ValueError("Key phrases need a fitted TfidfVectorizer vocabulary (not a hashing bundle)")
+        self.vectorizer = vectorizer
+        self.top_k = top_k
+        terms = np.empty(len(vectorizer.vocabulary_), dtype=object)
+        for term, col in vectorizer.vocabulary_.items():
+            terms[col] = term
+        self.terms = terms
+        self.allowed = np.fromiter((is_candidate(t) for t in terms), dtype=bool, count=len(terms))
+
+    @classmethod
+    def from_model_dir(cls, model_dir=MODEL_DIR, top_k=TOP_K):
+        return cls(load_vectorizer(model_dir), top_k)
+
+    def top_terms(self, X):
+        """(rows, columns) of each row's top_k allowed non-zeros, by descending weight."""
+        X = X.tocsr()
+        rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+        keep = self.allowed[X.indices] & (X.data > 0)
+        rows, cols, weights = rows[keep], X.indices[keep], X.data[keep]
+        # one sort over the whole batch: by row, then weight descending, then column for ties
+        order = np.lexsort((cols, -weights, rows))
+        rows, cols = rows[order], cols[order]
+        starts = np.searchsorted(rows, np.arange(X.shape[0]))
+        rank = np.arange(len(rows)) - starts[rows]
+        top = rank < self.top_k
+        return rows[top], cols[top]
+
+    def _format(self, n_docs, rows, cols):
+        bounds = np.searchsorted(rows, np.arange(n_docs + 1))
+        out = []
+        for i in range(n_docs):
+            picked = self.terms[cols[bounds[i]:bounds[i + 1]]].tolist()
+            covered = {w for t in picked if " " in t for w in t.split()}
+            out.append(", ".join(sorted({t for t in picked if " " in t or t not in covered})))
+        return out
+
+    def extract_batch(self, texts):
+        """Single-process extraction (one transform + one sort for the batch)."""
+        texts = ["" if t is None else str(t) for t in texts]
+        if not texts:
+            return []
+        rows, cols = self.top_terms(self.vectorizer.transform(texts))
+        return self._format(len(texts), rows, cols)
+
+    def extract(self, texts, processes=None):
+        """extract_batch, fanned out over worker processes for large inputs."""
+        texts = list(texts)
+        processes = processes or os.cpu_count() or 1
+        if processes == 1 or len(texts) < PARALLEL_MIN:
+            return self.extract_batch(texts)
+        chunks = [texts[i:i + CHUNK_TEXTS] for i in range(0, len(texts), CHUNK_TEXTS)]
+        # the vectorizer is shipped once per worker, not once per chunk
+        with ProcessPoolExecutor(max_workers=min(processes, len(chunks)),
+                                 initializer=_init_worker, initargs=(self.vectorizer, self.top_k)) as pool:
+            return [p for part in pool.map(_extract_chunk, chunks) for p in part]
+
+_worker = None
+
+def _init_worker(vectorizer, top_k):
+    global _worker
+    _worker = KeyPhraseExtractor(vectorizer, top_k)
+
+def _extract_chunk(texts):
+    return _worker.extract_batch(texts)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", help="CSV with a Text (or text) column")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--out", default=None, help="write the CSV with a local_key_phrases column")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.input)
+    col = "Text" if "Text" in df.columns else "text"
+    extractor = KeyPhraseExtractor.from_model_dir(args.model_dir, args.top_k)
+    start = time.perf_counter()
+    phrases = extractor.extract(df[col].fillna("").astype(str).tolist(), args.processes)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {len(phrases)} rows in {elapsed:.2f}s ({len(phrases) / max(elapsed, 1e-9):,.0f} rows/s)")
+    if args.out:
+        df["local_key_phrases"] = phrases
+        df.to_csv(args.out, index=False)
+        print(f"💾 Saved → {args.out}")
+    else:
+        for text, p in list(zip(df[col], phrases))[:5]:
+            print(f"• {str(text)[:70]!r} → {p}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+# scripts/local_fakes.py
+# In-process stand-ins for AWS clients, for exercising the scripts and app
+# helpers without an AWS account (latency, throttling and failures on demand).
+
+import io
+import os
+import json
+import time
+import uuid
+import random
+import shutil
+import hashlib
+import threading
+from types import SimpleNamespace
+from collections import Counter
+
+from botocore.exceptions import ClientError
+
+def _client_error(code, operation, status=400, message=None):
+    return ClientError(
+        {
+            "Error": {"Code": code, "Message": message or code},
+            "ResponseMetadata": {"HTTPStatusCode": status},
+        },
+        operation
+    )
+
+def keyword_label(text):
+    """Cheap deterministic 'model' used when no real scorer is supplied."""
+    t = text.lower()
+    if any(w in t for w in ("terrible", "awful", "worst", "bad", "disappoint")):
+        return "Negative"
+    if any(w in t for w in ("love", "great", "fantastic", "excellent", "amazing")):
+        return "Positive"
+    return "Mixed"
+
+class FakeSageMakerRuntime:
+    """
+    invoke_endpoint look-alike speaking the notebook/inference.py contract.
+    latency: seconds per call (plus per_row seconds per record)
+    throttle_rate: probability a call raises ThrottlingException
+    scorer: fn(list_of_texts) -> list of per-row results (defaults to keyword_label)
+    """
+
+    def __init__(self, latency=0.0, per_row=0.0, throttle_rate=0.0, error_rate=0.0, scorer=None, seed=0):
+        self.latency = latency
+        self.per_row = per_row
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.scorer = scorer or (lambda texts: [{"label": keyword_label(t), "proba": None} for t in texts])
+        self.calls = 0
+        self.throttled = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def invoke_endpoint(self, EndpointName, Body, ContentType="application/json", Accept="application/json"):
+        with self._lock:
+            self.calls += 1
+            roll = self._rng.random()
+        data = json.loads(Body)
+        single = isinstance(data, dict)
+        texts = [data.get("text", "")] if single else [x.get("text", "") if isinstance(x, dict) else x for x in data]
+        time.sleep(self.latency + self.per_row * len(texts))
+        if roll < self.throttle_rate:
+            with self._lock:
+                self.throttled += 1
+            raise _client_error("ThrottlingException", "InvokeEndpoint", 400)
+        if roll < self.throttle_rate + self.error_rate:
+            raise _client_error("ModelError", "InvokeEndpoint", 424, "model container failed")
+        rows = self.scorer(texts)
+        out = [rows[0]["label"]] if single else rows
+        return {"Body": io.BytesIO(json.dumps(out).encode("utf-8")), "ContentType": "application/json"}
+
+class FakeS3:
+    """
+    Directory-backed S3 stand-in: s3://bucket/key lives at root/bucket/key.
+    Covers the calls the scripts make (put/get/head/list, upload_file /
+    download_file and multipart uploads). User metadata, ContentEncoding and
+    ETags live in root/.meta/bucket/key.json so they survive across
+    processes; multipart objects get "<md5 of part md5s>-N" ETags like S3.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.calls = Counter()
+        self._uploads = {}
+        self._lock = threading.Lock()
+
+    def _path(self, bucket, key):
+        path = os.path.join(self.root, bucket, *key.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def _count(self, op):
+        with self._lock:
+            self.calls[op] += 1
+
+    def _meta_path(self, bucket, key):
+        return os.path.join(self.root, ".meta", bucket, *key.split("/")) + ".json"
+
+    def _store_meta(self, bucket, key, etag, extra):
+        extra = extra or {}
+        meta = {
+            "ETag": etag,
+            "Metadata": dict(extra.get("Metadata", {})),
+            "ContentEncoding": extra.get("ContentEncoding"),
+            "ContentType": extra.get("ContentType", "binary/octet-stream"),
+        }
+        path = self._meta_path(bucket, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        return meta
+
+    def _head(self, bucket, key, op):
+        path = os.path.join(self.root, bucket, *key.split("/"))
+        if not os.path.isfile(path):
+            raise _client_error("404", op, 404, "Not Found")
+        meta_path = self._meta_path(bucket, key)
+        if os.path.exists(meta_path) and os.path.getmtime(meta_path) >= os.path.getmtime(path):
+            with open(meta_path, encoding="utf-8") as f:
+                return path, json.load(f)
+        with open(path, "rb") as f:         # written behind our back: plain md5 ETag
+            return path, self._store_meta(bucket, key, '"%s"' % hashlib.md5(f.read()).hexdigest(), None)
+
+    def put_object(self, Bucket, Key, Body=b"", **kwargs):
+        self._count("put_object")
+        if isinstance(Body, str):
+            Body = Body.encode("utf-8")
+        elif hasattr(Body, "read"):
+            Body = Body.read()
+        with open(self._path(Bucket, Key), "wb") as f:
+            f.write(Body)
+        etag = '"%s"' % hashlib.md5(Body).hexdigest()
+        self._store_meta(Bucket, Key, etag, kwargs)
+        return {"ETag": etag}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self._count("get_object")
+        path = os.path.join(self.root, Bucket, *Key.split("/"))
+        if not os.path.isfile(path):
+            raise _client_error("NoSuchKey", "GetObject", 404)
+        _, meta = self._head(Bucket, Key, "GetObject")
+        with open(path, "rb") as f:
+            data = f.read()
+        out = {"Body": io.BytesIO(data), "ContentLength": len(data), "ETag": meta["ETag"],
+               "Metadata": dict(meta["Metadata"])}
+        if meta["ContentEncoding"]:
+            out["ContentEncoding"] = meta["ContentEncoding"]
+        return out
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self._count("head_object")
+        path, meta = self._head(Bucket, Key, "HeadObject")
+        out = {"ContentLength": os.path.getsize(path), "ETag": meta["ETag"],
+               "Metadata": dict(meta["Metadata"]), "ContentType": meta["ContentType"]}
+        if meta["ContentEncoding"]:
+            out["ContentEncoding"] = meta["ContentEncoding"]
+        return out
+
+    def list_objects_v2(self, Bucket, Prefix="", ContinuationToken=None, MaxKeys=1000, **kwargs):
+        self._count("list_objects_v2")
+        base = os.path.join(self.root, Bucket)
+        keys = []
+        for dirpath, _, files in os.walk(base):
+            for name in files:
+                keys.append(os.path.relpath(os.path.join(dirpath, name), base).replace(os.sep, "/"))
+        keys = sorted(k for k in keys if k.startswith(Prefix))
+        start = int(ContinuationToken) if ContinuationToken else 0
+        page = keys[start:start + MaxKeys]
+        out = {"KeyCount": len(page), "IsTruncated": start + MaxKeys < len(keys)}
+        if page:
+            out["Contents"] = []
+            for k in page:
+                path, meta = self._head(Bucket, k, "ListObjectsV2")
+                out["Contents"].append({"Key": k, "Size": os.path.getsize(path), "ETag": meta["ETag"]})
+        if out["IsTruncated"]:
+            out["NextContinuationToken"] = str(start + MaxKeys)
+        return out
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None, Config=None, Callback=None):
+        self._count("upload_file")
+        md5 = hashlib.md5()
+        with open(Filename, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                md5.update(block)
+        shutil.copyfile(Filename, self._path(Bucket, Key))
+        self._store_meta(Bucket, Key, '"%s"' % md5.hexdigest(), ExtraArgs)
+
+    def download_file(self, Bucket, Key, Filename, ExtraArgs=None, Config=None, Callback=None):
+        self._count("download_file")
+        path, _ = self._head(Bucket, Key, "HeadObject")
+        shutil.copyfile(path, Filename)
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self._count("create_multipart_upload")
+        upload_id = uuid.uuid4().hex
+        self._uploads[upload_id] = ({}, kwargs)
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self._count("upload_part")
+        self._uploads[UploadId][0][PartNumber] = bytes(Body)
+        return {"ETag": '"%s"' % hashlib.md5(Body).hexdigest()}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self._count("complete_multipart_upload")
+        parts, extra = self._uploads.pop(UploadId)
+        numbers = sorted(p["PartNumber"] for p in MultipartUpload["Parts"])
+        with open(self._path(Bucket, Key), "wb") as f:
+            for n in numbers:
+                f.write(parts[n])
+        digest = hashlib.md5(b"".join(hashlib.md5(parts[n]).digest() for n in numbers)).hexdigest()
+        self._store_meta(Bucket, Key, '"%s-%d"' % (digest, len(numbers)), extra)
+        return {"Bucket": Bucket, "Key": Key}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self._count("abort_multipart_upload")
+        self._uploads.pop(UploadId, None)
+
+class FakeComprehend:
+    """
+    batch_detect_sentiment / batch_detect_key_phrases look-alike.
+    throttle_rate: probability a whole call raises ThrottlingException
+    item_error_rate: probability each document lands in ErrorList instead
+    """
+
+    def __init__(self, latency=0.0, throttle_rate=0.0, item_error_rate=0.0, seed=0):
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.item_error_rate = item_error_rate
+        self.calls = Counter()
+        self.documents = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _batch(self, op, TextList, LanguageCode, fn):
+        if len(TextList) > 25:
+            raise _client_error("BatchSizeLimitExceededException", op)
+        with self._lock:
+            self.calls[op] += 1
+            throttled = self._rng.random() < self.throttle_rate
+            failed = {i for i in range(len(TextList)) if self._rng.random() < self.item_error_rate}
+        time.sleep(self.latency)
+        if throttled:
+            raise _client_error("ThrottlingException", op)
+        results, errors = [], []
+        for i, text in enumerate(TextList):
+            if i in failed or not text or len(text.encode("utf-8")) > 5000:
+                errors.append({"Index": i, "ErrorCode": "INTERNAL_SERVER_ERROR", "ErrorMessage": "fake failure"})
+            else:
+                results.append(dict(Index=i, **fn(text)))
+        with self._lock:
+            self.documents += len(results)
+        return {"ResultList": results, "ErrorList": errors}
+
+    def batch_detect_sentiment(self, TextList, LanguageCode):
+        return self._batch("BatchDetectSentiment", TextList, LanguageCode,
+                           lambda t: {"Sentiment": keyword_label(t).upper()})
+
+    def batch_detect_key_phrases(self, TextList, LanguageCode):
+        def phrases(t):
+            words = [w.strip(".,!?") for w in t.split()]
+            return {"KeyPhrases": [{"Text": w, "Score": 0.9} for w in words if len(w) > 5][:5]}
+        return self._batch("BatchDetectKeyPhrases", TextList, LanguageCode, phrases)
+
+class FakeCloudWatchLogs:
+    """
+    put_log_events look-alike with sequence tokens and the CloudWatch batch
+    limits (10,000 events / 1 MB, chronological order). Events are kept in
+    memory per (group, stream) unless keep_events=False.
+    """
+
+    class InvalidSequenceTokenException(ClientError):
+        pass
+
+    class DataAlreadyAcceptedException(ClientError):
+        pass
+
+    def __init__(self, latency=0.0, keep_events=True):
+        self.latency = latency
+        self.keep_events = keep_events
+        self.calls = Counter()
+        self.events = {}
+        self.event_count = 0
+        self.exceptions = SimpleNamespace(
+            InvalidSequenceTokenException=self.InvalidSequenceTokenException,
+            DataAlreadyAcceptedException=self.DataAlreadyAcceptedException,
+            ResourceAlreadyExistsException=ClientError,
+        )
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def create_log_group(self, logGroupName, **kwargs):
+        self.calls["create_log_group"] += 1
+
+    def create_log_stream(self, logGroupName, logStreamName):
+        self.calls["create_log_stream"] += 1
+
+    def put_log_events(self, logGroupName, logStreamName, logEvents, sequenceToken=None):
+        time.sleep(self.latency)
+        stream = (logGroupName, logStreamName)
+        size = sum(len(ev["message"].encode("utf-8")) + 26 for ev in logEvents)
+        if len(logEvents) > 10_000 or size > 1_048_576:
+            raise _client_error("InvalidParameterException", "PutLogEvents", 400, "batch too large")
+        if any(a["timestamp"] > b["timestamp"] for a, b in zip(logEvents, logEvents[1:])):
+            raise _client_error("InvalidParameterException", "PutLogEvents", 400, "events out of order")
+        with self._lock:
+            self.calls["put_log_events"] += 1
+            expected = self._tokens.get(stream)
+            if expected is not None and sequenceToken != expected:
+                err = self.InvalidSequenceTokenException(
+                    {"Error": {"Code": "InvalidSequenceTokenException"}, "expectedSequenceToken": expected},
+                    "PutLogEvents"
+                )
+                raise err
+            token = uuid.uuid4().hex
+            self._tokens[stream] = token
+            self.event_count += len(logEvents)
+            if self.keep_events:
+                self.events.setdefault(stream, []).extend(logEvents)
+        return {"nextSequenceToken": token}
+
+    def filter_log_events(self, logGroupName, startTime=0, nextToken=None, limit=10_000, **kwargs):
+        """Events of every stream in the group at or after startTime, oldest first, paginated."""
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls["filter_log_events"] += 1
+            matched = [
+                dict(ev, logStreamName=stream, eventId=f"{stream}/{i}")
+                for (group, stream), events in self.events.items() if group == logGroupName
+                for i, ev in enumerate(events) if ev["timestamp"] >= startTime
+            ]
+        matched.sort(key=lambda ev: ev["timestamp"])
+        start = int(nextToken or 0)
+        page = {"events": matched[start:start + limit]}
+        if start + limit < len(matched):
+            page["nextToken"] = str(start + limit)
+        return page
@@ -0,0 +1,161 @@
+# scripts/local_server.py
+# Local stand-in for the SageMaker endpoint: same model_fn, same /invocations contract,
+# with concurrent single-text requests gathered into micro-batches.
+#
+#   python scripts/local_server.py --model-dir model_bundle --port 8080
+#   FEEDBACK_ENDPOINT_URL=http://127.0.0.1:8080 streamlit run app/app.py
+#   FEEDBACK_CAPTURE_FILE=data/captured_requests.jsonl python scripts/local_server.py   # record traffic for replay.py
+
+import os, sys, time, asyncio, argparse
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Response
+import uvicorn
+
+# Reuse the exact handler that ships with the endpoint
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "notebook"))
+import inference
+import request_capture
+
+MODEL_DIR = "model_bundle"
+MAX_BATCH_SIZE = 64
+MAX_WAIT_MS = 5
+
+class MicroBatcher:
+    """
+    Collects queued texts until max_batch_size is reached or max_wait_ms has
+    passed since the first one arrived, then scores them with one
+    predict_many(texts) call in a worker thread.
+    """
+
+    def __init__(self, predict_many, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.predict_many = predict_many
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.requests = 0
+        self._queue = None
+        self._task = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, text):
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, fut))
+        return await fut
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            texts = [t for t, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, self.predict_many, texts)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.requests += len(batch)
+            for (_, fut), res in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(res)
+
+def create_app(model_dir=MODEL_DIR, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+    model_bundle = inference.model_fn(model_dir)
+
+    def predict_many(texts):
+        return inference.predict_fn(list(texts), model_bundle)
+
+    batcher = MicroBatcher(predict_many, max_batch_size, max_wait_ms)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await batcher.start()
+        yield
+        await batcher.stop()
+
+    app = FastAPI(title="feedback-analyzer local endpoint", lifespan=lifespan)
+    app.state.batcher = batcher
+
+    @app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    @app.get("/stats")
+    async def stats():
+        avg = batcher.requests / batcher.batches if batcher.batches else 0.0
+        return {"batches": batcher.batches, "requests": batcher.requests, "avg_batch_size": avg}
+
+    @app.post("/invocations")
+    async def invocations(request: Request):
+        body = await request.body()
+        content_type = request.headers.get("content-type", "application/json")
+        accept = request.headers.get("accept", "application/json")
+        started = time.perf_counter()
+        try:
+            data = inference.input_fn(body, content_type)
+        except inference.UnsupportedContentType as e:
+            return Response(content=str(e), status_code=415)
+        except ValueError as e:
+            # supported type, malformed body (bad JSON line, invalid UTF-8...)
+            return Response(content=f"Malformed request body: {e}", status_code=400)
+        # requests interleave on the event loop thread: capture here, not per thread in the handlers
+        request_capture.take()
+
+        if isinstance(data, str):
+            # single text → micro-batched; keep the original [label] response
+            row = await batcher.submit(data)
+            prediction = [row["label"]]
+        else:
+            # already a batch → score it directly
+            prediction = await asyncio.get_running_loop().run_in_executor(None, predict_many, data)
+
+        payload, media_type = inference.output_fn(prediction, accept)
+        request_capture.record(data, (time.perf_counter() - started) * 1000, "local_server")
+        return Response(content=payload, media_type=media_type)
+
+    return app
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-dir", type=str, default=MODEL_DIR)
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    app = create_app(args.model_dir, args.max_batch_size, args.max_wait_ms)
+    print(f"🚀 Serving {args.model_dir} on http://{args.host}:{args.port}/invocations")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
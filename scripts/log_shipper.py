@@ -0,0 +1,197 @@
+# scripts/log_shipper.py
+# Buffered, background CloudWatch Logs shipping: callers enqueue events and a
+# worker thread sends them in put_log_events-sized batches.
+
+import json
+import time
+import queue
+import atexit
+import threading
+
+# CloudWatch Logs PutLogEvents limits
+MAX_BATCH_EVENTS = 10_000
+MAX_BATCH_BYTES = 1_048_576
+EVENT_OVERHEAD = 26                 # bytes CloudWatch adds per event
+MAX_EVENT_BYTES = 256 * 1024 - EVENT_OVERHEAD
+
+FLUSH_INTERVAL = 5.0                # seconds
+MAX_QUEUE = 100_000
+
+def fit_message(message, limit=MAX_EVENT_BYTES):
+    """
+    Event message within CloudWatch's per-event limit. A dict stays valid
+    JSON: its largest fields are shortened (strings) or nulled (anything
+    else) and "truncated": true is added. A plain string is cut.
+    """
+    if isinstance(message, str):
+        encoded = message.encode("utf-8")
+        return message if len(encoded) <= limit else encoded[:limit].decode("utf-8", "ignore")
+    body = json.dumps(message)
+    if len(body.encode("utf-8")) <= limit:
+        return body
+    message = dict(message, truncated=True)
+    while True:
+        body = json.dumps(message)
+        excess = len(body.encode("utf-8")) - limit
+        if excess <= 0:
+            return body
+        sizes = {k: len(json.dumps(v)) for k, v in message.items() if k != "truncated" and v is not None}
+        if not sizes:
+            return json.dumps({"truncated": True})
+        field = max(sizes, key=sizes.get)
+        value = message[field]
+        if isinstance(value, str) and value:
+            # escaped characters take up to 6 bytes each: cut by the field's own bytes per character
+            keep = len(value) - int(excess * len(value) / sizes[field]) - 1
+            if keep > 0:
+                message[field] = value[:keep]
+                continue
+        message[field] = None
+
+class CloudWatchSink:
+    """Sends a batch of {'timestamp', 'message'} events to one log stream."""
+
+    def __init__(self, logs, group, stream):
+        self.logs = logs
+        self.group = group
+        self.stream = stream
+        self._token = None
+
+    def put_events(self, events):
+        kwargs = dict(logGroupName=self.group, logStreamName=self.stream, logEvents=events)
+        if self._token:
+            kwargs["sequenceToken"] = self._token
+        try:
+            resp = self.logs.put_log_events(**kwargs)
+        except (self.logs.exceptions.InvalidSequenceTokenException,
+                self.logs.exceptions.DataAlreadyAcceptedException) as e:
+            kwargs["sequenceToken"] = e.response["expectedSequenceToken"]
+            resp = self.logs.put_log_events(**kwargs)
+        self._token = resp.get("nextSequenceToken")
+
+class FileSink:
+    """Appends events as JSON lines – local stand-in for CloudWatch."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def put_events(self, events):
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            for ev in events:
+                f.write(json.dumps(ev) + "\n")
+
+class LogShipper:
+    """
+    emit() never does network I/O. A daemon thread drains the queue and
+    flushes whenever a batch reaches max_batch_events / max_batch_bytes or
+    flush_interval seconds have passed. When the queue is full, emit()
+    either blocks for up to block_timeout seconds (block=True) or drops the
+    event and bumps self.dropped. close() drains everything before returning
+    and is registered with atexit.
+    """
+
+    def __init__(self, sink, max_batch_events=MAX_BATCH_EVENTS, max_batch_bytes=MAX_BATCH_BYTES,
+                 flush_interval=FLUSH_INTERVAL, max_queue=MAX_QUEUE, block=False, block_timeout=1.0):
+        self.sink = sink
+        self.max_batch_events = min(max_batch_events, MAX_BATCH_EVENTS)
+        self.max_batch_bytes = min(max_batch_bytes, MAX_BATCH_BYTES)
+        self.flush_interval = flush_interval
+        self.block = block
+        self.block_timeout = block_timeout
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="log-shipper", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def emit(self, message):
+        """Queue one event (dict or str). Returns False if it was dropped."""
+        if self._closed.is_set():
+            self.dropped += 1
+            return False
+        body = fit_message(message)
+        event = {"timestamp": int(time.time() * 1000), "message": body}
+        try:
+            if self.block:
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _send(self, batch):
+        if not batch:
+            return
+        batch.sort(key=lambda ev: ev["timestamp"])   # CloudWatch wants chronological order
+        try:
+            self.sink.put_events(batch)
+            self.sent += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"[log_shipper] dropped batch of {len(batch)} events: {e}")
+
+    def _run(self):
+        batch, size = [], 0
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            closing = self._closed.is_set()
+            timeout = 0.05 if closing else max(0.0, deadline - time.monotonic())
+            try:
+                event = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                event = None
+            if isinstance(event, threading.Event):
+                # flush() marker: ship what we have and wake the caller
+                self._send(batch)
+                batch, size = [], 0
+                deadline = time.monotonic() + self.flush_interval
+                event.set()
+                continue
+            if event is not None:
+                ev_size = len(event["message"].encode("utf-8")) + EVENT_OVERHEAD
+                if batch and (len(batch) >= self.max_batch_events or size + ev_size > self.max_batch_bytes):
+                    self._send(batch)
+                    batch, size = [], 0
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(event)
+                size += ev_size
+            if time.monotonic() >= deadline or (event is None and closing):
+                self._send(batch)
+                batch, size = [], 0
+                deadline = time.monotonic() + self.flush_interval
+                if closing and event is None:
+                    return
+
+    def flush(self, timeout=10.0):
+        """Block until everything queued so far has been handed to the sink."""
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=10.0):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        try:
+            # wake the worker if it is parked in queue.get() for the rest of flush_interval
+            self._queue.put_nowait(threading.Event())
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "sent": self.sent, "dropped": self.dropped, "failed": self.failed,
+            "batches": self.batches, "queued": self._queue.qsize()
+        }
@@ -0,0 +1,238 @@
+# scripts/near_dedup.py
+# Near-duplicate collapsing before paid calls (endpoint, Comprehend): texts are
+# shingled, MinHash-signed and bucketed with LSH; each cluster sends one
+# representative and its result is fanned back out to every member.
+#
+# "Near-identical" means estimated Jaccard similarity of character shingles
+# >= threshold, after normalization that masks what usually differs between
+# template complaints and retweets: long digit runs (order numbers, IDs),
+# URLs, @mentions and a leading "RT". Short numbers stay: "1 star" and
+# "5 stars" or "0/10" and "10/10" carry the sentiment. So do negations:
+# texts are only clustered when their negation words ("not", "no",
+# "never", "n't"...) and the word after each one match exactly, so
+# "would buy again" and "would not buy again" never share a label.
+#
+# The default threshold (1.0) collapses exact canonical duplicates only;
+# near-duplicate matching is opt-in via FEEDBACK_DEDUP_THRESHOLD.
+
+import os
+import re
+
+import numpy as np
+
+from prediction_cache import normalize_text
+
+THRESHOLD = float(os.environ.get("FEEDBACK_DEDUP_THRESHOLD", "1.0"))    # 1 = exact only, <= 0 disables
+NUM_PERM = 128
+SHINGLE = 5                         # bytes per shingle (at most 8)
+CHUNK_SHINGLES = 65_536             # shingles per hashed matrix (64 MB at 128 perms, 8 bytes each)
+MIN_RECALL = 0.95                   # P(candidate) at the threshold when picking LSH bands
+SEED = 1
+
+_URL_OR_MENTION = re.compile(r"https?://\S+|www\.\S+|@\w+")
+_RT = re.compile(r"^rt\s*:?\s*")
+_LONG_DIGITS = re.compile(r"\d{5,}")
+_PUNCT = re.compile(r"[^\w\s]")
+_NEGATION = re.compile(
+    r"\b(not|no|never|nor|none|nothing|nobody|neither|nowhere|cannot|without|\w+n[’']t)\b(?:\W+(\w+))?"
+)
+
+def canonical(text):
+    """normalize_text + mask the parts that vary between copies of the same message."""
+    t = normalize_text(text)
+    t = _URL_OR_MENTION.sub(" ", t)
+    t = _RT.sub("", t.strip())
+    t = _LONG_DIGITS.sub("0", t)
+    t = _PUNCT.sub(" ", t)
+    return " ".join(t.split())
+
+def negations(text):
+    """Negation words and the word each one negates, in order – must match for two texts to cluster."""
+    t = _URL_OR_MENTION.sub(" ", normalize_text(text))
+    return tuple(m.groups() for m in _NEGATION.finditer(t))
+
+def choose_bands(threshold, num_perm=NUM_PERM, min_recall=MIN_RECALL):
+    """
+    (bands, rows) for LSH: the most selective split (largest rows per band)
+    that still makes a pair at `threshold` a candidate with probability
+    >= min_recall. Candidates are verified against the threshold afterwards.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= min_recall:
+            best = (bands, rows)
+    return best
+
+class MinHasher:
+    """Multiply-shift hash family: h_i(x) = ((a_i * x + b_i) mod 2^64) >> 32."""
+
+    def __init__(self, num_perm=NUM_PERM, seed=SEED):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    def signatures(self, texts, k=SHINGLE):
+        """
+        (n, num_perm) uint32 signatures of the character k-gram sets of texts.
+        Each k-gram's UTF-8 bytes are packed into one integer (exact for
+        k <= 8), so no per-shingle Python work is needed. Repeated k-grams
+        do not change a minimum, so sets are never materialized.
+        """
+        out = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        start = 0
+        while start < len(texts):
+            # texts up to ~CHUNK_SHINGLES bytes (one shingle per byte); a longer text goes alone
+            encoded, size = [], 0
+            for t in texts[start:]:
+                e = t.encode("utf-8").ljust(k)
+                if encoded and size + len(e) > CHUNK_SHINGLES:
+                    break
+                encoded.append(e)
+                size += len(e)
+            out[start:start + len(encoded)] = self._chunk_minima(encoded, k)
+            start += len(encoded)
+        return out
+
+    def _chunk_minima(self, encoded, k):
+        lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+
+        # packed k-gram starting at every byte position of the joined buffer
+        grams = np.zeros(len(data) - k + 1, dtype=np.uint64)
+        for j in range(k):
+            grams = (grams << np.uint64(8)) | data[j:len(data) - k + 1 + j]
+
+        # keep only the windows that lie inside a single text
+        counts = lengths - k + 1
+        text_start = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        first_gram = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        positions = np.arange(int(counts.sum())) + np.repeat(text_start - first_gram, counts)
+        grams = grams[positions]
+
+        # hash CHUNK_SHINGLES columns at a time, so a single long text cannot blow up the matrix;
+        # a text cut by a slice boundary gets the minimum of its pieces
+        minima = np.full((len(encoded), self.num_perm), np.iinfo(np.uint64).max, dtype=np.uint64)
+        for lo in range(0, len(grams), CHUNK_SHINGLES):
+            hi = min(lo + CHUNK_SHINGLES, len(grams))
+            inside = first_gram[(first_gram > lo) & (first_gram < hi)]
+            cuts = np.concatenate([[lo], inside]) - lo
+            owner = np.searchsorted(first_gram, lo + cuts, side="right") - 1
+
+            # (num_perm, shingles), in place: reduceat along the contiguous axis is much faster
+            hashed = np.multiply.outer(self.a, grams[lo:hi])
+            hashed += self.b[:, None]
+            hashed >>= np.uint64(32)
+            minima[owner] = np.minimum(minima[owner], np.minimum.reduceat(hashed, cuts, axis=1).T)
+        return minima
+
+    def band_hashes(self, sigs, bands):
+        """(n, bands) uint64: one hash per LSH band of each signature."""
+        rows = sigs.shape[1] // bands
+        with np.errstate(over="ignore"):
+            mixed = sigs.reshape(len(sigs), bands, rows).astype(np.uint64) * self.a[:rows]
+            return mixed.sum(axis=2, dtype=np.uint64)
+
+class NearDuplicateCollapser:
+    """
+    collapse(texts) → (representative indices, cluster of each row).
+    map(texts, fn) calls fn once on the representatives and fans results out.
+    Rows are assigned greedily in input order to the most similar existing
+    representative (never to another member), so clusters cannot drift
+    through chains of pairwise-similar texts. threshold >= 1 collapses
+    exact canonical duplicates only; threshold <= 0 (or None) disables.
+    Counters accumulate across calls; stats() reports the dedup ratio.
+    """
+
+    def __init__(self, threshold=THRESHOLD, num_perm=NUM_PERM, shingle=SHINGLE, seed=SEED):
+        self.threshold = threshold
+        self.shingle = shingle
+        self.hasher = MinHasher(num_perm, seed)
+        self.bands, self.rows_per_band = choose_bands(min(threshold or 1.0, 1.0), num_perm)
+        self.rows = 0
+        self.sent = 0
+
+    @property
+    def enabled(self):
+        return bool(self.threshold and self.threshold > 0)
+
+    def collapse(self, texts):
+        texts = list(texts)
+        if not self.enabled:
+            return list(range(len(texts))), list(range(len(texts)))
+
+        # exact duplicates after canonicalization never need MinHash
+        first, exact_of = {}, []
+        for i, t in enumerate(texts):
+            exact_of.append(first.setdefault(canonical(t), i))
+        canon = list(first)                     # canonical text of each unique, in first-seen order
+        uniques = list(first.values())
+        unique_pos = {i: n for n, i in enumerate(uniques)}
+
+        rep_of_unique = list(range(len(uniques)))
+        if self.threshold < 1.0 and len(uniques) > 1:
+            sigs = self.hasher.signatures(canon, self.shingle)
+            bands = self.hasher.band_hashes(sigs, self.bands)
+            # only rows sharing at least one band with another row can be near-duplicates
+            shared = np.zeros(len(uniques), dtype=bool)
+            for b in range(self.bands):
+                _, inverse, counts = np.unique(bands[:, b], return_inverse=True, return_counts=True)
+                shared |= counts[inverse] > 1
+            buckets = [dict() for _ in range(self.bands)]
+            negs = {}
+            for n in np.flatnonzero(shared).tolist():
+                keys = bands[n].tolist()
+                candidates = {m for b, key in enumerate(keys) for m in buckets[b].get(key, ())}
+                negs[n] = negations(texts[uniques[n]])
+                best, best_sim = None, self.threshold
+                for m in candidates:
+                    if negs[m] != negs[n]:
+                        continue
+                    sim = float(np.count_nonzero(sigs[n] == sigs[m])) / sigs.shape[1]
+                    if sim >= best_sim:
+                        best, best_sim = m, sim
+                if best is not None:
+                    rep_of_unique[n] = best
+                    continue
+                for b, key in enumerate(keys):      # only representatives go into the buckets
+                    buckets[b].setdefault(key, []).append(n)
+
+        reps, cluster_of_rep, clusters = [], {}, []
+        for i in range(len(texts)):
+            rep = uniques[rep_of_unique[unique_pos[exact_of[i]]]]
+            if rep not in cluster_of_rep:
+                cluster_of_rep[rep] = len(reps)
+                reps.append(rep)
+            clusters.append(cluster_of_rep[rep])
+        return reps, clusters
+
+    def map(self, texts, fn, with_scored=False):
+        """
+        fn(list_of_texts) on one representative per cluster; one result per
+        input row. with_scored=True also returns, per row, whether fn saw that
+        row's own text – only those results may be cached under the row's text.
+        """
+        texts = list(texts)
+        reps, clusters = self.collapse(texts)
+        results = fn([texts[i] for i in reps]) if reps else []
+        self.rows += len(texts)
+        self.sent += len(reps)
+        fanned = [results[c] for c in clusters]
+        if not with_scored:
+            return fanned
+        scored = [False] * len(texts)
+        for i in reps:
+            scored[i] = True
+        return fanned, scored
+
+    def stats(self):
+        return {
+            "rows": self.rows,
+            "sent": self.sent,
+            "collapsed": self.rows - self.sent,
+            "dedup_ratio": (self.rows - self.sent) / self.rows if self.rows else 0.0,
+            "threshold": self.threshold,
+        }
@@ -0,0 +1,191 @@
+# scripts/prediction_cache.py
+# Content-addressed cache for model / Comprehend results:
+# in-memory LRU in front of a SQLite file, keyed by sha256(version + normalized text)
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+CACHE_PATH = os.environ.get("FEEDBACK_CACHE_PATH", ".cache/predictions.sqlite")
+MEMORY_ITEMS = 50_000
+MAX_DISK_BYTES = 256 * 1024 * 1024
+
+_WS = re.compile(r"\s+")
+
+def normalize_text(text):
+    """Unicode-normalize, trim, collapse whitespace and lowercase."""
+    text = unicodedata.normalize("NFKC", "" if text is None else str(text))
+    return _WS.sub(" ", text).strip().lower()
+
+def cache_key(text, version):
+    return hashlib.sha256(f"{version}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+class PredictionCache:
+    """
+    Two-tier cache. `version` namespaces entries (endpoint name, model
+    version, Comprehend settings...) so a new model never sees stale results.
+    Disk entries are evicted least-recently-used once the stored values
+    exceed max_disk_bytes. The byte total is kept running (one scan at open);
+    other processes sharing the file can make it drift, so it is recounted
+    before anything is evicted.
+    """
+
+    def __init__(self, path=CACHE_PATH, version="default", memory_items=MEMORY_ITEMS,
+                 max_disk_bytes=MAX_DISK_BYTES):
+        self.version = version
+        self.memory_items = memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_last_access ON cache(last_access)")
+        self._db.commit()
+        self._disk_bytes = self._count_bytes()
+
+    # --- memory tier ---
+    def _remember(self, key, value):
+        self._mem[key] = value
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.memory_items:
+            self._mem.popitem(last=False)
+
+    # --- bulk API ---
+    def get_many(self, texts):
+        """Return {key: value} for every cached text (keys from cache_key)."""
+        keys = {cache_key(t, self.version) for t in texts}
+        found = {}
+        with self._lock:
+            for k in keys:
+                if k in self._mem:
+                    self._mem.move_to_end(k)
+                    found[k] = self._mem[k]
+            self.memory_hits += len(found)
+            todo = [k for k in keys if k not in found]
+            now = time.time()
+            for i in range(0, len(todo), 500):
+                part = todo[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT key, value FROM cache WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                for k, v in rows:
+                    found[k] = json.loads(v)
+                    self._remember(k, found[k])
+            # memory hits count as use too, or hot entries would be the first evicted from disk
+            if found:
+                self._db.executemany("UPDATE cache SET last_access=? WHERE key=?", [(now, k) for k in found])
+            self._db.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        """Store an iterable of (text, value) pairs."""
+        now = time.time()
+        latest = {}
+        with self._lock:
+            for text, value in items:
+                k = cache_key(text, self.version)
+                blob = json.dumps(value)
+                latest[k] = (k, blob, len(blob), now)     # a repeated text: the last value wins
+                self._remember(k, value)
+            # one row per key, so a stored key is subtracted once even when repeated across slices
+            rows = list(latest.values())
+            replaced = 0
+            for i in range(0, len(rows), 500):
+                part = [r[0] for r in rows[i:i + 500]]
+                replaced += self._db.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM cache WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchone()[0]
+            self._db.executemany("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)", rows)
+            self._db.commit()
+            self._disk_bytes += sum(size for _, _, size, _ in rows) - replaced
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict()
+
+    def _count_bytes(self):
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def _evict(self):
+        total = self._disk_bytes = self._count_bytes()
+        if total <= self.max_disk_bytes:
+            return
+        # drop oldest entries until we are back under 90% of the budget
+        excess = total - int(self.max_disk_bytes * 0.9)
+        freed = 0
+        doomed = []
+        for k, size in self._db.execute("SELECT key, size FROM cache ORDER BY last_access"):
+            doomed.append((k,))
+            freed += size
+            if freed >= excess:
+                break
+        self._db.executemany("DELETE FROM cache WHERE key=?", doomed)
+        self._db.commit()
+        self._disk_bytes -= freed
+        for (k,) in doomed:
+            self._mem.pop(k, None)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        self._db.close()
+
+def cached_map(cache, texts, fn, keep=None, collapser=None):
+    """
+    Resolve texts through the cache and call fn(list_of_texts) only for the
+    distinct misses. fn must return one result per input. Results that are
+    None (or dicts with an "error" key) are returned but not cached, and so
+    are results for which keep(result) is false. With a collapser
+    (near_dedup.NearDuplicateCollapser) the misses are collapsed first, and
+    only the representatives fn actually scored are cached: a fanned-out
+    result is never stored under another text's key.
+    """
+    texts = list(texts)
+    keys = [cache_key(t, cache.version) for t in texts]
+    found = cache.get_many(texts)
+
+    miss_texts, seen = [], set()
+    for t, k in zip(texts, keys):
+        if k not in found and k not in seen:
+            seen.add(k)
+            miss_texts.append(t)
+
+    if miss_texts:
+        if collapser is None:
+            fresh, scored = fn(miss_texts), [True] * len(miss_texts)
+        else:
+            fresh, scored = collapser.map(miss_texts, fn, with_scored=True)
+        good = []
+        for t, v, own in zip(miss_texts, fresh, scored):
+            found[cache_key(t, cache.version)] = v
+            if not own:
+                continue
+            if v is not None and not (isinstance(v, dict) and "error" in v) and (keep is None or keep(v)):
+                good.append((t, v))
+        cache.put_many(good)
+
+    return [found[k] for k in keys]
@@ -0,0 +1,262 @@
+# scripts/replay.py
+# Load test that replays captured requests (see notebook/request_capture.py)
+# against the local server or the SageMaker endpoint at a controlled rate.
+#
+#   FEEDBACK_ENDPOINT_URL=http://127.0.0.1:8080 python scripts/replay.py data/captured_requests.jsonl --qps 50
+#   python scripts/replay.py data/captured_requests.jsonl --recorded --speed 4 --endpoint <name>
+#   python scripts/replay.py data/captured_requests.jsonl --sweep 25 50 100 200 400 --duration 20 --out /tmp/sweep.json
+#
+# Scheduling is open-loop: every request has a send time fixed up front
+# (evenly spaced or Poisson at --qps, or the captured inter-arrival times
+# divided by --speed) and is sent at that time whether or not earlier
+# requests have come back. Latency is measured from the scheduled send time,
+# so time spent queued behind a saturated target counts against it instead
+# of silently lowering the offered rate.
+#
+# Each step reports offered vs achieved QPS, latency percentiles and the
+# error rate. A sweep stops at the saturation point: the first step where
+# achieved QPS falls below --min-achieved of the offered rate, p99 exceeds
+# --slo-ms or the error rate exceeds --max-error-rate.
+
+import os
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from endpoint_client import make_runtime_client
+
+REGION = "us-east-1"
+ENDPOINT = "sagemaker-scikit-learn-2025-08-15-13-46-04-474"
+CAPTURE_FILE = os.environ.get("FEEDBACK_CAPTURE_FILE", "data/captured_requests.jsonl")
+CONCURRENCY = 256                     # in-flight requests before new ones queue client-side
+DURATION = 30                         # seconds per fixed-rate step
+MIN_ACHIEVED = 0.95                   # achieved / offered QPS below this → saturated
+MAX_ERROR_RATE = 0.01
+COOLDOWN = 2                          # seconds between sweep steps
+PERCENTILES = (50, 90, 95, 99)
+
+def load_capture(path, sources=None):
+    """Captured requests in timestamp order: dicts with ts and text (str) or texts (list)."""
+    requests = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue                    # a torn last line from a live capture
+            if sources and event.get("source") not in sources:
+                continue
+            if "text" in event or "texts" in event:
+                requests.append(event)
+    requests.sort(key=lambda e: e.get("ts", 0))
+    return requests
+
+def body_of(event):
+    """Same request shape the capture came from: {"text": ...} or a JSON array."""
+    if "text" in event:
+        return json.dumps({"text": event["text"]})
+    return json.dumps(event["texts"])
+
+def fixed_schedule(qps, duration, poisson=False, seed=0):
+    """Send offsets (seconds) for qps × duration requests."""
+    n = max(1, int(round(qps * duration)))
+    if not poisson:
+        return np.arange(n) / qps
+    offsets = np.cumsum(np.random.default_rng(seed).exponential(1.0 / qps, n))
+    offsets -= offsets[0]
+    # random gaps, but the same span (and so the same mean rate) as the even schedule
+    return offsets * ((n - 1) / qps / offsets[-1]) if n > 1 else offsets
+
+def recorded_schedule(requests, speed=1.0):
+    """Send offsets that reproduce the captured inter-arrival times, speed× faster."""
+    ts = np.array([e.get("ts", 0.0) for e in requests], dtype=float)
+    return (ts - ts[0]) / speed
+
+class Replayer:
+    """
+    run(bodies, offsets) sends bodies[i] at start + offsets[i] from a
+    dispatcher thread onto a pool of `concurrency` sender threads and
+    returns one (scheduled, started, finished, ok, error) tuple per request.
+    """
+
+    def __init__(self, rt, endpoint=ENDPOINT, concurrency=CONCURRENCY):
+        self.rt = rt
+        self.endpoint = endpoint
+        self.concurrency = concurrency
+
+    def _send(self, body, scheduled):
+        started = time.perf_counter()
+        try:
+            resp = self.rt.invoke_endpoint(EndpointName=self.endpoint, ContentType="application/json",
+                                           Accept="application/json", Body=body)
+            json.loads(resp["Body"].read())
+            return scheduled, started, time.perf_counter(), True, None
+        except Exception as e:
+            return scheduled, started, time.perf_counter(), False, type(e).__name__
+
+    def run(self, bodies, offsets, progress=True):
+        futures = []
+        stop = threading.Event()
+        reporter = None
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            t0 = time.perf_counter() + 0.05
+            if progress:
+                reporter = threading.Thread(target=self._progress, args=(futures, len(bodies), t0, stop),
+                                            daemon=True)
+                reporter.start()
+            for body, offset in zip(bodies, offsets):
+                scheduled = t0 + offset
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(pool.submit(self._send, body, scheduled))
+        stop.set()
+        if reporter is not None:
+            reporter.join()
+            print("\r" + " " * 60 + "\r", end="", flush=True)
+        return [f.result() for f in futures], t0
+
+    @staticmethod
+    def _progress(futures, total, t0, stop):
+        while not stop.wait(1.0):
+            done = sum(f.done() for f in list(futures))
+            print(f"\r⏳ {time.perf_counter() - t0:5.1f}s  sent {len(futures)}/{total}  done {done}",
+                  end="", flush=True)
+
+def summarize(results, t0, offered_qps):
+    """Latency (from scheduled send time), service time, achieved QPS and errors for one step."""
+    res = np.array([r[:3] for r in results], dtype=float)
+    ok = np.array([r[3] for r in results], dtype=bool)
+    latency = (res[:, 2] - res[:, 0]) * 1000
+    service = (res[:, 2] - res[:, 1]) * 1000
+    lag = np.maximum(res[:, 1] - res[:, 0], 0) * 1000
+    elapsed = max(res[:, 2].max() - t0, 1e-9)
+    errors = {}
+    for r in results:
+        if not r[3]:
+            errors[r[4]] = errors.get(r[4], 0) + 1
+    ok_latency = latency[ok] if ok.any() else latency
+    return {
+        "requests": len(results),
+        "offered_qps": round(offered_qps, 2),
+        "achieved_qps": round(int(ok.sum()) / elapsed, 2),
+        "error_rate": round(1 - ok.mean(), 4),
+        "errors": errors,
+        "latency_ms": {f"p{p}": round(float(np.percentile(ok_latency, p)), 2) for p in PERCENTILES},
+        "service_ms_p50": round(float(np.percentile(service, 50)), 2),
+        "max_ms": round(float(ok_latency.max()), 2),
+        "send_lag_ms_p99": round(float(np.percentile(lag, 99)), 2),
+    }
+
+def saturated(summary, slo_ms=None, min_achieved=MIN_ACHIEVED, max_error_rate=MAX_ERROR_RATE):
+    """Reasons this step is past the saturation point (empty list if it is not)."""
+    reasons = []
+    if summary["achieved_qps"] < min_achieved * summary["offered_qps"]:
+        reasons.append(f"achieved {summary['achieved_qps']:.1f} < {min_achieved:.0%} of offered")
+    if slo_ms is not None and summary["latency_ms"]["p99"] > slo_ms:
+        reasons.append(f"p99 {summary['latency_ms']['p99']:.0f}ms > SLO {slo_ms:.0f}ms")
+    if summary["error_rate"] > max_error_rate:
+        reasons.append(f"error rate {summary['error_rate']:.2%} > {max_error_rate:.2%}")
+    return reasons
+
+def print_step(summary, reasons):
+    lat = summary["latency_ms"]
+    flag = "🔴" if reasons else "🟢"
+    print(f"{flag} offered {summary['offered_qps']:8.1f}  achieved {summary['achieved_qps']:8.1f} qps  "
+          f"p50 {lat['p50']:7.1f}  p95 {lat['p95']:7.1f}  p99 {lat['p99']:7.1f} ms  "
+          f"errors {summary['error_rate']:6.2%}  ({summary['requests']} req)"
+          + (f"  ← {'; '.join(reasons)}" if reasons else ""))
+
+def make_client(args):
+    if args.fake_latency is not None:
+        from local_fakes import FakeSageMakerRuntime
+        return FakeSageMakerRuntime(latency=args.fake_latency)
+    if args.endpoint_url:
+        os.environ["FEEDBACK_ENDPOINT_URL"] = args.endpoint_url
+    return make_runtime_client(REGION, max_pool_connections=args.concurrency)
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("capture", nargs="?", default=CAPTURE_FILE, help="JSONL written by request_capture")
+    rate = parser.add_mutually_exclusive_group()
+    rate.add_argument("--qps", type=float, default=None, help="fixed offered rate")
+    rate.add_argument("--recorded", action="store_true", help="replay the captured inter-arrival times")
+    rate.add_argument("--sweep", type=float, nargs="+", default=None, help="fixed-rate steps, lowest first")
+    parser.add_argument("--speed", type=float, default=1.0, help="--recorded: time compression factor")
+    parser.add_argument("--duration", type=float, default=DURATION, help="seconds per fixed-rate step")
+    parser.add_argument("--poisson", action="store_true", help="exponential inter-arrival times at --qps")
+    parser.add_argument("--source", nargs="*", default=None, help="only replay these capture sources")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--endpoint", default=ENDPOINT)
+    parser.add_argument("--endpoint-url", default=None, help="local server, e.g. http://127.0.0.1:8080")
+    parser.add_argument("--fake-latency", type=float, default=None,
+                        help="replay against an in-process fake endpoint with this latency (seconds)")
+    parser.add_argument("--slo-ms", type=float, default=None, help="p99 latency budget for saturation")
+    parser.add_argument("--min-achieved", type=float, default=MIN_ACHIEVED)
+    parser.add_argument("--max-error-rate", type=float, default=MAX_ERROR_RATE)
+    parser.add_argument("--out", default=None, help="write the full report as JSON")
+    args = parser.parse_args()
+    if not (args.qps or args.recorded or args.sweep):
+        parser.error("one of --qps, --recorded or --sweep is required")
+    for value, name in ((args.qps, "--qps"), (args.speed, "--speed"), (args.duration, "--duration")):
+        if value is not None and value <= 0:
+            parser.error(f"{name} must be positive")
+    if args.sweep and min(args.sweep) <= 0:
+        parser.error("--sweep rates must be positive")
+    return args
+
+def main():
+    args = parse_args()
+    requests = load_capture(args.capture, args.source)
+    if not requests:
+        raise SystemExit(f"❌ No captured requests in {args.capture}")
+    bodies = [body_of(e) for e in requests]
+    replayer = Replayer(make_client(args), args.endpoint, args.concurrency)
+    target = args.endpoint_url or os.environ.get("FEEDBACK_ENDPOINT_URL") or \
+        ("fake" if args.fake_latency is not None else args.endpoint)
+    print(f"🎯 Replaying {len(requests)} captured requests → {target}")
+
+    if args.recorded:
+        offsets = recorded_schedule(requests, args.speed)
+        span_s = max(float(offsets[-1]), 1e-9)
+        plans = [((len(offsets) - 1) / span_s if len(offsets) > 1 else 1.0, bodies, offsets)]
+    else:
+        plans = []
+        for qps in args.sweep or [args.qps]:
+            offsets = fixed_schedule(qps, args.duration, args.poisson)
+            # cycle through the capture when the step needs more requests than it holds
+            plans.append((qps, [bodies[i % len(bodies)] for i in range(len(offsets))], offsets))
+
+    report = {"capture": args.capture, "target": target, "steps": [], "saturation_qps": None,
+              "max_sustained_qps": None}
+    for n, (qps, step_bodies, offsets) in enumerate(plans):
+        if n:
+            time.sleep(COOLDOWN)
+        results, t0 = replayer.run(step_bodies, offsets)
+        summary = summarize(results, t0, qps)
+        reasons = saturated(summary, args.slo_ms, args.min_achieved, args.max_error_rate)
+        summary["saturated"] = reasons
+        report["steps"].append(summary)
+        print_step(summary, reasons)
+        if reasons:
+            report["saturation_qps"] = summary["offered_qps"]
+            break
+        report["max_sustained_qps"] = summary["offered_qps"]
+
+    if args.sweep:
+        if report["saturation_qps"] is not None:
+            print(f"📉 Saturation at {report['saturation_qps']:.1f} qps offered "
+                  f"(last sustained step: {report['max_sustained_qps'] or 0:.1f} qps)")
+        else:
+            print(f"✅ No saturation up to {report['max_sustained_qps']:.1f} qps")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report → {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+# scripts/s3_sync.py
+# Incremental, concurrent mirror of data/ and the model bundle to the bucket
+# layout in the README (input/, processed/, training/data/, models/, results/).
+#
+#   python scripts/s3_sync.py up                               # every SYNC_MAP rule
+#   python scripts/s3_sync.py up data/train_data.csv training/data/ --gzip
+#   python scripts/s3_sync.py down training/data/ notebook/data/
+#   python scripts/s3_sync.py up --fake-root /tmp/fake-s3      # against local_fakes.FakeS3
+#
+# Objects carry the SHA-256 of their uncompressed content in x-amz-meta-sha256.
+# A local state file remembers file hashes (by size + mtime) and the hash
+# behind each remote ETag, so a repeat run is one LIST per prefix and a stat()
+# per file: nothing is re-read, HEADed or transferred unless it changed.
+
+import os
+import gzip
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+
+REGION = "us-east-1"
+BUCKET = "grey-customer-feedback-bucket"
+STATE_PATH = os.environ.get("FEEDBACK_SYNC_STATE", os.path.join(".cache", "s3_sync", "state.json"))
+MAX_WORKERS = 8                       # files in flight
+PART_WORKERS = 4                      # parts in flight per large file
+MULTIPART_THRESHOLD = 16 * 1024 * 1024
+MIN_PART = 16 * 1024 * 1024
+MAX_PARTS = 10_000                    # S3 limit per multipart upload
+GZIP_SUFFIXES = (".csv", ".jsonl")
+GZIP_LEVEL = 6
+HASH_BLOCK = 1024 * 1024
+
+# local path (file or directory) → key prefix, per the README bucket layout
+SYNC_MAP = [
+    ("data/reviews.csv", "input/"),
+    ("data/feedback_samples.csv", "input/"),
+    ("data/reviews_analysis.csv", "processed/"),
+    ("data/train_data.csv", "training/data/"),
+    ("data/val.csv", "training/data/"),
+    ("data/model_predictions.csv", "results/"),
+    ("model_bundle", "models/model_bundle/"),
+]
+
+def file_digests(path):
+    """(sha256, md5) hex digests of a file, read once in blocks."""
+    sha, md5 = hashlib.sha256(), hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            sha.update(block)
+            md5.update(block)
+    return sha.hexdigest(), md5.hexdigest()
+
+def partial_file(directory, suffix=".part"):
+    """
+    New empty file in directory for an in-progress download. Created 0666 so
+    the kernel applies the process umask (mkstemp files are 0600), without
+    reading or changing the umask.
+    """
+    while True:
+        path = os.path.join(directory, f".s3sync-{os.urandom(6).hex()}{suffix}")
+        try:
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+            return path
+        except FileExistsError:
+            continue
+
+def transfer_config(size):
+    """Parts of at least MIN_PART, grown so a file never needs more than MAX_PARTS."""
+    chunk = max(MIN_PART, -(-size // (MAX_PARTS - 1)))
+    return TransferConfig(multipart_threshold=MULTIPART_THRESHOLD, multipart_chunksize=chunk,
+                          max_concurrency=PART_WORKERS, use_threads=True)
+
+class SyncState:
+    """
+    Persistent memo, saved as JSON:
+    files:   absolute path → [size, mtime_ns, sha256, md5]
+    objects: bucket/key    → [etag, sha256 or None, content-encoding or None]
+    """
+
+    def __init__(self, path=STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.files, self.objects = {}, {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                self.files, self.objects = data.get("files", {}), data.get("objects", {})
+            except (OSError, ValueError):
+                pass                        # corrupt state only costs a rehash
+
+    def local(self, path):
+        """(sha256, md5) of a local file, cached while size and mtime are unchanged."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        cached = self.files.get(path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2], cached[3]
+        sha, md5 = file_digests(path)
+        with self._lock:
+            self.files[path] = [st.st_size, st.st_mtime_ns, sha, md5]
+        return sha, md5
+
+    def record_local(self, path, sha, md5):
+        """Remember the digests of a file this process just wrote."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        with self._lock:
+            self.files[path] = [st.st_size, st.st_mtime_ns, sha, md5]
+
+    def remote(self, ident, etag):
+        cached = self.objects.get(ident)
+        if cached and cached[0] == etag:
+            return cached[1], cached[2]
+        return None
+
+    def remember(self, ident, etag, sha, encoding):
+        with self._lock:
+            self.objects[ident] = [etag, sha, encoding]
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with self._lock, open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files, "objects": self.objects}, f)
+        os.replace(tmp, self.path)
+
+class S3Sync:
+    """
+    upload(local, prefix) / download(prefix, local) mirror a file or a
+    directory tree, skipping anything whose content hash already matches.
+    Returns a report dict: transferred / skipped / failed counts, bytes, seconds.
+    """
+
+    def __init__(self, s3, bucket=BUCKET, state=None, workers=MAX_WORKERS, compress=False, dry_run=False):
+        self.s3 = s3
+        self.bucket = bucket
+        self.state = state if state is not None else SyncState()
+        self.workers = workers
+        self.compress = compress
+        self.dry_run = dry_run
+
+    # --- remote side ---------------------------------------------------------------
+
+    def list(self, prefix):
+        """{key: (etag, size)} under prefix (all pages)."""
+        out, token = {}, None
+        while True:
+            kwargs = {"Bucket": self.bucket, "Prefix": prefix}
+            if token:
+                kwargs["ContinuationToken"] = token
+            page = self.s3.list_objects_v2(**kwargs)
+            for obj in page.get("Contents", []):
+                out[obj["Key"]] = (obj["ETag"], obj["Size"])
+            if not page.get("IsTruncated"):
+                return out
+            token = page["NextContinuationToken"]
+
+    def remote_digest(self, key, etag):
+        """(sha256 or None, content-encoding or None) for an object, HEADing only unseen ETags."""
+        ident = f"{self.bucket}/{key}"
+        known = self.state.remote(ident, etag)
+        if known is not None:
+            return known
+        head = self.s3.head_object(Bucket=self.bucket, Key=key)
+        sha = head.get("Metadata", {}).get("sha256")
+        encoding = head.get("ContentEncoding")
+        self.state.remember(ident, etag, sha, encoding)
+        return sha, encoding
+
+    def matches(self, path, key, listed):
+        """True if the object at key already holds the content of path."""
+        if listed is None or not os.path.exists(path):
+            return False
+        etag, _ = listed
+        sha, md5 = self.state.local(path)
+        remote_sha, encoding = self.remote_digest(key, etag)
+        if remote_sha:
+            return remote_sha == sha
+        # uploaded by something else: a plain (single-part, uncompressed) ETag is the MD5
+        plain = etag.strip('"')
+        return encoding is None and "-" not in plain and plain == md5
+
+    # --- transfers -------------------------------------------------------------
+
+    def put(self, path, key):
+        """Upload one file (gzip-compressed when enabled for its type); returns bytes sent."""
+        sha, _ = self.state.local(path)
+        content_type = mimetypes.guess_type(path)[0] or "binary/octet-stream"
+        extra = {"Metadata": {"sha256": sha}, "ContentType": content_type}
+        source, tmp = path, None
+        if self.compress and path.endswith(GZIP_SUFFIXES):
+            fd, tmp = tempfile.mkstemp(suffix=".gz")
+            with os.fdopen(fd, "wb") as raw, open(path, "rb") as src, \
+                    gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=GZIP_LEVEL, mtime=0) as gz:
+                shutil.copyfileobj(src, gz, HASH_BLOCK)
+            extra["ContentEncoding"] = "gzip"
+            source = tmp
+        try:
+            size = os.path.getsize(source)
+            self.s3.upload_file(source, self.bucket, key, ExtraArgs=extra, Config=transfer_config(size))
+        finally:
+            if tmp:
+                os.remove(tmp)
+        # upload_file does not return the ETag; record it so the next run needs no HEAD
+        etag = self.s3.head_object(Bucket=self.bucket, Key=key)["ETag"]
+        self.state.remember(f"{self.bucket}/{key}", etag, sha, extra.get("ContentEncoding"))
+        return size
+
+    def get(self, key, path, size):
+        """Download one object (gunzipping Content-Encoding: gzip), verified against its sha256."""
+        head = self.s3.head_object(Bucket=self.bucket, Key=key)
+        encoding = head.get("ContentEncoding")
+        expected = head.get("Metadata", {}).get("sha256")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = partial_file(os.path.dirname(os.path.abspath(path)))
+        try:
+            self.s3.download_file(self.bucket, key, tmp, Config=transfer_config(size))
+            if encoding == "gzip":
+                plain = tmp + ".plain"
+                with gzip.open(tmp, "rb") as src, open(plain, "wb") as dst:
+                    shutil.copyfileobj(src, dst, HASH_BLOCK)
+                os.replace(plain, tmp)
+            sha, md5 = file_digests(tmp)
+            if expected and sha != expected:
+                raise IOError(f"sha256 mismatch for s3://{self.bucket}/{key}")
+            os.replace(tmp, path)
+            self.state.record_local(path, sha, md5)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.state.remember(f"{self.bucket}/{key}", head["ETag"], expected, encoding)
+        return size
+
+    def _run(self, jobs, transfer, verb):
+        """jobs: [(path, key, listed)] → report; decisions and transfers run in the pool."""
+        report = {"transferred": 0, "skipped": 0, "failed": 0, "bytes": 0}
+        lock = threading.Lock()
+        started = time.perf_counter()
+
+        def one(job):
+            path, key, listed = job
+            try:
+                if self.matches(path, key, listed):
+                    outcome, sent = "skipped", 0
+                elif self.dry_run:
+                    outcome, sent = "transferred", 0
+                    print(f"📝 would {verb} {path} ↔ s3://{self.bucket}/{key}")
+                else:
+                    sent = transfer(path, key, listed)
+                    outcome = "transferred"
+            except (ClientError, OSError) as e:
+                print(f"❌ {verb} failed for {key}: {e}")
+                outcome, sent = "failed", 0
+            with lock:
+                report[outcome] += 1
+                report["bytes"] += sent
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(one, jobs))
+        self.state.save()
+        report["seconds"] = round(time.perf_counter() - started, 3)
+        return report
+
+    def upload(self, local, prefix):
+        """Mirror a file or directory to s3://bucket/prefix (a file keeps its name under a '/' prefix)."""
+        if os.path.isdir(local):
+            pairs = []
+            for dirpath, _, files in os.walk(local):
+                for name in sorted(files):
+                    path = os.path.join(dirpath, name)
+                    pairs.append((path, prefix + os.path.relpath(path, local).replace(os.sep, "/")))
+        elif os.path.isfile(local):
+            key = prefix + os.path.basename(local) if prefix.endswith("/") or not prefix else prefix
+            pairs = [(local, key)]
+        else:
+            raise FileNotFoundError(f"Missing file: {local}")
+        listed = self.list(prefix if os.path.isdir(local) else pairs[0][1])
+        jobs = [(path, key, listed.get(key)) for path, key in pairs]
+        return self._run(jobs, lambda path, key, _: self.put(path, key), "upload")
+
+    def download(self, prefix, local):
+        """Mirror s3://bucket/prefix into a directory (or to a file when prefix is one key)."""
+        listed = self.list(prefix)
+        if prefix in listed and not prefix.endswith("/"):
+            target = os.path.join(local, os.path.basename(prefix)) if os.path.isdir(local) else local
+            jobs = [(target, prefix, listed[prefix])]
+        else:
+            jobs = [(os.path.join(local, *key[len(prefix):].lstrip("/").split("/")), key, info)
+                    for key, info in sorted(listed.items()) if not key.endswith("/")]
+        return self._run(jobs, lambda path, key, info: self.get(key, path, info[1]), "download")
+
+def upload_if_changed(s3, path, bucket, key, compress=False):
+    """Drop-in for s3.upload_file(path, bucket, key) that skips unchanged content."""
+    report = S3Sync(s3, bucket, compress=compress, workers=1).upload(path, key)
+    if report["failed"]:
+        raise RuntimeError(f"Upload of {path} to s3://{bucket}/{key} failed")
+    return report["transferred"] == 1
+
+def make_client(fake_root=None):
+    if fake_root:
+        from local_fakes import FakeS3
+        return FakeS3(fake_root)
+    return boto3.client("s3", region_name=REGION)
+
+def print_report(label, report):
+    print(f"{'✅' if not report['failed'] else '⚠️'} {label}: {report['transferred']} transferred "
+          f"({report['bytes'] / 1e6:.1f} MB), {report['skipped']} unchanged, {report['failed']} failed "
+          f"in {report['seconds']:.2f}s")
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("direction", choices=["up", "down"])
+    parser.add_argument("source", nargs="?", help="up: local file/dir; down: key prefix (default: every SYNC_MAP rule)")
+    parser.add_argument("target", nargs="?", help="up: key prefix; down: local file/dir")
+    parser.add_argument("--bucket", default=BUCKET)
+    parser.add_argument("--gzip", action="store_true", help="gzip .csv/.jsonl uploads (Content-Encoding: gzip)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--fake-root", default=None, help="use a directory-backed fake S3 instead of AWS")
+    return parser.parse_intermixed_args()
+
+def main():
+    args = parse_args()
+    sync = S3Sync(make_client(args.fake_root), args.bucket, workers=args.workers,
+                  compress=args.gzip, dry_run=args.dry_run)
+    if args.source:
+        if not args.target:
+            raise SystemExit("❌ Give both a source and a target, or neither to use SYNC_MAP.")
+        rules = [(args.source, args.target)]
+    else:
+        rules = SYNC_MAP if args.direction == "up" else [(prefix, local) for local, prefix in SYNC_MAP]
+
+    for source, target in rules:
+        if args.direction == "up":
+            if not os.path.exists(source):
+                print(f"⏭️ {source} not found, skipping")
+                continue
+            print_report(f"{source} → s3://{args.bucket}/{target}", sync.upload(source, target))
+        else:
+            # SYNC_MAP pairs a local file with a shared prefix: fetch just that file's key
+            if not os.path.isdir(target) and source.endswith("/") and os.path.splitext(target)[1]:
+                source = source + os.path.basename(target)
+            print_report(f"s3://{args.bucket}/{source} → {target}", sync.download(source, target))
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,20 @@
 # Load Input from S3 → Run SageMaker Predictions → Save/Upload Results
 
-import boto3, json, os
+import boto3, hashlib, io, json, os, sys
 import pandas as pd
 import joblib
 
+# compact_model.py / linear_scorer.py ship with the endpoint code in notebook/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "notebook"))
+from endpoint_client import EndpointClient
+from linear_scorer import LinearScorer
+from stage_metrics import span, timed, enabled, snapshot, start_exporter
+from prediction_cache import PredictionCache, cached_map
+from near_dedup import NearDuplicateCollapser, THRESHOLD
+from analytics_store import AnalyticsStore, run_key
+from s3_sync import upload_if_changed
+from backend_router import BackendRouter, load_local_backend, served_by_endpoint
+
 # --- Config ---
 REGION = "us-east-1"
 ENDPOINT = "sagemaker-scikit-learn-2025-08-15-13-46-04-474"
@@ -11,20 +22,36 @@ INPUT_KEY = "input/feedback_samples.csv"   # S3 key for input file
 OUTPUT = "data/model_predictions.csv"
 BUCKET = "grey-customer-feedback-bucket"
 
-USE_LOCAL_FALLBACK = True
+USE_LOCAL_FALLBACK = True             # whole-run fallback if the remote path itself fails
+USE_ROUTER = True                     # per-batch circuit breaker + hedging to the local model (backend_router.py)
 UPLOAD_TO_S3 = True
+USE_CACHE = True
+WRITE_ANALYTICS = True                # append predictions to the Parquet analytics store (FEEDBACK_ANALYTICS_PATH)
+DEDUP_THRESHOLD = THRESHOLD           # FEEDBACK_DEDUP_THRESHOLD; 1 = exact duplicates share one prediction, 0 disables
+MAX_CONCURRENCY = 8
+MODEL_DIR = os.environ.get("FEEDBACK_MODEL_DIR", "model_bundle")   # holds model.joblib / vectorizer.joblib (+ compact/)
 
-def load_local_model():
-    """Load local model + vectorizer for offline predictions."""
-    model = joblib.load("model.joblib")
-    vectorizer = joblib.load("vectorizer.joblib")
-    return model, vectorizer
+def load_local_model(model_dir=MODEL_DIR):
+    """
+    Load local model + vectorizer for offline predictions (memory-mapped
+    compact bundle if present), plus the linear fast-path scorer when the
+    model supports it (None otherwise).
+    """
+    if os.path.exists(os.path.join(model_dir, "compact", "manifest.json")):
+        from compact_model import load_compact
+        model, vectorizer, _ = load_compact(model_dir)
+    else:
+        model = joblib.load(os.path.join(model_dir, "model.joblib"))
+        vectorizer = joblib.load(os.path.join(model_dir, "vectorizer.joblib"))
+    return model, vectorizer, LinearScorer.for_bundle(model, vectorizer)
 
 def predict_local(texts, model_bundle):
     """Run predictions with the local model."""
-    model, vectorizer = model_bundle
-    transformed = vectorizer.transform(texts)
-    preds = model.predict(transformed)
+    model, vectorizer, scorer = model_bundle
+    if scorer is not None:
+        preds = scorer.predict(texts)
+    else:
+        preds = model.predict(vectorizer.transform(texts))
     return [{"label": str(pred), "proba": None} for pred in preds]
 
 def parse_endpoint_result(result):
@@ -44,30 +71,62 @@ def parse_endpoint_result(result):
         return {"label": result}
     return {"error": "Unknown format", "raw": result}
 
+@timed("remote.predict")
 def predict_remote(texts):
-    """Send texts to SageMaker endpoint and parse results."""
-    rt = boto3.client("sagemaker-runtime", region_name=REGION)
-    results = []
-    for txt in texts:
-        payload = json.dumps({"text": txt})
-        try:
-            resp = rt.invoke_endpoint(
-                EndpointName=ENDPOINT,
-                ContentType="application/json",
-                Body=payload
-            )
-            raw_result = json.loads(resp["Body"].read().decode("utf-8"))
-            results.append(parse_endpoint_result(raw_result))
-        except Exception as e:
-            results.append({"error": str(e)})
-    return results
+    """
+    Send texts to SageMaker endpoint in concurrent, size-bounded batches and
+    parse results. Returns (predictions, backend per row).
+    """
+    client = EndpointClient(ENDPOINT, region=REGION, max_concurrency=MAX_CONCURRENCY)
+    router = None
+    if USE_ROUTER:
+        router = BackendRouter(client.invoke, load_local_backend(MODEL_DIR), max_concurrency=MAX_CONCURRENCY)
+    collapser = NearDuplicateCollapser(DEDUP_THRESHOLD)
+
+    def progress(done, total):
+        print(f"\r⏳ {done}/{total} rows scored", end="", flush=True)
+
+    def score(reps):
+        with span("remote.endpoint"):
+            return (router or client).predict(reps, progress=progress)
+
+    try:
+        if USE_CACHE:
+            cache = PredictionCache(version=f"endpoint:{ENDPOINT}")
+            raw_results = cached_map(cache, texts, score, keep=served_by_endpoint, collapser=collapser)
+            print("🗃️ Cache:", cache.stats())
+            cache.close()
+        else:
+            raw_results = collapser.map(texts, score)
+        print()
+    finally:
+        if router is not None:
+            router.close()
+    print("🧬 Dedup:", collapser.stats())
+    if router is not None:
+        print("🛡️ Backends:", router.stats())
+    failed = router.failed_rows if router is not None else client.failed_rows
+    if failed:
+        print(f"⚠️ {failed} rows failed after {client.retries} retries")
+    with span("remote.parse"):
+        preds = [r if isinstance(r, dict) and "error" in r else parse_endpoint_result(r) for r in raw_results]
+    backends = [r.get("backend", "endpoint") if isinstance(r, dict) and "error" not in r else "failed"
+                for r in raw_results]
+    return preds, backends
 
 def main():
+    if enabled():
+        start_exporter("sagemaker-inference")
+
     # --- Load test data from S3 ---
     print(f"☁️ Downloading s3://{BUCKET}/{INPUT_KEY} ...")
     s3 = boto3.client("s3", region_name=REGION)
-    obj = s3.get_object(Bucket=BUCKET, Key=INPUT_KEY)
-    df = pd.read_csv(obj["Body"])
+    with span("remote.s3_download"):
+        obj = s3.get_object(Bucket=BUCKET, Key=INPUT_KEY)
+        body = obj["Body"].read()
+        # inputs synced with `s3_sync.py --gzip` are stored gzip-encoded
+        df = pd.read_csv(io.BytesIO(body), compression="gzip" if obj.get("ContentEncoding") == "gzip" else None)
+    input_sha = hashlib.sha256(body).hexdigest()
 
     if "text" not in df.columns:
         raise ValueError(f"❌ '{INPUT_KEY}' in s3://{BUCKET} must have a 'text' column.")
@@ -77,26 +136,47 @@ def main():
     # --- Try SageMaker endpoint, else local fallback ---
     try:
         print(f"🔗 Sending {len(texts)} records to SageMaker endpoint '{ENDPOINT}'...")
-        preds = predict_remote(texts)
+        preds, backends = predict_remote(texts)
     except Exception as e:
         print(f"⚠️ Endpoint failed: {e}")
         if USE_LOCAL_FALLBACK:
             print("🔄 Falling back to local model...")
             model_bundle = load_local_model()
             preds = predict_local(texts, model_bundle)
+            backends = ["local"] * len(texts)
         else:
             raise
 
     # --- Save results locally ---
     df["model_raw_result"] = preds
+    df["backend"] = backends
     os.makedirs(os.path.dirname(OUTPUT), exist_ok=True)
-    df.to_csv(OUTPUT, index=False)
+    with span("remote.to_csv"):
+        df.to_csv(OUTPUT, index=False)
     print(f"✅ Saved predictions → {OUTPUT}")
 
     # --- Optionally push to S3 ---
     if UPLOAD_TO_S3:
-        s3.upload_file(OUTPUT, BUCKET, "predictions/model_predictions.csv")
-        print(f"☁️ Uploaded to s3://{BUCKET}/predictions/model_predictions.csv")
+        with span("remote.s3_upload"):
+            changed = upload_if_changed(s3, OUTPUT, BUCKET, "predictions/model_predictions.csv")
+        if changed:
+            print(f"☁️ Uploaded to s3://{BUCKET}/predictions/model_predictions.csv")
+        else:
+            print(f"⏭️ s3://{BUCKET}/predictions/model_predictions.csv already up to date")
+
+    if WRITE_ANALYTICS:
+        store = AnalyticsStore()
+        # failed rows carry {"error": ...} – keep them out of the dashboard
+        df["sentiment"] = [p.get("label") if isinstance(p, dict) else p for p in preds]
+        with span("remote.analytics_append"):
+            # keyed by input content + endpoint: a re-run only adds rows that failed before
+            key = run_key("endpoint", input_sha, f"endpoint:{ENDPOINT}")
+            rows, _ = store.append_rows(df[df["sentiment"].notna()], key, "sentiment", origin="endpoint")
+        print(f"📈 Appended {rows} rows to analytics store: {store.root}")
+
+    if enabled():
+        for stage, s in snapshot().items():
+            print(f"⏱️ {stage:22s} n={s['count']:<6} p50 {s['p50_ms']:.2f} ms  p95 {s['p95_ms']:.2f} ms")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,627 @@
+# scripts/stream_monitor.py
+# Long-running monitor over the prediction event stream (the JSON events the
+# app's log_to_cloudwatch / LogShipper emit): rolling counts per label,
+# source and location over sliding event-time windows, and drift alerts when
+# the label mix or input lengths move away from data/train_data.csv.
+#
+#   python scripts/stream_monitor.py --file /tmp/app_events.jsonl      # the app's FEEDBACK_LOG_FILE
+#   python scripts/stream_monitor.py --log-group /ai-feedback-analyzer/predictions
+#   python scripts/stream_monitor.py --file events.jsonl --from-start --once
+#
+# Lines are parsed a block at a time with pyarrow's JSON reader. Both shapes
+# are accepted: LogShipper records ({"timestamp": ms, "message": "<event>"})
+# and bare event objects. After parsing everything is vectorized per block,
+# so one core keeps up with 100k+ events/s.
+#
+# Each window (1m / 5m / 1h by default) is a ring of SLOTS time slots. A
+# slot holds exact label counts, an input-length histogram and count-min
+# sketches for source and location, so memory stays fixed at any key
+# cardinality. Running window totals are updated as events arrive and as
+# slots expire, which keeps updates and reads O(1) per event.
+#
+# Drift is the population stability index (PSI) of a window's label mix
+# and length histogram against train_data.csv. Length bins are the training
+# deciles. A window crossing --psi-alert raises one alert. It clears once
+# the PSI drops below half of that. Alerts are printed and, with --alerts,
+# appended to a JSONL file.
+
+import io
+import os
+import json
+import time
+import argparse
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pajson
+
+TRAIN_DATA = "data/train_data.csv"
+LOG_GROUP = "/ai-feedback-analyzer/predictions"
+REGION = "us-east-1"
+WINDOWS = ("1m", "5m", "1h")
+SLOTS = 60                            # ring slots per window (window / 60 resolution)
+SKETCH_WIDTH = 1024                   # count-min: ~0.3% of the window's events overestimate per key
+SKETCH_DEPTH = 4
+KEYS = ("source", "location")         # high-cardinality keys, counted in sketches
+TOP_CANDIDATES = 256                  # keys tracked for top-N reports (per key type)
+TOP_N = 5
+MAX_LABELS = 16                       # distinct labels tracked exactly; the rest count as "other"
+LENGTH_BINS = 10
+MIN_EVENTS = 200                      # events a window needs before its drift is judged
+PSI_ALERT = 0.25                      # PSI > 0.25: the usual "significant shift" rule of thumb
+EPS = 1e-4                            # PSI smoothing for empty bins
+BLOCK_BYTES = 4 * 1024 * 1024
+POLL = 1.0                            # seconds between reads of an idle source
+REPORT_EVERY = 10.0                   # seconds between status reports
+UNKNOWN = "unknown"
+SEED = 1
+EPOCH = pd.Timestamp(0, tz="UTC")
+
+WRAPPED_SCHEMA = pa.schema([("timestamp", pa.int64()), ("message", pa.string())])
+EVENT_SCHEMA = pa.schema([
+    ("event", pa.string()),
+    ("timestamp", pa.string()),
+    ("text", pa.string()),
+    ("predicted_sentiment", pa.string()),
+    ("sentiment", pa.string()),
+    ("source", pa.string()),
+    ("Source", pa.string()),
+    ("location", pa.string()),
+    ("Location", pa.string()),
+])
+
+def parse_duration(text):
+    """'90s' / '5m' / '1h' / '2d' → seconds."""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    text = text.strip().lower()
+    if text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+def psi(observed, expected):
+    """Population stability index of observed counts against expected proportions."""
+    total = observed.sum()
+    if not total:
+        return 0.0
+    p = np.maximum(observed / total, EPS)
+    q = np.maximum(expected, EPS)
+    return float(np.sum((p - q) * np.log(p / q)))
+
+def _chunked(values):
+    if isinstance(values, pa.ChunkedArray):
+        return values
+    return pa.chunked_array([values if isinstance(values, pa.Array) else pa.array(values, pa.string())])
+
+class Baseline:
+    """Training label mix and input-length histogram (bin edges = training length deciles)."""
+
+    def __init__(self, labels, edges, lengths):
+        self.labels = labels                    # {label: proportion}
+        self.edges = edges
+        self.lengths = lengths                  # proportion per length bin, len(edges) + 1 bins
+
+    @classmethod
+    def from_csv(cls, path=TRAIN_DATA, text_col="Text", label_col=None, bins=LENGTH_BINS):
+        df = pd.read_csv(path)
+        if label_col is None:
+            # comprehend_sentiment names the labels; the numeric label column depends on the encoding
+            label_col = "comprehend_sentiment" if "comprehend_sentiment" in df.columns else "label"
+        labels = df[label_col].astype(str).str.strip().str.lower().value_counts(normalize=True)
+        lengths = df[text_col].fillna("").astype(str).str.len().to_numpy()
+        edges = np.unique(np.quantile(lengths, np.linspace(0, 1, bins + 1)[1:-1]))
+        hist = np.bincount(np.searchsorted(edges, lengths, side="right"), minlength=len(edges) + 1)
+        return cls(labels.to_dict(), edges, hist / hist.sum())
+
+class SketchHasher:
+    """Multiply-shift hashes: uint64 key hashes → (depth, n) count-min columns."""
+
+    def __init__(self, width=SKETCH_WIDTH, depth=SKETCH_DEPTH, seed=SEED):
+        if width & (width - 1):
+            raise ValueError("sketch width must be a power of two")
+        rng = np.random.default_rng(seed)
+        self.width = width
+        self.depth = depth
+        self.shift = np.uint64(64 - int(width).bit_length() + 1)
+        self.a = rng.integers(1, 2 ** 63, size=(depth, 1), dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=(depth, 1), dtype=np.uint64)
+
+    def columns(self, values):
+        hashes = pd.util.hash_array(np.asarray(values, dtype=object))
+        return ((self.a * hashes + self.b) >> self.shift).astype(np.intp)
+
+class SlidingWindow:
+    """
+    Counts over the last `seconds` of event time as a ring of `slots` slots.
+    add() bins a block into its slots and the running totals; advance()
+    subtracts the slots that fall out of the window.
+    """
+
+    def __init__(self, name, seconds, length_bins, slots=SLOTS, width=SKETCH_WIDTH, depth=SKETCH_DEPTH):
+        self.name = name
+        self.seconds = seconds
+        self.slots = slots
+        self.slot_seconds = seconds / slots
+        self.slot_of = np.full(slots, -1, dtype=np.int64)      # absolute slot number in each ring position
+        self.labels = np.zeros((slots, MAX_LABELS), dtype=np.int64)
+        self.lengths = np.zeros((slots, length_bins), dtype=np.int64)
+        self.sketches = {k: np.zeros((slots, depth, width), dtype=np.int64) for k in KEYS}
+        self.label_total = np.zeros(MAX_LABELS, dtype=np.int64)
+        self.length_total = np.zeros(length_bins, dtype=np.int64)
+        self.sketch_total = {k: np.zeros((depth, width), dtype=np.int64) for k in KEYS}
+        self.newest = None
+        self.late = 0
+        self.drifting = {"label": False, "length": False}
+
+    @property
+    def events(self):
+        return int(self.label_total.sum())
+
+    def advance(self, ts):
+        """Make ts (seconds) the window's end, expiring slots older than the window."""
+        slot = int(ts // self.slot_seconds)
+        if self.newest is not None and slot <= self.newest:
+            return
+        self.newest = slot
+        for pos in np.flatnonzero((self.slot_of >= 0) & (self.slot_of <= slot - self.slots)):
+            self.label_total -= self.labels[pos]
+            self.length_total -= self.lengths[pos]
+            self.labels[pos] = 0
+            self.lengths[pos] = 0
+            for k in KEYS:
+                self.sketch_total[k] -= self.sketches[k][pos]
+                self.sketches[k][pos] = 0
+            self.slot_of[pos] = -1
+
+    def add(self, ts, label_codes, length_bins, key_columns):
+        """One block: ts (seconds), label codes, length-bin indices, {key: (depth, n) sketch columns}."""
+        slots = (ts // self.slot_seconds).astype(np.int64)
+        keep = slots > self.newest - self.slots
+        self.late += int(len(slots) - keep.sum())
+        for slot in np.unique(slots[keep]):
+            m = keep & (slots == slot) if len(slots) else keep
+            pos = slot % self.slots
+            self.slot_of[pos] = slot
+            counts = np.bincount(label_codes[m], minlength=MAX_LABELS)
+            self.labels[pos] += counts
+            self.label_total += counts
+            counts = np.bincount(length_bins[m], minlength=self.lengths.shape[1])
+            self.lengths[pos] += counts
+            self.length_total += counts
+            for k, cols in key_columns.items():
+                sketch, total = self.sketches[k][pos], self.sketch_total[k]
+                for d in range(cols.shape[0]):
+                    counts = np.bincount(cols[d][m], minlength=sketch.shape[1])
+                    sketch[d] += counts
+                    total[d] += counts
+
+    def estimate(self, key, cols):
+        """Count-min estimates for keys given their (depth, n) columns."""
+        total = self.sketch_total[key]
+        return total[np.arange(total.shape[0])[:, None], cols].min(axis=0)
+
+class StreamMonitor:
+    """
+    process_block(lines) / process_messages(timestamps_ms, messages) feed
+    parsed events into every window; check_drift() returns alerts for
+    windows whose drift state changed; snapshot() reports each window.
+    """
+
+    def __init__(self, baseline, windows=WINDOWS, min_events=MIN_EVENTS, psi_alert=PSI_ALERT):
+        self.baseline = baseline
+        self.min_events = min_events
+        self.psi_alert = psi_alert
+        self.hasher = SketchHasher()
+        self.windows = [SlidingWindow(w, parse_duration(w), len(baseline.edges) + 1) for w in windows]
+        self.label_names = list(baseline.labels)[:MAX_LABELS - 1]
+        self.label_code = {name: i for i, name in enumerate(self.label_names)}
+        self.other = MAX_LABELS - 1
+        self.candidates = {k: {} for k in KEYS}     # key value → (depth,) sketch columns
+        self.events = 0
+        self.skipped = 0
+        self.bad_lines = 0
+        self.untimed = 0                            # bare events without a parseable timestamp
+        self.clock = None
+        self.lag = None                             # wall clock − event clock when the last block came in
+        self._expected_labels = None
+        self._format = None
+
+    # --- parsing ------------------------------------------------------------
+
+    def _read(self, data, schema):
+        opts = pajson.ParseOptions(explicit_schema=schema, unexpected_field_behavior="ignore")
+        try:
+            return pajson.read_json(io.BytesIO(data), parse_options=opts,
+                                    read_options=pajson.ReadOptions(block_size=max(len(data), 1 << 20)))
+        except pa.ArrowInvalid:
+            # a torn or foreign line poisons the whole block: keep the lines that parse
+            rows = []
+            for line in data.splitlines():
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    obj = None
+                if isinstance(obj, dict):
+                    rows.append({f.name: obj.get(f.name) for f in schema})
+                elif line.strip():
+                    self.bad_lines += 1
+            for row in rows:
+                for f in schema:
+                    v = row[f.name]
+                    if v is not None and pa.types.is_string(f.type) and not isinstance(v, str):
+                        row[f.name] = json.dumps(v) if isinstance(v, (dict, list)) else str(v)
+                    elif v is not None and pa.types.is_integer(f.type) and not isinstance(v, int):
+                        row[f.name] = None
+            return pa.Table.from_pylist(rows, schema=schema)
+
+    def process_block(self, data):
+        """Complete JSON lines (bytes) in either shape; returns the number of events counted."""
+        if not data.strip():
+            return 0
+        if self._format is None:
+            first = data.lstrip().split(b"\n", 1)[0]
+            try:
+                self._format = "wrapped" if "message" in json.loads(first) else "events"
+            except ValueError:
+                self._format = "events"
+        if self._format == "events":
+            return self._process_events(self._read(data, EVENT_SCHEMA))
+        wrapped = self._read(data, WRAPPED_SCHEMA)
+        messages = wrapped["message"].fill_null("{}")
+        return self.process_messages(wrapped["timestamp"], messages)
+
+    def process_messages(self, timestamps_ms, messages):
+        """CloudWatch / LogShipper records: event JSON strings with their ingestion timestamps."""
+        if not len(messages):
+            return 0
+        messages = _chunked(messages)
+        # messages are single-line JSON (json.dumps escapes newlines), so they parse as one block
+        body = "\n".join(messages.to_pylist()).encode("utf-8") + b"\n"
+        events = self._read(body, EVENT_SCHEMA)
+        if events.num_rows != len(messages):       # a bad message was dropped: timestamps no longer line up
+            return self._process_events(events)
+        ts = timestamps_ms if isinstance(timestamps_ms, pa.ChunkedArray) else pa.chunked_array([timestamps_ms])
+        return self._process_events(events, ts)
+
+    # --- counting -----------------------------------------------------------
+
+    def _process_events(self, events, timestamps_ms=None):
+        kind = events["event"]
+        label = pc.coalesce(events["predicted_sentiment"], events["sentiment"])
+        keep = pc.and_(pc.invert(pc.is_null(label)),
+                       pc.or_kleene(pc.is_null(kind), pc.equal(kind, "prediction")))
+        keep = keep.combine_chunks().fill_null(False) if isinstance(keep, pa.ChunkedArray) else keep
+        self.skipped += events.num_rows - pc.sum(keep).as_py() if events.num_rows else 0
+        if not pc.any(keep).as_py():
+            return 0
+        events = events.filter(keep)
+        if timestamps_ms is not None:
+            ts = pc.divide(pc.cast(timestamps_ms.filter(keep), pa.float64()), 1000.0).to_numpy()
+        else:
+            # seconds since the epoch whatever unit pandas parses to; NaN where missing or unparseable
+            parsed = pd.to_datetime(events["timestamp"].to_pandas(), format="ISO8601", errors="coerce", utc=True)
+            ts = (parsed - EPOCH).dt.total_seconds().to_numpy(dtype=np.float64)
+            timed = ~np.isnan(ts)
+            if not timed.all():
+                # no event time: dropped rather than counted as "now", which would put replayed
+                # history into the current window
+                self.untimed += int(len(ts) - timed.sum())
+                if not timed.any():
+                    return 0
+                events, ts = events.filter(pa.array(timed)), ts[timed]
+        label = pc.coalesce(events["predicted_sentiment"], events["sentiment"])
+        lengths = pc.utf8_length(events["text"].fill_null("")).to_numpy()
+        keys = {
+            "source": pc.coalesce(events["source"], events["Source"]).fill_null(UNKNOWN),
+            "location": pc.coalesce(events["location"], events["Location"]).fill_null(UNKNOWN),
+        }
+        return self.update(ts, label, lengths, keys)
+
+    def _label_codes(self, labels):
+        encoded = pc.dictionary_encode(pc.utf8_lower(pc.utf8_trim_whitespace(_chunked(labels)))).combine_chunks()
+        lookup = np.empty(len(encoded.dictionary), dtype=np.intp)
+        for i, name in enumerate(encoded.dictionary.to_pylist()):
+            if name not in self.label_code and len(self.label_names) < self.other:
+                self.label_code[name] = len(self.label_names)
+                self.label_names.append(name)
+                self._expected_labels = None
+            lookup[i] = self.label_code.get(name, self.other)
+        return lookup[encoded.indices.to_numpy()]
+
+    def _key_columns(self, key, values):
+        """(depth, n) sketch columns per event, hashing each distinct value once; feeds the top-N candidates."""
+        encoded = pc.dictionary_encode(_chunked(values)).combine_chunks()
+        uniques = encoded.dictionary.to_numpy(zero_copy_only=False)
+        unique_cols = self.hasher.columns(uniques)
+        idx = encoded.indices.to_numpy()
+        candidates = self.candidates[key]
+        for value, col in zip(uniques.tolist(), unique_cols.T):
+            candidates.setdefault(value, col)
+        return unique_cols[:, idx]
+
+    def _prune_candidates(self):
+        """Keep the TOP_CANDIDATES heaviest keys of the longest window (amortized: only past 2x)."""
+        longest = max(self.windows, key=lambda w: w.seconds)
+        for key, candidates in self.candidates.items():
+            if len(candidates) <= 2 * TOP_CANDIDATES:
+                continue
+            values = list(candidates)
+            est = longest.estimate(key, np.stack([candidates[v] for v in values], axis=1))
+            for i in np.argsort(-est, kind="stable")[TOP_CANDIDATES:]:
+                del candidates[values[i]]
+
+    def update(self, ts, labels, lengths, keys):
+        """Vectorized core: ts (seconds), label strings, text lengths, {key: strings} for one block (Arrow or lists)."""
+        ts = np.asarray(ts, dtype=np.float64)
+        codes = self._label_codes(labels)
+        bins = np.searchsorted(self.baseline.edges, lengths, side="right")
+        key_columns = {k: self._key_columns(k, v) for k, v in keys.items()}
+        newest = float(ts.max())
+        self.clock = newest if self.clock is None else max(self.clock, newest)
+        self.lag = time.time() - self.clock
+        for w in self.windows:
+            w.advance(self.clock)
+            w.add(ts, codes, bins, key_columns)
+        self.events += len(ts)
+        self._prune_candidates()
+        return len(ts)
+
+    def tick(self, now=None):
+        """
+        Advance the windows by wall-clock time while no events come in, so an
+        idle stream empties its windows. Only for a live stream: replaying an
+        old file (events far behind the wall clock) keeps its event-time view.
+        """
+        now = time.time() if now is None else now
+        longest = max(w.seconds for w in self.windows)
+        if self.clock is not None and self.lag < longest and now > self.clock:
+            for w in self.windows:
+                w.advance(now)
+
+    # --- drift / reporting ----------------------------------------------------
+
+    def expected_labels(self):
+        if self._expected_labels is None:
+            expected = np.zeros(MAX_LABELS)
+            for name, share in self.baseline.labels.items():
+                if name in self.label_code:
+                    expected[self.label_code[name]] = share
+            self._expected_labels = expected
+        return self._expected_labels
+
+    def label_shares(self, counts):
+        total = counts.sum() or 1
+        shares = {name: round(float(counts[i] / total), 4) for i, name in enumerate(self.label_names) if counts[i]}
+        if counts[self.other]:
+            shares["other"] = round(float(counts[self.other] / total), 4)
+        return shares
+
+    def drift(self, window):
+        return {
+            "label": psi(window.label_total, self.expected_labels()),
+            "length": psi(window.length_total, self.baseline.lengths),
+        }
+
+    def check_drift(self):
+        """Alerts for windows whose label / length drift state changed since the last check."""
+        alerts = []
+        for w in self.windows:
+            if w.events < self.min_events:
+                continue
+            for kind, value in self.drift(w).items():
+                was = w.drifting[kind]
+                now = value > self.psi_alert if not was else value > self.psi_alert / 2
+                if now == was:
+                    continue
+                w.drifting[kind] = now
+                alert = {
+                    "ts": datetime.fromtimestamp(self.clock, timezone.utc).isoformat(timespec="seconds"),
+                    "state": "alert" if now else "cleared",
+                    "kind": f"{kind}_drift",
+                    "window": w.name,
+                    "psi": round(value, 4),
+                    "threshold": self.psi_alert,
+                    "events": w.events,
+                }
+                if kind == "label":
+                    alert["observed"] = self.label_shares(w.label_total)
+                    alert["baseline"] = {k: round(v, 4) for k, v in self.baseline.labels.items()}
+                else:
+                    alert["length_edges"] = self.baseline.edges.tolist()
+                    alert["observed"] = np.round(w.length_total / w.events, 4).tolist()
+                    alert["baseline"] = np.round(self.baseline.lengths, 4).tolist()
+                alerts.append(alert)
+        return alerts
+
+    def top(self, window, key, n=TOP_N):
+        candidates = self.candidates[key]
+        if not candidates:
+            return []
+        values = list(candidates)
+        est = window.estimate(key, np.stack([candidates[v] for v in values], axis=1))
+        order = np.argsort(-est, kind="stable")[:n]
+        return [(values[i], int(est[i])) for i in order if est[i] > 0]
+
+    def snapshot(self):
+        out = {}
+        for w in self.windows:
+            drift = self.drift(w) if w.events else {"label": None, "length": None}
+            out[w.name] = {
+                "events": w.events,
+                "late": w.late,
+                "labels": self.label_shares(w.label_total),
+                "psi_label": None if drift["label"] is None else round(drift["label"], 4),
+                "psi_length": None if drift["length"] is None else round(drift["length"], 4),
+                "drifting": [k for k, v in w.drifting.items() if v],
+                **{f"top_{k}": self.top(w, k) for k in KEYS},
+            }
+        return out
+
+def print_report(monitor, rate=None):
+    head = f"📊 {monitor.events:,} events" + (f" ({rate:,.0f}/s)" if rate is not None else "")
+    print(head)
+    for name, s in monitor.snapshot().items():
+        labels = " ".join(f"{k} {v:.0%}" for k, v in s["labels"].items()) or "-"
+        psi_text = "" if s["psi_label"] is None else f"  PSI label {s['psi_label']:.3f} length {s['psi_length']:.3f}"
+        flag = " 🚨" if s["drifting"] else ""
+        print(f"   {name:>4}: {s['events']:>9,} ev  {labels}{psi_text}{flag}")
+        for k in KEYS:
+            if s[f"top_{k}"]:
+                print(f"         top {k}: " + ", ".join(f"{v} {c:,}" for v, c in s[f"top_{k}"]))
+
+# --- sources --------------------------------------------------------------------
+
+def tail_file(path, from_start=False, follow=True, poll=POLL, block_bytes=BLOCK_BYTES):
+    """
+    Yield blocks of complete lines (bytes) appended to path, like tail -F:
+    a truncated or replaced file is reopened from the start. Yields b""
+    when idle so the caller can tick and report.
+    """
+    f, inode, rest, first = None, None, b"", True
+    try:
+        while True:
+            if f is None:
+                try:
+                    f = open(path, "rb")
+                except FileNotFoundError:
+                    if not follow:
+                        return
+                    first = False               # everything written once it appears is new
+                    yield b""
+                    time.sleep(poll)
+                    continue
+                inode = os.fstat(f.fileno()).st_ino
+                if first and not from_start:
+                    f.seek(0, os.SEEK_END)
+                first, rest = False, b""
+            chunk = f.read(block_bytes)
+            if chunk:
+                data = rest + chunk
+                cut = data.rfind(b"\n") + 1
+                rest = data[cut:]
+                if cut:
+                    yield data[:cut]
+                continue
+            if not follow:
+                if rest.strip():
+                    yield rest + b"\n"
+                return
+            try:
+                st = os.stat(path)
+                if st.st_ino != inode or st.st_size < f.tell():
+                    f.close()
+                    f = None
+                    continue
+            except FileNotFoundError:
+                pass
+            yield b""
+            time.sleep(poll)
+    finally:
+        if f is not None:
+            f.close()
+
+def tail_log_group(logs, group, from_start=False, follow=True, poll=POLL):
+    """
+    Yield (timestamps_ms, messages) pages from filter_log_events, resuming
+    from the newest timestamp seen (event ids at that timestamp are skipped
+    on the next poll). Yields empty pages when idle.
+    """
+    start = 0 if from_start else int(time.time() * 1000)
+    seen = set()
+    while True:
+        kwargs = {"logGroupName": group, "startTime": start}
+        got = 0
+        while True:
+            page = logs.filter_log_events(**kwargs)
+            events = [e for e in page.get("events", []) if e.get("eventId") not in seen]
+            if events:
+                got += len(events)
+                newest = max(e["timestamp"] for e in events)
+                if newest > start:
+                    start, seen = newest, set()
+                seen.update(e["eventId"] for e in events if e["timestamp"] == start)
+                yield pa.array([e["timestamp"] for e in events], pa.int64()), \
+                    pa.array([e["message"] for e in events], pa.string())
+            token = page.get("nextToken")
+            if not token:
+                break
+            kwargs["nextToken"] = token
+        if not follow:
+            return
+        if not got:
+            yield pa.array([], pa.int64()), pa.array([], pa.string())
+            time.sleep(poll)
+
+# --- CLI ----------------------------------------------------------------------
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    src = parser.add_mutually_exclusive_group()
+    src.add_argument("--file", default=os.environ.get("FEEDBACK_LOG_FILE"),
+                     help="JSONL event file (LogShipper FileSink records or bare events)")
+    src.add_argument("--log-group", default=None, help="CloudWatch Logs group to poll")
+    parser.add_argument("--train-data", default=TRAIN_DATA)
+    parser.add_argument("--label-col", default=None, help="baseline label column (default comprehend_sentiment)")
+    parser.add_argument("--windows", nargs="+", default=list(WINDOWS))
+    parser.add_argument("--psi-alert", type=float, default=PSI_ALERT)
+    parser.add_argument("--min-events", type=int, default=MIN_EVENTS)
+    parser.add_argument("--alerts", default=None, help="append alerts as JSON lines here")
+    parser.add_argument("--from-start", action="store_true", help="read existing events too, not just new ones")
+    parser.add_argument("--once", action="store_true", help="read what is there, report and exit")
+    parser.add_argument("--report-every", type=float, default=REPORT_EVERY)
+    parser.add_argument("--json", action="store_true", help="final snapshot as JSON (with --once)")
+    args = parser.parse_args()
+    if not args.file and not args.log_group:
+        parser.error("one of --file or --log-group is required (or set FEEDBACK_LOG_FILE)")
+    return args
+
+def main():
+    args = parse_args()
+    monitor = StreamMonitor(Baseline.from_csv(args.train_data, label_col=args.label_col),
+                            args.windows, args.min_events, args.psi_alert)
+    follow = not args.once
+    if args.log_group:
+        import boto3
+        pages = tail_log_group(boto3.client("logs", region_name=REGION), args.log_group,
+                               args.from_start or args.once, follow)
+        feed = (lambda page: monitor.process_messages(*page))
+        source = f"CloudWatch {args.log_group}"
+    else:
+        pages = tail_file(args.file, args.from_start or args.once, follow)
+        feed = monitor.process_block
+        source = args.file
+    print(f"👀 Monitoring {source} – windows {', '.join(args.windows)}, PSI alert > {args.psi_alert}")
+
+    started = time.perf_counter()
+    next_report = started + args.report_every
+    last_events = 0
+    try:
+        for page in pages:
+            if not feed(page):
+                monitor.tick()
+            for alert in monitor.check_drift():
+                icon = "🚨" if alert["state"] == "alert" else "✅"
+                print(f"{icon} {alert['kind']} {alert['state']} [{alert['window']}] "
+                      f"PSI {alert['psi']:.3f} over {alert['events']:,} events")
+                if args.alerts:
+                    with open(args.alerts, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(alert) + "\n")
+            now = time.perf_counter()
+            if follow and now >= next_report:
+                print_report(monitor, (monitor.events - last_events) / (now - next_report + args.report_every))
+                last_events, next_report = monitor.events, now + args.report_every
+    except KeyboardInterrupt:
+        pass
+    elapsed = time.perf_counter() - started
+    if args.json:
+        print(json.dumps(monitor.snapshot(), indent=2))
+    else:
+        print_report(monitor, monitor.events / max(elapsed, 1e-9))
+    print(f"✅ {monitor.events:,} events in {elapsed:.2f}s ({monitor.events / max(elapsed, 1e-9):,.0f}/s), "
+          f"{monitor.skipped:,} non-prediction, {monitor.bad_lines:,} unparseable, "
+          f"{monitor.untimed:,} without a timestamp")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# scripts/streaming_pipeline.py
+# Score a CSV of any size chunk by chunk and stream the scored rows to S3
+# (multipart upload) or a local file. Peak memory ~ one chunk + one part.
+#
+#   python scripts/streaming_pipeline.py big_export.csv s3://grey-customer-feedback-bucket/predictions/big_export.csv
+#   python scripts/streaming_pipeline.py big_export.csv data/big_export_scored.csv
+
+import os
+import io
+import argparse
+from collections import Counter
+
+import pandas as pd
+
+REGION = "us-east-1"
+ENDPOINT = "sagemaker-scikit-learn-2025-08-15-13-46-04-474"
+CHUNK_ROWS = 5_000
+PART_SIZE = 8 * 1024 * 1024         # S3 minimum part size is 5 MB (except the last part)
+
+class S3MultipartWriter:
+    """Buffers bytes and ships them as multipart upload parts of part_size."""
+
+    def __init__(self, s3, bucket, key, part_size=PART_SIZE, content_type="text/csv"):
+        if part_size < 5 * 1024 * 1024:
+            raise ValueError("S3 multipart parts must be at least 5 MB")
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.bytes_written = 0
+        self._buf = io.BytesIO()
+        self._parts = []
+        self._upload_id = s3.create_multipart_upload(
+            Bucket=bucket, Key=key, ContentType=content_type
+        )["UploadId"]
+
+    @property
+    def uri(self):
+        return f"s3://{self.bucket}/{self.key}"
+
+    def _upload_part(self):
+        body = self._buf.getvalue()
+        number = len(self._parts) + 1
+        resp = self.s3.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+            PartNumber=number, Body=body
+        )
+        self._parts.append({"ETag": resp["ETag"], "PartNumber": number})
+        self._buf = io.BytesIO()
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._buf.write(data)
+        self.bytes_written += len(data)
+        if self._buf.tell() >= self.part_size:
+            self._upload_part()
+
+    def close(self):
+        if self._buf.tell() or not self._parts:
+            self._upload_part()
+        self.s3.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+            MultipartUpload={"Parts": self._parts}
+        )
+
+    def abort(self):
+        self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+
+class LocalFileWriter:
+    """Same interface as S3MultipartWriter, backed by a local file."""
+
+    def __init__(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.uri = path
+        self.bytes_written = 0
+        self._tmp = path + ".part"
+        self._f = open(self._tmp, "wb")
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._f.write(data)
+        self.bytes_written += len(data)
+
+    def close(self):
+        self._f.close()
+        os.replace(self._tmp, self.uri)
+
+    def abort(self):
+        self._f.close()
+        os.remove(self._tmp)
+
+def open_writer(target, s3=None, part_size=PART_SIZE):
+    """s3://bucket/key → S3MultipartWriter, anything else → LocalFileWriter."""
+    if target.startswith("s3://"):
+        bucket, _, key = target[5:].partition("/")
+        if s3 is None:
+            import boto3
+            s3 = boto3.client("s3", region_name=REGION)
+        return S3MultipartWriter(s3, bucket, key, part_size=part_size)
+    return LocalFileWriter(target)
+
+def stream_score(source, score_fn, writer, text_col="text", chunksize=CHUNK_ROWS,
+                 out_col="sentiment", on_chunk=None, on_frame=None):
+    """
+    Read source (path or binary file object) in chunks, add score_fn(texts)
+    as out_col, and append each chunk to writer as CSV. score_fn returns
+    None for rows it could not score; they are written with an empty out_col
+    and counted, but kept out of the histogram and on_frame. Calls
+    on_chunk(rows_done, histogram, fraction_read) after every chunk, where
+    fraction_read is the share of input bytes consumed (None if unknown),
+    and on_frame(scored_rows) with each chunk's scored rows (e.g. to append
+    them to the analytics store); their index is the row position in source.
+    Returns (rows, histogram, failed_rows). The writer is closed on success
+    and aborted on failure.
+    """
+    total_bytes = None
+    if hasattr(source, "seek"):
+        source.seek(0, os.SEEK_END)
+        total_bytes = source.tell()
+        source.seek(0)
+    elif isinstance(source, str):
+        total_bytes = os.path.getsize(source)
+
+    histogram = Counter()
+    rows = failed = 0
+    try:
+        reader = pd.read_csv(source, chunksize=chunksize)
+        for i, chunk in enumerate(reader):
+            if text_col not in chunk.columns:
+                raise ValueError(f"Missing '{text_col}' column.")
+            chunk[out_col] = score_fn(chunk[text_col].fillna("").astype(str).tolist())
+            writer.write(chunk.to_csv(index=False, header=(i == 0)))
+            scored = chunk[chunk[out_col].notna()]
+            failed += len(chunk) - len(scored)
+            histogram.update(scored[out_col])
+            if on_frame and len(scored):
+                on_frame(scored)
+            rows += len(chunk)
+            if on_chunk:
+                fraction = None
+                if total_bytes and hasattr(source, "tell"):
+                    fraction = min(1.0, source.tell() / total_bytes)
+                on_chunk(rows, histogram, fraction)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    return rows, histogram, failed
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", help="local CSV with a 'text' column")
+    parser.add_argument("output", help="s3://bucket/key or local path")
+    parser.add_argument("--text-col", default="text")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--analytics", action="store_true", help="also append scored chunks to the analytics store")
+    return parser.parse_args()
+
+def main():
+    from endpoint_client import EndpointClient
+    from prediction_cache import PredictionCache, cached_map
+
+    args = parse_args()
+    client = EndpointClient(ENDPOINT, region=REGION)
+    cache = PredictionCache(version=f"endpoint:{ENDPOINT}")
+
+    def score(texts):
+        raw = cached_map(cache, texts, client.predict)
+        # endpoint errors stay empty (None), not a label of their own
+        return [r.get("label") if isinstance(r, dict) else r for r in raw]
+
+    def report(rows, histogram, fraction):
+        pct = f"{fraction:.0%}" if fraction is not None else "?"
+        print(f"\r⏳ {rows} rows ({pct}) {dict(histogram)}", end="", flush=True)
+
+    on_frame = None
+    if args.analytics:
+        from analytics_store import AnalyticsStore, run_key, file_sha256
+        store = AnalyticsStore()
+        # keyed by input content + endpoint: a re-run only adds rows that failed before
+        key = run_key("endpoint", file_sha256(args.input), f"endpoint:{ENDPOINT}")
+        stored = store.stored_positions(key)
+
+        def on_frame(chunk):
+            store.append_rows(chunk, key, "sentiment", origin="endpoint", stored=stored)
+
+    writer = open_writer(args.output)
+    with open(args.input, "rb") as f:
+        rows, histogram, failed = stream_score(f, score, writer, text_col=args.text_col,
+                                               chunksize=args.chunksize, on_chunk=report, on_frame=on_frame)
+    print(f"\n✅ Scored {rows} rows → {writer.uri}")
+    print("📊", dict(histogram))
+    if failed:
+        print(f"⚠️ {failed} rows failed after {client.retries} retries (empty sentiment in the output)")
+
+if __name__ == "__main__":
+    main()
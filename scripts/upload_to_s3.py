@@ -1,6 +1,7 @@
 # scripts/upload_to_s3.py
 import boto3, os
 from botocore.exceptions import ClientError
+from s3_sync import upload_if_changed
 
 REGION = "us-east-1"
 BUCKET = "grey-customer-feedback-bucket"
@@ -12,9 +13,11 @@ def main():
     if not os.path.exists(LOCAL_PATH):
         raise FileNotFoundError(f"Missing file: {LOCAL_PATH}")
     try:
-        s3.upload_file(LOCAL_PATH, BUCKET, S3_KEY)
-        print(f"✅ Uploaded {LOCAL_PATH} → s3://{BUCKET}/{S3_KEY}")
-    except ClientError as e:
+        if upload_if_changed(s3, LOCAL_PATH, BUCKET, S3_KEY):
+            print(f"✅ Uploaded {LOCAL_PATH} → s3://{BUCKET}/{S3_KEY}")
+        else:
+            print(f"⏭️ s3://{BUCKET}/{S3_KEY} already up to date")
+    except (ClientError, RuntimeError) as e:
         print("Upload failed:", e)
 
 if __name__ == "__main__":
@@ -0,0 +1,10 @@
+# tests/conftest.py
+# The scripts import their siblings directly (run from the repo root), and the
+# endpoint modules live in notebook/; put both on the path like the app does.
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for sub in ("scripts", "notebook"):
+    sys.path.insert(0, os.path.join(ROOT, sub))
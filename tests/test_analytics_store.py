@@ -0,0 +1,72 @@
+# tests/test_analytics_store.py
+
+import pandas as pd
+
+from analytics_store import AnalyticsStore
+
+def scored(n=6):
+    return pd.DataFrame({
+        "Date/Time": ["2024-01-05 10:00:00", "2024-02-10 12:30:00"] * (n // 2),
+        "Source": ["web", "app", "email"] * (n // 3),
+        "text": [f"review {i}" for i in range(n)],
+        "sentiment": ["POSITIVE", "NEGATIVE"] * (n // 2),
+    })
+
+def total(store):
+    return int(store.partitions()["rows"].sum())
+
+def test_keyed_append_is_idempotent(tmp_path):
+    store = AnalyticsStore(str(tmp_path / "store"))
+    assert store.append(scored(), batch_id="upload-1") == (6, "upload-1")
+    assert store.append(scored(), batch_id="upload-1") == (0, "upload-1")
+    assert total(store) == 6
+
+    store.append(scored(), batch_id="upload-2")
+    assert total(store) == 12
+
+def test_keyed_append_checks_marker_not_data(tmp_path, monkeypatch):
+    store = AnalyticsStore(str(tmp_path / "store"))
+    store.append(scored(), batch_id="upload-1")
+    assert (tmp_path / "store" / "_batches" / "upload-1.json").exists()
+
+    def no_scan():
+        raise AssertionError("keyed append scanned the dataset")
+    monkeypatch.setattr(store, "dataset", no_scan)
+    assert store.append(scored(), batch_id="upload-1") == (0, "upload-1")
+    assert store.append(scored(), batch_id="upload-2")[0] == 6
+
+def test_keyed_append_survives_compaction(tmp_path):
+    store = AnalyticsStore(str(tmp_path / "store"))
+    store.append(scored(), batch_id="upload-1")
+    store.append(scored(), batch_id="upload-2")
+    assert store.compact() > 0
+    assert store.append(scored(), batch_id="upload-1")[0] == 0
+    assert total(store) == 12
+
+def test_unkeyed_appends_accumulate(tmp_path):
+    store = AnalyticsStore(str(tmp_path / "store"))
+    _, first = store.append(scored())
+    _, second = store.append(scored())
+    assert first != second
+    assert total(store) == 12
+    counts = store.sentiment_share("Source").groupby("sentiment")["count"].sum()
+    assert counts.to_dict() == {"negative": 6, "positive": 6}
+
+def test_append_rows_adds_only_missing_rows(tmp_path):
+    store = AnalyticsStore(str(tmp_path / "store"))
+    df = scored()
+    assert store.append_rows(df[df.index != 2], "job")[0] == 5       # row 2 failed this time
+    assert store.stored_positions("job") == {0, 1, 3, 4, 5}
+    assert store.append_rows(df, "job")[0] == 1                      # the re-run adds only row 2
+    assert store.append_rows(df, "job") == (0, None)
+    assert store.append_rows(df, "other-job")[0] == 6
+    assert total(store) == 12
+
+def test_append_rows_chunk_by_chunk(tmp_path):
+    store = AnalyticsStore(str(tmp_path / "store"))
+    df = scored(12)
+    for _ in range(2):
+        stored = store.stored_positions("stream")
+        for start in range(0, len(df), 5):
+            store.append_rows(df.iloc[start:start + 5], "stream", stored=stored)
+    assert total(store) == 12
@@ -0,0 +1,151 @@
+# tests/test_backend_router.py
+
+import threading
+
+import pytest
+
+from backend_router import (
+    BackendRouter, CircuitBreaker, CircuitOpenError,
+    ENDPOINT, LOCAL_CIRCUIT, LOCAL_FALLBACK, LOCAL_HEDGE,
+)
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class Remote:
+    """Endpoint stub: counts calls, fails while `down`, blocks while `gate` is clear."""
+
+    def __init__(self):
+        self.calls = 0
+        self.down = False
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, batch):
+        self.calls += 1
+        self.gate.wait(timeout=10)
+        if self.down:
+            raise RuntimeError("endpoint down")
+        return [{"label": "POSITIVE", "proba": 0.9} for _ in batch]
+
+def local(batch):
+    return [{"label": "NEGATIVE", "proba": 0.6} for _ in batch]
+
+def down(batch):
+    raise RuntimeError("endpoint down")
+
+def breaker(clock):
+    return CircuitBreaker(window=10, min_calls=4, failure_rate=0.5, cooldown_s=30, clock=clock)
+
+def test_breaker_opens_at_failure_threshold():
+    b = breaker(Clock())
+    for ok in (True, False, False):
+        b.record(ok)
+    assert b.state == "closed"                      # below min_calls
+    b.record(True)
+    assert b.state == "open"                        # 2 of 4 failed
+    assert b.allow() == (False, False)
+    assert b.opens == 1
+
+def test_half_open_probe_closes_or_reopens():
+    clock = Clock()
+    b = breaker(clock)
+    for _ in range(4):
+        b.record(False)
+    clock.now = 29
+    assert b.allow() == (False, False)
+    clock.now = 30
+    assert b.allow() == (True, True)                # exactly one probe
+    assert b.allow() == (False, False)
+    b.record(False, probe=True)
+    assert (b.state, b.opens) == ("open", 2)
+    clock.now = 59
+    assert b.allow() == (False, False)              # cooldown restarted
+    clock.now = 60
+    assert b.allow() == (True, True)
+    b.record(True, probe=True)
+    assert b.state == "closed"
+    assert b.allow() == (True, False)
+
+def test_late_outcomes_are_ignored_while_open():
+    b = breaker(Clock())
+    for _ in range(4):
+        b.record(False)
+    for _ in range(10):
+        b.record(True)                              # calls that started before it opened
+    assert b.state == "open"
+
+def test_router_serves_local_while_open_and_probe_recovers():
+    clock = Clock()
+    remote = Remote()
+    remote.down = True
+    with BackendRouter(remote, local, breaker=breaker(clock), hedge_ms=0) as router:
+        tags = [router.route(["x"])[0]["backend"] for _ in range(4)]
+        assert tags == [LOCAL_FALLBACK] * 4
+        assert router.breaker.state == "open"
+
+        rows = router.route(["x", "y"])
+        assert [r["backend"] for r in rows] == [LOCAL_CIRCUIT] * 2
+        assert [r["label"] for r in rows] == ["NEGATIVE"] * 2
+        assert remote.calls == 4                    # the endpoint was not tried
+
+        remote.down = False
+        clock.now = 30
+        assert router.route(["x"]) == [{"label": "POSITIVE", "proba": 0.9, "backend": ENDPOINT}]
+        assert router.breaker.state == "closed"
+        assert router.stats()["rows"] == {LOCAL_FALLBACK: 4, LOCAL_CIRCUIT: 2, ENDPOINT: 1}
+
+def test_open_circuit_without_local_raises():
+    b = breaker(Clock())
+    for _ in range(4):
+        b.record(False)
+    with BackendRouter(down, breaker=b) as router:
+        with pytest.raises(CircuitOpenError):
+            router.route(["x"])
+
+def test_slow_endpoint_is_hedged_to_local():
+    remote = Remote()
+    remote.gate.clear()
+    with BackendRouter(remote, local, breaker=breaker(Clock()), hedge_ms=20) as router:
+        rows = router.route(["x", "y"])
+        assert [r["backend"] for r in rows] == [LOCAL_HEDGE] * 2
+        assert remote.calls == 1                    # the endpoint call was made, just too slow
+        remote.gate.set()
+
+def test_predict_tags_every_row_in_order():
+    texts = [f"bad {i}" if i % 3 == 0 else f"ok {i}" for i in range(12)]
+
+    def flaky(batch):
+        if any(t.startswith("bad") for t in batch):
+            raise RuntimeError("endpoint error")
+        return [{"label": t} for t in batch]
+
+    b = CircuitBreaker(min_calls=100)               # stays closed
+    with BackendRouter(flaky, local, breaker=b, hedge_ms=0, max_records=1) as router:
+        rows = router.predict(texts)
+    for text, row in zip(texts, rows):
+        if text.startswith("bad"):
+            assert row == {"label": "NEGATIVE", "proba": 0.6, "backend": LOCAL_FALLBACK}
+        else:
+            assert row == {"label": text, "backend": ENDPOINT}
+
+def test_failed_rows_are_distinct_dicts():
+    with BackendRouter(down) as router:
+        rows = router.predict(["a", "b", "c"])
+    assert rows == [{"error": "endpoint down"}] * 3
+    rows[0]["retried"] = True
+    assert "retried" not in rows[1]
+    assert router.failed_rows == 3
+
+def test_close_releases_remote_threads():
+    before = {t.ident for t in threading.enumerate()}
+    with BackendRouter(Remote(), local=local, hedge_ms=0) as router:
+        assert [r["backend"] for r in router.predict(["a", "b"])] == [ENDPOINT, ENDPOINT]
+    for t in threading.enumerate():
+        if t.ident not in before and t.name.startswith("router-remote"):
+            t.join(timeout=5)
+            assert not t.is_alive()
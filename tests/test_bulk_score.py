@@ -0,0 +1,106 @@
+# tests/test_bulk_score.py
+
+import os
+import argparse
+
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+import bulk_score
+from bulk_score import plan_shards, read_shard, run
+from train import save_bundle
+
+def quoted_csv(path, n=60):
+    texts = []
+    for i in range(n):
+        if i % 4 == 0:
+            texts.append(f'line one of {i}\nline "two", still {i}\n\nand three')
+        else:
+            texts.append(f"great product {i}" if i % 2 else f"awful, broken {i}")
+    pd.DataFrame({"id": [str(i) for i in range(n)], "text": texts}).to_csv(path, index=False)
+    return texts
+
+def shard_frames(path, fmt, shard_bytes):
+    header, ranges = plan_shards(path, fmt, shard_bytes)
+    return ranges, [read_shard(path, fmt, header, s, e) for s, e in ranges]
+
+def test_csv_cuts_never_split_quoted_fields(tmp_path):
+    path = str(tmp_path / "in.csv")
+    texts = quoted_csv(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    for shard_bytes in (7, 31, 64, 200, len(data)):
+        ranges, frames = shard_frames(path, "csv", shard_bytes)
+        assert ranges[0][0] == data.index(b"\n") + 1 and ranges[-1][1] == len(data)
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        # a cut inside a quoted field would shift or split rows
+        assert pd.concat(frames)["text"].tolist() == texts
+    # small shards must actually land next to the multi-line fields
+    assert len(shard_frames(path, "csv", 31)[0]) > 10
+
+def test_jsonl_shards(tmp_path):
+    path = str(tmp_path / "in.jsonl")
+    pd.DataFrame({"text": [f"text {i}" for i in range(50)]}).to_json(path, orient="records", lines=True)
+    ranges, frames = shard_frames(path, "jsonl", 100)
+    assert len(ranges) > 5
+    assert pd.concat(frames)["text"].tolist() == [f"text {i}" for i in range(50)]
+
+@pytest.fixture(scope="module")
+def model_dir(tmp_path_factory):
+    model_dir = str(tmp_path_factory.mktemp("bundle"))
+    texts = ["great product", "love it", "awful, broken", "terrible"] * 3
+    vectorizer = TfidfVectorizer()
+    clf = LogisticRegression(max_iter=1000).fit(vectorizer.fit_transform(texts), [1, 1, 0, 0] * 3)
+    save_bundle(model_dir, vectorizer, clf, {"Negative": 0, "Positive": 1}, compact=True)
+    return model_dir
+
+def job(tmp_path, model_dir, **overrides):
+    args = dict(input=str(tmp_path / "in.csv"), out=str(tmp_path / "out"), model_dir=model_dir,
+                text_col="text", workers=2, shard_mb=300 / 2 ** 20, out_format="csv", restart=False)
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+def scored(out):
+    parts = sorted(p for p in os.listdir(out) if p.startswith("part-"))
+    return pd.concat([pd.read_csv(os.path.join(out, p), dtype={"id": str}) for p in parts])
+
+def test_resume_scores_only_missing_parts(tmp_path, model_dir, capsys):
+    texts = quoted_csv(tmp_path / "in.csv")
+    manifest = run(job(tmp_path, model_dir))
+    out = str(tmp_path / "out")
+    shards = manifest["shards"]
+    assert len(shards) > 3 and all(s["rows"] for s in shards)
+    first = scored(out)
+    assert first["text"].tolist() == texts
+    assert set(first["label"]) <= {"Positive", "Negative"}
+
+    mtimes = {s["file"]: os.stat(os.path.join(out, s["file"])).st_mtime_ns for s in shards}
+    os.remove(os.path.join(out, shards[2]["file"]))
+    capsys.readouterr()
+    run(job(tmp_path, model_dir))
+    assert "Scoring 1 shards" in capsys.readouterr().out
+    for s in shards:
+        if s["id"] != 2:
+            assert os.stat(os.path.join(out, s["file"])).st_mtime_ns == mtimes[s["file"]]
+    pd.testing.assert_frame_equal(scored(out), first)
+
+    run(job(tmp_path, model_dir))
+    assert "Nothing to do" in capsys.readouterr().out
+
+def test_changed_input_needs_restart(tmp_path, model_dir):
+    quoted_csv(tmp_path / "in.csv")
+    run(job(tmp_path, model_dir))
+    texts = quoted_csv(tmp_path / "in.csv", n=20)             # a different file at the same path
+    with pytest.raises(SystemExit, match="input_size"):
+        run(job(tmp_path, model_dir))
+    with pytest.raises(SystemExit, match="text_col"):
+        run(job(tmp_path, model_dir, text_col="body"))
+
+    manifest = run(job(tmp_path, model_dir, restart=True))
+    out = str(tmp_path / "out")
+    parts = sorted(p for p in os.listdir(out) if p.startswith("part-"))
+    assert parts == sorted(s["file"] for s in manifest["shards"])   # the old job's extra parts are gone
+    assert scored(out)["text"].tolist() == texts
+    assert bulk_score.MANIFEST in os.listdir(out)
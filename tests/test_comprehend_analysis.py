@@ -0,0 +1,87 @@
+# tests/test_comprehend_analysis.py
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+import comprehend_analysis
+from analytics_store import AnalyticsStore
+from local_fakes import FakeComprehend, FakeS3
+
+class PoisonComprehend(FakeComprehend):
+    """Every document containing "POISON" lands in ErrorList, on every attempt."""
+
+    def _batch(self, op, TextList, LanguageCode, fn):
+        return super()._batch(op, ["" if "POISON" in t else t for t in TextList], LanguageCode, fn)
+
+class FlakyComprehend(FakeComprehend):
+    """Each document lands in ErrorList the first time each API sees it."""
+
+    def __init__(self):
+        super().__init__()
+        self.seen = set()
+
+    def _batch(self, op, TextList, LanguageCode, fn):
+        with self._lock:
+            first = [(op, t) not in self.seen for t in TextList]
+            self.seen.update((op, t) for t in TextList)
+        return super()._batch(op, ["" if f else t for f, t in zip(first, TextList)], LanguageCode, fn)
+
+def stored_rows(tmp_path):
+    return ds.dataset(str(tmp_path / "analytics"), partitioning="hive").count_rows()
+
+def run_main(tmp_path, monkeypatch, comp):
+    clients = {"comprehend": comp, "s3": FakeS3(str(tmp_path / "s3"))}
+    monkeypatch.setattr(comprehend_analysis.boto3, "client", lambda name, **kwargs: clients[name])
+    monkeypatch.setattr(comprehend_analysis, "AnalyticsStore", lambda: AnalyticsStore(str(tmp_path / "analytics")))
+    monkeypatch.setattr(comprehend_analysis, "USE_CACHE", False)
+    comprehend_analysis.main()
+    return pd.read_csv(comprehend_analysis.OUTPUT)
+
+def setup_paths(tmp_path, monkeypatch, texts):
+    pd.DataFrame({
+        "ID": range(len(texts)), "Date/Time": "6/1/2023 10:00", "Location": "Paris",
+        "Source": "Twitter", "Text": texts,
+    }).to_csv(tmp_path / "reviews.csv", index=False)
+    for name, file in (("INPUT", "reviews.csv"), ("OUTPUT", "out.csv"),
+                       ("CHECKPOINT", "out.checkpoint.jsonl"), ("FAILED_ROWS", "out.failed.csv")):
+        monkeypatch.setattr(comprehend_analysis, name, str(tmp_path / file))
+
+def test_analyze_retries_item_errors_and_resumes(tmp_path):
+    texts = [f"great product number {i}" for i in range(60)]
+    ckpt = str(tmp_path / "ckpt.jsonl")
+    comp = FlakyComprehend()
+    results = comprehend_analysis.analyze(comp, texts, checkpoint=ckpt, max_workers=4,
+                                          limiter=comprehend_analysis.AdaptiveRateLimiter(rate=1000, max_rate=1000))
+    assert [r["sentiment"] for r in results] == ["POSITIVE"] * len(texts)
+    assert comp.calls["BatchDetectSentiment"] > len(texts) // 25 + 1     # failed items went round again
+
+    again = FakeComprehend()
+    assert comprehend_analysis.analyze(again, texts, checkpoint=ckpt) == results
+    assert sum(again.calls.values()) == 0           # everything came from the checkpoint
+
+def test_failed_rows_stay_empty_and_out_of_analytics(tmp_path, monkeypatch):
+    texts = ["I love it", "terrible support", "POISON pill", "it is fine"]
+    setup_paths(tmp_path, monkeypatch, texts)
+
+    out = run_main(tmp_path, monkeypatch, PoisonComprehend())
+    assert out["comprehend_sentiment"].isna().tolist() == [False, False, True, False]
+    assert "NEUTRAL" not in out["comprehend_sentiment"].tolist()
+    assert pd.read_csv(comprehend_analysis.FAILED_ROWS)["Text"].tolist() == ["POISON pill"]
+    assert (tmp_path / "out.checkpoint.jsonl").exists()
+    assert stored_rows(tmp_path) == 3
+
+    # Comprehend recovers: the re-run only sends the failed row and cleans up
+    comp = FakeComprehend()
+    out = run_main(tmp_path, monkeypatch, comp)
+    assert out["comprehend_sentiment"].notna().all()
+    assert comp.documents == 2                      # one document × (sentiment + key phrases)
+    assert not (tmp_path / "out.failed.csv").exists()
+    assert not (tmp_path / "out.checkpoint.jsonl").exists()
+    assert stored_rows(tmp_path) == 4               # only the recovered row was appended
+
+def test_rerun_does_not_append_again(tmp_path, monkeypatch):
+    setup_paths(tmp_path, monkeypatch, ["I love it", "terrible support", "it is fine"])
+    run_main(tmp_path, monkeypatch, FakeComprehend())
+    assert stored_rows(tmp_path) == 3
+    run_main(tmp_path, monkeypatch, FakeComprehend())
+    assert stored_rows(tmp_path) == 3
@@ -0,0 +1,62 @@
+# tests/test_endpoint_client.py
+
+import pytest
+from botocore.exceptions import EndpointConnectionError, ConnectTimeoutError, ReadTimeoutError
+
+import endpoint_client
+from endpoint_client import EndpointClient, is_retryable, pack_batches
+from local_fakes import FakeSageMakerRuntime, keyword_label
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(endpoint_client, "wait_random_exponential", lambda **kwargs: lambda retry_state: 0)
+
+class FlakyRuntime(FakeSageMakerRuntime):
+    """Raises `errors` in turn on the first calls, then behaves."""
+
+    def __init__(self, errors):
+        super().__init__()
+        self.errors = list(errors)
+
+    def invoke_endpoint(self, **kwargs):
+        with self._lock:
+            err = self.errors.pop(0) if self.errors else None
+        if err is not None:
+            raise err
+        return super().invoke_endpoint(**kwargs)
+
+def test_pack_batches_respects_records_and_bytes():
+    texts = [f"text {i}" for i in range(25)]
+    batches = list(pack_batches(texts, max_records=10, max_bytes=1 << 20))
+    assert [len(b) for _, b in batches] == [10, 10, 5]
+    assert [t for _, b in batches for t in b] == texts
+    assert all(len(b) == 1 for _, b in pack_batches(["x" * 100] * 3, max_bytes=50))
+
+@pytest.mark.parametrize("exc", [
+    EndpointConnectionError(endpoint_url="https://runtime.sagemaker"),
+    ConnectTimeoutError(endpoint_url="https://runtime.sagemaker"),
+    ReadTimeoutError(endpoint_url="https://runtime.sagemaker"),
+    ConnectionResetError(),
+])
+def test_connection_failures_are_retried(exc):
+    assert is_retryable(exc)
+    rt = FlakyRuntime([exc, exc])
+    client = EndpointClient("ep", rt=rt)
+    assert client.predict(["I love it", "terrible"]) == [
+        {"label": "Positive", "proba": None}, {"label": "Negative", "proba": None}]
+    assert client.retries == 2
+
+def test_throttling_is_retried_and_order_kept():
+    rt = FakeSageMakerRuntime(throttle_rate=0.3, seed=1)
+    texts = [f"great {i}" if i % 2 else f"awful {i}" for i in range(200)]
+    client = EndpointClient("ep", rt=rt, max_records=7, max_attempts=20)
+    assert [r["label"] for r in client.predict(texts)] == [keyword_label(t) for t in texts]
+    assert client.retries == rt.throttled > 0
+
+def test_failed_batches_become_separate_error_rows():
+    rt = FakeSageMakerRuntime(error_rate=1.0)
+    client = EndpointClient("ep", rt=rt, max_records=2)
+    rows = client.predict(["a", "b", "c"])
+    assert client.failed_rows == 3 and all("error" in r for r in rows)
+    rows[0]["backend"] = "endpoint"
+    assert "backend" not in rows[1]
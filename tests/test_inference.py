@@ -0,0 +1,128 @@
+# tests/test_inference.py
+# The SageMaker handlers called directly, the way the model server calls them.
+
+import json
+
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+import inference
+from inference import model_fn, input_fn, predict_fn, output_fn
+from train import save_bundle
+
+TEXTS = ["I love it, great product", "terrible service, awful", "good food but slow delivery",
+         "excellent and amazing", "worst purchase ever, bad", "okay, mixed feelings overall"] * 3
+LABELS = [2, 0, 1, 2, 0, 1] * 3
+LABEL2ID = {"Negative": 0, "Mixed": 1, "Positive": 2}
+CLASSES = {"Negative", "Mixed", "Positive"}
+
+@pytest.fixture(scope="module")
+def bundle_dir(tmp_path_factory):
+    model_dir = str(tmp_path_factory.mktemp("bundle"))
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2))
+    clf = LogisticRegression(max_iter=1000).fit(vectorizer.fit_transform(TEXTS), LABELS)
+    save_bundle(model_dir, vectorizer, clf, LABEL2ID, compact=True)
+    return model_dir
+
+@pytest.fixture(params=["compact", "joblib", "sklearn"])
+def bundle(request, bundle_dir, monkeypatch):
+    """The same model through each loading path: compact + fast scorer, joblib + fast scorer, plain sklearn."""
+    if request.param != "compact":
+        monkeypatch.setenv("FEEDBACK_COMPACT_MODEL", "0")
+    if request.param == "sklearn":
+        monkeypatch.setenv("FEEDBACK_FAST_SCORER", "0")
+    loaded = model_fn(bundle_dir)
+    assert len(loaded) == (3 if request.param == "sklearn" else 4)
+    return loaded
+
+def invoke(bundle, body, content_type, accept="application/json"):
+    return output_fn(predict_fn(input_fn(body, content_type), bundle), accept)
+
+def test_single_json_keeps_original_shape(bundle):
+    body, accept = invoke(bundle, json.dumps({"text": "I love it, great product"}), "application/json")
+    assert accept == "application/json"
+    assert json.loads(body) == ["Positive"]
+
+@pytest.mark.parametrize("body, content_type", [
+    (json.dumps(["I love it", "terrible service", "mixed feelings"]), "application/json"),
+    (json.dumps([{"text": "I love it"}, {"text": "terrible service"}, {"text": "mixed feelings"}]),
+     "application/json"),
+    (json.dumps({"instances": ["I love it", "terrible service", "mixed feelings"]}), "application/json"),
+    ('"I love it"\n{"text": "terrible service"}\n\n"mixed feelings"\n', "application/jsonlines"),
+    ("text\nI love it\n\"terrible service\"\nmixed feelings\n", "text/csv"),
+    ("I love it\nterrible service\nmixed feelings\n", "text/csv; charset=utf-8"),
+])
+def test_batch_formats(bundle, body, content_type):
+    assert input_fn(body.encode("utf-8"), content_type) == ["I love it", "terrible service", "mixed feelings"]
+    rows = json.loads(invoke(bundle, body, content_type)[0])
+    assert len(rows) == 3
+    for row in rows:
+        assert row["label"] in CLASSES
+        assert set(row["proba"]) == CLASSES
+        assert abs(sum(row["proba"].values()) - 1) < 1e-4
+        assert row["label"] == max(row["proba"], key=row["proba"].get)
+
+def test_empty_batch(bundle):
+    assert input_fn("[]", "application/json") == []
+    assert invoke(bundle, "[]", "application/json") == ("[]", "application/json")
+    assert invoke(bundle, "", "text/csv") == ("[]", "application/json")
+
+def test_jsonlines_response(bundle):
+    body, accept = invoke(bundle, json.dumps(["great", "awful"]), "application/json", "application/jsonlines")
+    assert accept == "application/jsonlines"
+    assert [json.loads(line)["label"] for line in body.splitlines()] == ["Positive", "Negative"]
+
+def test_loading_paths_agree(bundle_dir, monkeypatch):
+    texts = TEXTS[:6] + ["great food but terrible delivery"]    # no all-unknown texts: those tie exactly
+    results = []
+    for compact, fast in (("1", "1"), ("0", "1"), ("0", "0")):
+        monkeypatch.setenv("FEEDBACK_COMPACT_MODEL", compact)
+        monkeypatch.setenv("FEEDBACK_FAST_SCORER", fast)
+        results.append(predict_fn(texts, model_fn(bundle_dir)))
+    for other in results[1:]:
+        assert [r["label"] for r in other] == [r["label"] for r in results[0]]
+        for a, b in zip(other, results[0]):
+            assert all(abs(a["proba"][c] - b["proba"][c]) < 1e-4 for c in CLASSES)
+
+def test_missing_artifacts(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        model_fn(str(tmp_path))
+
+def test_unsupported_content_type():
+    with pytest.raises(inference.UnsupportedContentType):
+        inference.input_fn("x", "application/xml")
+
+def test_failed_prediction_is_captured(bundle, tmp_path):
+    import request_capture
+
+    class Broken:
+        def transform(self, texts):
+            raise RuntimeError("vectorizer exploded")
+
+    capture = tmp_path / "capture.jsonl"
+    request_capture.enable(str(capture))
+    try:
+        invoke(bundle, json.dumps(["I love it"]), "application/json")
+        data = input_fn(json.dumps(["I love it", "awful"]), "application/json")
+        with pytest.raises(RuntimeError):
+            predict_fn(data, (bundle[0], Broken(), bundle[2]))
+        assert request_capture.take() is None       # nothing left pending on the thread
+    finally:
+        request_capture.enable(None)
+    events = [json.loads(line) for line in capture.read_text().splitlines()]
+    assert [(e["texts"], e["ok"]) for e in events] == [(["I love it"], True), (["I love it", "awful"], False)]
+
+def test_handlers_load_without_instrumentation(bundle_dir, monkeypatch):
+    import importlib
+    import sys
+
+    for name in ("stage_metrics", "request_capture"):
+        monkeypatch.setitem(sys.modules, name, None)        # import raises ImportError
+    monkeypatch.delitem(sys.modules, "inference")
+    bare = importlib.import_module("inference")
+    assert bare.request_capture is None
+    loaded = bare.model_fn(bundle_dir)
+    body, _ = bare.output_fn(bare.predict_fn(bare.input_fn('["I love it"]', "application/json"), loaded),
+                             "application/json")
+    assert json.loads(body)[0]["label"] in CLASSES
@@ -0,0 +1,73 @@
+# tests/test_linear_scorer.py
+# The idf×coef fast path must match sklearn's transform → predict_proba.
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+
+from linear_scorer import LinearScorer, check_parity
+from compact_model import export_compact, load_compact
+
+TRAIN = [
+    "great product, love it", "terrible service and awful support", "good food but slow delivery",
+    "excellent quality, amazing value", "worst purchase ever, very bad", "okay I guess, mixed feelings",
+    "fantastic staff, friendly and fast", "broken on arrival, disappointed", "nice design, poor battery",
+    "would buy again, five stars", "refund took weeks, never again", "fine overall, nothing special",
+] * 4
+MULTI = [2, 0, 1, 2, 0, 1, 2, 0, 1, 2, 0, 1] * 4
+BINARY = [int(y == 2) for y in MULTI]
+TEXTS = TRAIN[:12] + [
+    "", "!!!", "unknown words only", "GREAT great Great product product",
+    "slow slow slow delivery but great food", "love it " * 50,
+]
+
+VECTORIZERS = {
+    "unigram": lambda: TfidfVectorizer(),
+    "bigram_sublinear": lambda: TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True),
+    "l1_binary": lambda: TfidfVectorizer(norm="l1", binary=True, min_df=2),
+}
+
+def fit(vec_name, solver, labels):
+    vectorizer = VECTORIZERS[vec_name]()
+    X = vectorizer.fit_transform(TRAIN)
+    if solver == "sgd":
+        # multiclass probabilities by one-vs-rest normalization, on any sklearn version
+        return vectorizer, SGDClassifier(loss="log_loss", random_state=0).fit(X, labels)
+    try:
+        return vectorizer, LogisticRegression(solver=solver, C=10, max_iter=2000).fit(X, labels)
+    except ValueError as e:
+        # sklearn >= 1.8 refuses multiclass liblinear (older releases fit it one-vs-rest)
+        pytest.skip(str(e))
+
+@pytest.mark.parametrize("vec_name", sorted(VECTORIZERS))
+@pytest.mark.parametrize("solver", ["lbfgs", "liblinear", "sgd"])
+@pytest.mark.parametrize("labels", [BINARY, MULTI], ids=["binary", "multiclass"])
+def test_parity_with_sklearn(vec_name, solver, labels):
+    vectorizer, model = fit(vec_name, solver, labels)
+    scorer = LinearScorer.for_bundle(model, vectorizer)
+    X = vectorizer.transform(TEXTS)
+    np.testing.assert_allclose(scorer.predict_proba(TEXTS), model.predict_proba(X), atol=1e-9)
+    np.testing.assert_allclose(scorer.decision_function(TEXTS), model.decision_function(X), atol=1e-9)
+    assert (scorer.predict(TEXTS) == model.predict(X)).all()
+    labels_out, proba = scorer.score(TEXTS)
+    assert (labels_out == model.predict(X)).all()
+    assert check_parity(vectorizer, model, TEXTS)["ok"]
+
+@pytest.mark.parametrize("solver", ["lbfgs", "liblinear", "sgd"])
+@pytest.mark.parametrize("labels", [BINARY, MULTI], ids=["binary", "multiclass"])
+def test_parity_from_compact_bundle(tmp_path, solver, labels):
+    vectorizer, model = fit("bigram_sublinear", solver, labels)
+    export_compact(str(tmp_path), vectorizer, model)
+    compact_model, compact_vectorizer, _ = load_compact(str(tmp_path))
+    scorer = LinearScorer.for_bundle(compact_model, compact_vectorizer)
+    X = vectorizer.transform(TEXTS)
+    # compact weights are float32
+    np.testing.assert_allclose(scorer.predict_proba(TEXTS), model.predict_proba(X), atol=1e-5)
+    assert (scorer.predict(TEXTS) == model.predict(X)).all()
+
+def test_unsupported_bundles_fall_back():
+    from sklearn.naive_bayes import MultinomialNB
+    vectorizer = TfidfVectorizer()
+    model = MultinomialNB().fit(vectorizer.fit_transform(TRAIN), MULTI)
+    assert LinearScorer.for_bundle(model, vectorizer) is None
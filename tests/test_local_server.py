@@ -0,0 +1,51 @@
+# tests/test_local_server.py
+
+import json
+
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from train import save_bundle
+
+TestClient = pytest.importorskip("fastapi.testclient").TestClient     # needs fastapi + httpx
+from local_server import create_app  # noqa: E402
+
+TEXTS = ["I love it, great product", "terrible service, awful", "excellent and amazing",
+         "worst purchase ever, bad"] * 3
+LABELS = [1, 0, 1, 0] * 3
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    model_dir = str(tmp_path_factory.mktemp("bundle"))
+    vectorizer = TfidfVectorizer()
+    clf = LogisticRegression(max_iter=1000).fit(vectorizer.fit_transform(TEXTS), LABELS)
+    save_bundle(model_dir, vectorizer, clf, {"Negative": 0, "Positive": 1}, compact=True)
+    with TestClient(create_app(model_dir, max_wait_ms=1)) as c:        # runs the batcher's lifespan
+        yield c
+
+def test_single_text_is_micro_batched(client):
+    r = client.post("/invocations", json={"text": "great product, love it"})
+    assert r.status_code == 200
+    assert r.json() == ["Positive"]
+    assert client.get("/stats").json()["requests"] >= 1
+
+def test_batch(client):
+    r = client.post("/invocations", content="text\nawful service\nlove it\n",
+                    headers={"content-type": "text/csv", "accept": "application/jsonlines"})
+    assert r.status_code == 200
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [row["label"] for row in rows] == ["Negative", "Positive"]
+    assert set(rows[0]["proba"]) == {"Negative", "Positive"}
+
+@pytest.mark.parametrize("body, content_type", [
+    ('{"text": "fine"}\n{"text": ', "application/jsonlines"),
+    (b"\xff\xfe not utf-8", "application/json"),
+])
+def test_malformed_body_is_400(client, body, content_type):
+    r = client.post("/invocations", content=body, headers={"content-type": content_type})
+    assert r.status_code == 400
+
+def test_unsupported_content_type_is_415(client):
+    r = client.post("/invocations", content="<text/>", headers={"content-type": "application/xml"})
+    assert r.status_code == 415
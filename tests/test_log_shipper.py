@@ -0,0 +1,73 @@
+# tests/test_log_shipper.py
+
+import json
+import threading
+
+from log_shipper import LogShipper, CloudWatchSink, FileSink
+from local_fakes import FakeCloudWatchLogs
+
+GROUP, STREAM = "/test/group", "stream"
+
+def shipped(logs):
+    return [json.loads(ev["message"]) for ev in logs.events.get((GROUP, STREAM), [])]
+
+def test_batches_stay_within_cloudwatch_limits():
+    logs = FakeCloudWatchLogs()
+    shipper = LogShipper(CloudWatchSink(logs, GROUP, STREAM), flush_interval=60)
+    for i in range(25_000):
+        shipper.emit({"event": "prediction", "i": i})
+    shipper.close()
+    assert [e["i"] for e in shipped(logs)] == list(range(25_000))   # the fake rejects oversized batches
+    assert shipper.stats()["sent"] == 25_000 and shipper.failed == 0
+    assert logs.calls["put_log_events"] == 3
+
+def test_byte_limit_and_oversized_events():
+    logs = FakeCloudWatchLogs()
+    shipper = LogShipper(CloudWatchSink(logs, GROUP, STREAM), flush_interval=60)
+    for i in range(12):
+        shipper.emit("x" * 200_000)
+    shipper.emit({"event": "prediction", "text": "é" * 300_000, "label": "POSITIVE"})   # over 256 KB
+    shipper.emit("y" * 300_000)
+    shipper.close()
+    messages = [ev["message"] for ev in logs.events[(GROUP, STREAM)]]
+    assert len(messages) == 14 and shipper.failed == 0
+    assert logs.calls["put_log_events"] >= 3
+    assert all(len(m.encode("utf-8")) <= 256 * 1024 - 26 for m in messages)
+    # the oversized JSON event is shortened, not cut: it still parses
+    event = json.loads(next(m for m in messages if m.startswith("{")))
+    assert event["truncated"] is True
+    assert event["event"] == "prediction" and event["label"] == "POSITIVE"
+    assert 0 < len(event["text"]) < 300_000
+
+def test_flush_and_sequence_token_recovery():
+    logs = FakeCloudWatchLogs()
+    sink = CloudWatchSink(logs, GROUP, STREAM)
+    shipper = LogShipper(sink, flush_interval=60)
+    shipper.emit({"n": 1})
+    assert shipper.flush() and shipped(logs) == [{"n": 1}]
+    sink._token = "stale"                            # another writer moved the stream on
+    shipper.emit({"n": 2})
+    shipper.close()
+    assert shipped(logs) == [{"n": 1}, {"n": 2}] and shipper.failed == 0
+
+def test_emit_never_blocks_on_a_slow_sink():
+    release = threading.Event()
+
+    class SlowSink:
+        def put_events(self, events):
+            release.wait(5)
+
+    shipper = LogShipper(SlowSink(), max_batch_events=1, max_queue=5, flush_interval=0.01)
+    results = [shipper.emit({"i": i}) for i in range(50)]
+    assert not all(results) and shipper.dropped == results.count(False)
+    release.set()
+    shipper.close()
+
+def test_file_sink(tmp_path):
+    path = tmp_path / "events.jsonl"
+    shipper = LogShipper(FileSink(str(path)), flush_interval=60)
+    shipper.emit({"event": "prediction"})
+    shipper.close()
+    (line,) = path.read_text().splitlines()
+    assert json.loads(json.loads(line)["message"]) == {"event": "prediction"}
+    assert shipper.emit({"late": True}) is False      # closed
@@ -0,0 +1,77 @@
+# tests/test_near_dedup.py
+
+import numpy as np
+import pytest
+
+import near_dedup
+from near_dedup import MinHasher, NearDuplicateCollapser, canonical, negations, THRESHOLD
+from prediction_cache import PredictionCache, cached_map
+
+BODY = " The delivery was quick, the packaging was neat and support answered every question I had within a day."
+BUY = "Great product, would buy again." + BODY
+NOT_BUY = "Great product, would not buy again." + BODY
+
+class Model:
+    """Labels by keyword and records every text it was asked to score."""
+
+    def __init__(self):
+        self.seen = []
+
+    def __call__(self, texts):
+        self.seen.extend(texts)
+        return [{"label": "Negative" if " not " in f" {t.lower()} " else "Positive"} for t in texts]
+
+def test_default_is_exact_only():
+    assert THRESHOLD == 1.0
+    reps, clusters = NearDuplicateCollapser().collapse(["Great!", "great", "Great product", BUY, NOT_BUY])
+    assert reps == [0, 2, 3, 4]
+    assert clusters == [0, 0, 1, 2, 3]
+
+def test_canonical_masks_ids_urls_and_retweets():
+    assert canonical("RT @shop: Order 1234567 late https://t.co/x") == canonical("order 7654321 late!")
+    assert canonical("1 star") != canonical("5 stars")
+
+def test_negations():
+    assert negations(BUY) == ()
+    assert negations(NOT_BUY) == (("not", "buy"),)
+    assert negations("I don't like it, never again") == (("don't", "like"), ("never", "again"))
+    assert negations("see https://example.com/no-thanks") == ()
+
+def test_near_duplicates_cluster_without_negation():
+    texts = ["Order 1234567 arrived broken," + BODY, "Order 7654321 arrived broken!!" + BODY + " Thanks"]
+    assert NearDuplicateCollapser(0.8).collapse(texts)[0] == [0]
+
+def test_negation_never_clusters():
+    # similar enough to collapse on shingles alone
+    sigs = MinHasher().signatures([canonical(BUY), canonical(NOT_BUY)])
+    assert np.mean(sigs[0] == sigs[1]) >= 0.8
+    model = Model()
+    out = NearDuplicateCollapser(0.8).map([BUY, NOT_BUY], model)
+    assert [r["label"] for r in out] == ["Positive", "Negative"]
+    assert model.seen == [BUY, NOT_BUY]
+
+def test_disabled_and_stats():
+    col = NearDuplicateCollapser(0)
+    assert col.collapse(["a", "a"]) == ([0, 1], [0, 1])
+    col = NearDuplicateCollapser(1.0)
+    col.map(["a", "A", "b"], Model())
+    assert col.stats()["collapsed"] == 1
+
+def test_cache_stores_only_representatives(tmp_path):
+    cache = PredictionCache(version="t", path=str(tmp_path / "c.sqlite"))
+    model = Model()
+    col = NearDuplicateCollapser(1.0)
+    first = cached_map(cache, ["Great!", "great"], model, collapser=col)
+    assert model.seen == ["Great!"]
+    assert first == [{"label": "Positive"}] * 2
+    # "great" was never scored, so it is a miss the next time – not a fanned-out hit
+    cached_map(cache, ["great"], model)
+    assert model.seen == ["Great!", "great"]
+    cache.close()
+
+@pytest.mark.parametrize("chunk", [16, 100, 65_536])
+def test_signatures_do_not_depend_on_chunking(monkeypatch, chunk):
+    texts = [canonical(BUY), canonical(NOT_BUY), "ok", "x" * 300]
+    expected = MinHasher().signatures(texts)
+    monkeypatch.setattr(near_dedup, "CHUNK_SHINGLES", chunk)
+    assert np.array_equal(MinHasher().signatures(texts), expected)
@@ -0,0 +1,81 @@
+# tests/test_prediction_cache.py
+
+import time
+
+import pytest
+
+from prediction_cache import PredictionCache, cached_map, cache_key
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache.sqlite")
+
+def label(texts):
+    return [{"label": "POSITIVE", "text": t} for t in texts]
+
+def test_memory_and_disk_tiers(path):
+    cache = PredictionCache(path)
+    cache.put_many([("hello", 1)])
+    assert cache.get_many(["hello"]) == {cache_key("hello", "default"): 1}
+    assert cache.memory_hits == 1
+    cache.close()
+
+    again = PredictionCache(path)                  # new process: memory tier is empty
+    assert list(again.get_many(["  HELLO "]).values()) == [1]   # normalized key
+    assert (again.hits, again.memory_hits, again.misses) == (1, 0, 0)
+    again.close()
+
+def test_versions_are_namespaced(path):
+    old = PredictionCache(path, version="model-1")
+    old.put_many([("hello", "old")])
+    new = PredictionCache(path, version="model-2")
+    assert new.get_many(["hello"]) == {}
+    assert new.misses == 1
+
+def test_cached_map_calls_fn_for_distinct_misses_only(path):
+    cache = PredictionCache(path)
+    calls = []
+
+    def fn(texts):
+        calls.append(list(texts))
+        return label(texts)
+
+    assert [r["text"] for r in cached_map(cache, ["a", "b", "a"], fn)] == ["a", "b", "a"]
+    cached_map(cache, ["a", "b", "c"], fn)
+    assert calls == [["a", "b"], ["c"]]
+
+def test_cached_map_skips_errors_and_keep(path):
+    cache = PredictionCache(path)
+    results = {"bad": {"error": "boom"}, "none": None, "local": {"label": "x", "backend": "local"},
+               "good": {"label": "y"}}
+    cached_map(cache, list(results), lambda texts: [results[t] for t in texts],
+               keep=lambda r: r.get("backend", "endpoint") == "endpoint")
+    assert cache.get_many(list(results)) == {cache_key("good", "default"): {"label": "y"}}
+
+def test_repeated_puts_keep_byte_total(path):
+    cache = PredictionCache(path)
+    cache.put_many([("a", "x" * 10)] * 3)
+    cache.put_many([("a", "x" * 10), ("b", "y")])
+    cache.put_many([("a", "short")])
+    assert cache._disk_bytes == cache._count_bytes()
+
+def test_byte_total_with_keys_repeated_across_slices(path):
+    cache = PredictionCache(path)
+    cache.put_many([("dup", "v" * 50)])
+    # "dup" is already stored and appears in two different 500-row query slices
+    items = [("dup", "w" * 50)] + [(f"t{i}", i) for i in range(700)] + [("dup", "z" * 20)]
+    cache.put_many(items)
+    assert cache._disk_bytes == cache._count_bytes()
+    assert list(cache.get_many(["dup"]).values()) == ["z" * 20]
+
+def test_eviction_under_max_disk_bytes(path):
+    cache = PredictionCache(path, memory_items=10, max_disk_bytes=1000)
+    cache.put_many([("keep", "k" * 50)])
+    for i in range(40):
+        time.sleep(0.001)
+        cache.put_many([(f"text {i}", "v" * 50)])
+        cache.get_many(["keep"])                   # recently used: survives eviction
+    assert cache._disk_bytes == cache._count_bytes() <= 1000
+    cache._mem.clear()
+    assert cache.get_many(["keep"])
+    assert not cache.get_many(["text 0"])
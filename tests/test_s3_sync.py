@@ -0,0 +1,77 @@
+# tests/test_s3_sync.py
+
+import os
+import gzip
+import stat
+
+from s3_sync import S3Sync, SyncState, upload_if_changed
+from local_fakes import FakeS3
+
+BUCKET = "bucket"
+
+def make_tree(root):
+    os.makedirs(root / "sub")
+    (root / "a.csv").write_text("text\nhello\n" * 100)
+    (root / "b.bin").write_bytes(os.urandom(1000))
+    (root / "sub" / "c.jsonl").write_text('{"text": "hi"}\n' * 50)
+
+def new_sync(tmp_path, s3, **kwargs):
+    return S3Sync(s3, BUCKET, state=SyncState(str(tmp_path / "state.json")), **kwargs)
+
+def test_second_upload_is_list_only(tmp_path):
+    make_tree(tmp_path / "src")
+    s3 = FakeS3(str(tmp_path / "s3"))
+    report = new_sync(tmp_path, s3).upload(str(tmp_path / "src"), "models/")
+    assert (report["transferred"], report["skipped"], report["failed"]) == (3, 0, 0)
+
+    s3.calls.clear()
+    report = new_sync(tmp_path, s3).upload(str(tmp_path / "src"), "models/")
+    assert (report["transferred"], report["skipped"]) == (0, 3)
+    assert dict(s3.calls) == {"list_objects_v2": 1}
+
+    (tmp_path / "src" / "b.bin").write_bytes(b"changed")
+    report = new_sync(tmp_path, s3).upload(str(tmp_path / "src"), "models/")
+    assert (report["transferred"], report["skipped"]) == (1, 2)
+
+def test_foreign_objects_match_by_plain_etag(tmp_path):
+    (tmp_path / "a.csv").write_text("same content\n")
+    s3 = FakeS3(str(tmp_path / "s3"))
+    s3.put_object(Bucket=BUCKET, Key="input/a.csv", Body=b"same content\n")    # no sha256 metadata
+    assert not upload_if_changed(s3, str(tmp_path / "a.csv"), BUCKET, "input/")
+    assert s3.calls["upload_file"] == 0
+
+def test_gzip_round_trip(tmp_path):
+    make_tree(tmp_path / "src")
+    s3 = FakeS3(str(tmp_path / "s3"))
+    new_sync(tmp_path, s3, compress=True).upload(str(tmp_path / "src"), "data/")
+    stored = tmp_path / "s3" / BUCKET / "data" / "a.csv"
+    assert gzip.decompress(stored.read_bytes()) == (tmp_path / "src" / "a.csv").read_bytes()
+    assert s3.head_object(Bucket=BUCKET, Key="data/a.csv")["ContentEncoding"] == "gzip"
+    assert "ContentEncoding" not in s3.head_object(Bucket=BUCKET, Key="data/b.bin")
+
+    report = new_sync(tmp_path, s3).download("data/", str(tmp_path / "dst"))
+    assert (report["transferred"], report["failed"]) == (3, 0)
+    for rel in ("a.csv", "b.bin", os.path.join("sub", "c.jsonl")):
+        assert (tmp_path / "dst" / rel).read_bytes() == (tmp_path / "src" / rel).read_bytes()
+    assert not [n for n in os.listdir(tmp_path / "dst") if n.endswith(".part")]
+
+    report = new_sync(tmp_path, s3).download("data/", str(tmp_path / "dst"))
+    assert (report["transferred"], report["skipped"]) == (0, 3)
+
+def test_downloads_get_umask_permissions(tmp_path):
+    (tmp_path / "a.csv").write_text("x\n")
+    s3 = FakeS3(str(tmp_path / "s3"))
+    upload_if_changed(s3, str(tmp_path / "a.csv"), BUCKET, "input/")
+    new_sync(tmp_path, s3).download("input/a.csv", str(tmp_path / "out.csv"))
+    reference = tmp_path / "reference"
+    reference.write_text("")                        # plain open(): 0666 minus the umask
+    assert stat.S_IMODE(os.stat(tmp_path / "out.csv").st_mode) == stat.S_IMODE(os.stat(reference).st_mode)
+
+def test_corrupt_download_is_rejected(tmp_path):
+    (tmp_path / "a.csv").write_text("original\n")
+    s3 = FakeS3(str(tmp_path / "s3"))
+    upload_if_changed(s3, str(tmp_path / "a.csv"), BUCKET, "input/")
+    meta = s3.head_object(Bucket=BUCKET, Key="input/a.csv")["Metadata"]
+    s3.put_object(Bucket=BUCKET, Key="input/a.csv", Body=b"tampered\n", Metadata=meta)
+    report = new_sync(tmp_path, s3).download("input/a.csv", str(tmp_path / "out.csv"))
+    assert report["failed"] == 1 and not (tmp_path / "out.csv").exists()
@@ -0,0 +1,98 @@
+# tests/test_stream_monitor.py
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from stream_monitor import Baseline, SlidingWindow, StreamMonitor, MAX_LABELS
+
+T0 = datetime(2024, 6, 1, 10, 0, 0, tzinfo=timezone.utc)
+
+def baseline():
+    # length shares match event(): texts of 3..27 characters
+    edges = np.array([5.0, 20.0])
+    lengths = np.bincount(np.searchsorted(edges, np.arange(3, 28), side="right"), minlength=3) / 25
+    return Baseline({"positive": 0.5, "negative": 0.5}, edges, lengths)
+
+def event(i, label, seconds=None, **extra):
+    seconds = i if seconds is None else seconds
+    ev = {"event": "prediction", "text": "x" * (3 + i % 25), "predicted_sentiment": label,
+          "timestamp": (T0 + timedelta(seconds=seconds)).replace(tzinfo=None).isoformat(),
+          "source": "web" if i % 3 else "app", **extra}
+    return ev
+
+def bare(events):
+    return "".join(json.dumps(e) + "\n" for e in events).encode("utf-8")
+
+def wrapped(events):
+    lines = []
+    for e in events:
+        ms = int(datetime.fromisoformat(e["timestamp"]).replace(tzinfo=timezone.utc).timestamp() * 1000)
+        lines.append(json.dumps({"timestamp": ms, "message": json.dumps(e)}))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+def balanced(n, offset=0):
+    return [event(offset + i, "positive" if i % 2 else "negative") for i in range(n)]
+
+def test_both_shapes_count_the_same():
+    events = balanced(40) + [{"event": "save_to_s3", "rows_saved": 3}]
+    shapes = []
+    for data in (bare(events), wrapped(events[:-1])):
+        m = StreamMonitor(baseline(), windows=("1h",))
+        assert m.process_block(data) == 40
+        shapes.append(m)
+    bare_m, wrapped_m = shapes
+    assert bare_m.skipped == 1
+    # event time in seconds, whatever resolution pandas parses ISO strings to
+    assert bare_m.clock == wrapped_m.clock == (T0 + timedelta(seconds=39)).timestamp()
+    assert bare_m.snapshot() == wrapped_m.snapshot()
+    assert bare_m.snapshot()["1h"]["labels"] == {"positive": 0.5, "negative": 0.5}
+    assert dict(bare_m.snapshot()["1h"]["top_source"]) == {"web": 26, "app": 14}
+
+def test_events_without_timestamp_are_dropped():
+    events = balanced(10)
+    events[3]["timestamp"] = None
+    events[5]["timestamp"] = "not a date"
+    del events[7]["timestamp"]
+    m = StreamMonitor(baseline(), windows=("1h",))
+    assert m.process_block(bare(events)) == 7
+    assert m.untimed == 3
+    assert m.windows[0].events == 7
+
+    m = StreamMonitor(baseline(), windows=("1h",))
+    assert m.process_block(bare([{"event": "prediction", "predicted_sentiment": "positive"}])) == 0
+    assert m.untimed == 1
+
+def test_slots_expire_as_the_window_advances():
+    w = SlidingWindow("1m", 60, 3, slots=6)                # 10 s slots
+    labels = np.zeros(MAX_LABELS, dtype=np.intp)
+
+    def add(ts):
+        ts = np.asarray(ts, dtype=np.float64)
+        w.advance(ts.max())
+        w.add(ts, labels[:len(ts)], np.zeros(len(ts), dtype=np.intp), {})
+
+    add([0, 5, 15])
+    add([30, 45])
+    assert w.events == 5
+    w.advance(65)                                          # slot [0, 10) falls out
+    assert w.events == 3
+    w.advance(200)
+    assert w.events == 0
+    add([100])                                             # older than the window: late, not counted
+    assert (w.events, w.late) == (0, 1)
+
+def test_psi_alert_fires_and_clears():
+    m = StreamMonitor(baseline(), windows=("1m",), min_events=20, psi_alert=0.25)
+    m.process_block(bare(balanced(30)))
+    assert m.check_drift() == []
+
+    m.process_block(bare([event(60 + i, "negative") for i in range(40)]))
+    alerts = m.check_drift()
+    assert [(a["kind"], a["state"]) for a in alerts] == [("label_drift", "alert")]
+    assert alerts[0]["psi"] > 0.25 and alerts[0]["window"] == "1m"
+    assert m.check_drift() == []                           # one alert, not one per check
+
+    m.process_block(bare(balanced(40, offset=200)))        # the negative-only minute has expired
+    assert [(a["kind"], a["state"]) for a in m.check_drift()] == [("label_drift", "cleared")]